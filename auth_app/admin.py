@@ -4,6 +4,9 @@ from auth_app.models import CustomUser
 
 from rest_framework.authtoken.models import Token
 
+from core import lookups  # noqa: F401  (registers __iprefix)
+from core.pagination import EstimatedCountPaginator
+
 
 # ==========================
 # Custom User Model Admin
@@ -17,7 +20,12 @@ class CustomUserAdmin(UserAdmin):
     list_display  = ("email", "fullname", "is_staff", "is_active")
     list_filter   = ("is_staff", "is_active")
     ordering      = ("email",)
-    search_fields = ("email", "fullname")
+    # Prefix searches on the Upper() indexes (also for autocompletes)
+    search_fields = ("email__iprefix", "fullname__iprefix")
+
+    # No exact COUNT(*) over the whole user table
+    paginator              = EstimatedCountPaginator
+    show_full_result_count = False
 
     # Fields shown when editing an existing user
     fieldsets = (
@@ -59,5 +67,10 @@ class CustomUserAdmin(UserAdmin):
 class TokenAdmin(admin.ModelAdmin):
     """Admin panel configuration for auth tokens."""
     list_display  = ("key", "user", "created")
-    search_fields = ("key", "user__email")
+    list_select_related = ("user",)
+    search_fields = ("=key", "user__email__iprefix")
     ordering      = ("-created",)
+    autocomplete_fields = ("user",)
+
+    paginator              = EstimatedCountPaginator
+    show_full_result_count = False
@@ -0,0 +1,38 @@
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+
+from core.ratelimit import TokenBucket
+from core.throttling import client_ip
+
+
+# ==========================
+# Login Throttle
+# ==========================
+class LoginRateThrottle(BaseThrottle):
+    """
+    Token buckets per client IP and per email address for the login.
+
+    Runs before the view, so a brute-force flood is rejected before any
+    password hash is computed. Rates come from ``LOGIN_THROTTLE_RATES``.
+    """
+
+    def __init__(self):
+        rates = settings.LOGIN_THROTTLE_RATES
+        self.ip_bucket    = TokenBucket("login-ip", rates["ip"])
+        self.email_bucket = TokenBucket("login-email", rates["email"])
+        self.retry_after  = None
+
+    def allow_request(self, request, view):
+        checks = [(self.ip_bucket, client_ip(request))]
+        email  = request.data.get("email") if isinstance(request.data, dict) else None
+        if isinstance(email, str) and email:
+            checks.append((self.email_bucket, email.strip().lower()))
+
+        for bucket, key in checks:
+            allowed, _, self.retry_after = bucket.consume(key)
+            if not allowed:
+                return False
+        return True
+
+    def wait(self):
+        return self.retry_after
@@ -1,8 +1,9 @@
 from django.urls import path
-from auth_app.api.views import RegistrationView, LoginView, EmailCheckView
+from auth_app.api.views import RegistrationView, LoginView, EmailCheckView, UserSearchView
 
 urlpatterns = [
     path("registration/",  RegistrationView.as_view(), name="registration"),
     path("login/",         LoginView.as_view(),        name="login"),
     path("email-check/",   EmailCheckView.as_view(),   name="email-check"),
+    path("users/search/",  UserSearchView.as_view(),   name="user-search"),
 ]
@@ -4,8 +4,10 @@ from rest_framework import status, permissions
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
+from auth_app.directory import directory
 from auth_app.models import CustomUser
 from auth_app.api.serializers import RegistrationSerializer
+from auth_app.api.throttling import LoginRateThrottle
 
 
 # ==========================
@@ -58,12 +60,19 @@ class LoginView(APIView):
       "password": "superSecret123!"
     }
     Returns token and user info on success.
+
+    The user and their token are loaded with one indexed query. Unknown
+    emails still cost one password hash, so response times do not reveal
+    which addresses are registered. Passwords stored with an outdated
+    hasher are rehashed on successful login (see PASSWORD_HASHERS).
     """
     permission_classes: list = []  # Public endpoint
+    throttle_classes = [LoginRateThrottle]
 
     def post(self, request):
-        email = request.data.get("email")
-        password = request.data.get("password")
+        data = request.data if isinstance(request.data, dict) else {}
+        email = data.get("email")
+        password = data.get("password")
 
         if not email or not password:
             return Response(
@@ -71,18 +80,25 @@ class LoginView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        users_qs = CustomUser.objects.filter(email=email)
-        if not users_qs.exists():
+        user = (
+            CustomUser.objects.select_related("auth_token")
+            .filter(email=email)
+            .first()
+        )
+        if user is None:
+            # Hash anyway to take as long as a wrong password
+            CustomUser().set_password(password)
             return Response({"detail": "Invalid credentials."},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        user = users_qs.first()
-
         if not user.check_password(password):
             return Response({"detail": "Invalid credentials."},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        token, _ = Token.objects.get_or_create(user=user)
+        try:
+            token = user.auth_token
+        except Token.DoesNotExist:
+            token = Token.objects.create(user=user)
         return Response(
             {
                 "token":    token.key,
@@ -121,12 +137,40 @@ class EmailCheckView(APIView):
             return Response({"detail": "invalid email format."},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            user = CustomUser.objects.get(email=email)
-            return Response(
-                {"id": user.id, "email": user.email, "fullname": user.fullname},
-                status=status.HTTP_200_OK,
-            )
-        except CustomUser.DoesNotExist:
+        user = directory.get(email)
+        if user is None:
             return Response({"detail": "email not found."},
                             status=status.HTTP_404_NOT_FOUND)
+        return Response(user, status=status.HTTP_200_OK)
+
+
+# ==========================
+# User Search View
+# ==========================
+class UserSearchView(APIView):
+    """
+    Autocomplete for adding board members.
+    GET /api/users/search/?prefix=<text>&limit=<n>
+    Requires authentication.
+
+    Returns up to `limit` (default 10, max 20) users whose email or full
+    name starts with `prefix`, served from the in-memory user directory.
+
+    * 200: list of {id, email, fullname}
+    * 400: prefix missing
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    max_limit = 20
+
+    def get(self, request):
+        prefix = request.query_params.get("prefix", "").strip()
+        if not prefix:
+            return Response({"detail": "prefix parameter missing."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(int(request.query_params.get("limit", 10)), self.max_limit)
+        except ValueError:
+            return Response({"detail": "limit must be a number."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(directory.search(prefix, max(limit, 1)), status=status.HTTP_200_OK)
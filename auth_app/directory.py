@@ -0,0 +1,230 @@
+"""
+In-memory user directory for member lookups and autocomplete.
+
+Every process keeps a compact index of ``(email, fullname, id)`` sorted by
+lowercased email and by lowercased full name, so exact lookups are a dict
+access and prefix searches a binary search. Email lookups are exact, as the
+database lookup they replace; prefix searches ignore case.
+
+Saves and deletes of `CustomUser` update the local index in place and,
+once committed, publish a change event in the cache: a generation counter
+is incremented and the id of the changed user stored under the new
+generation. Other processes check the counter at most every
+``USER_DIRECTORY_CHECK_SECONDS`` and reload only the users named by the
+events they missed. They reload everything only if those events have
+expired (``CHANGE_TTL``) or there are more than ``MAX_CHANGES`` of them.
+Misses are remembered for ``USER_DIRECTORY_MISS_TTL`` seconds, so repeated
+lookups of unknown addresses do not reach the database either.
+"""
+import bisect
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from auth_app.models import CustomUser
+
+
+GENERATION_KEY = "user-directory:generation"
+CHANGE_TTL     = 3600    # seconds a change event is kept
+MAX_CHANGES    = 1000    # missed events applied one by one; beyond, reload
+MAX_MISSES     = 10_000
+
+
+def _change_key(generation):
+    return f"user-directory:change:{generation}"
+
+
+class UserDirectory:
+    """Sorted in-memory index of all users (see module docstring)."""
+
+    def __init__(self):
+        self._lock       = threading.RLock()
+        self._loaded     = False
+        self._generation = None
+        self._checked_at = 0.0
+        self._by_id      = {}   # id -> (email, fullname, id)
+        self._by_email   = {}   # email -> entry
+        self._emails     = []   # sorted [(lowercased email, id)]
+        self._names      = []   # sorted [(lowercased fullname, id)]
+        self._misses     = {}   # email -> expiry timestamp
+
+    # ---------- loading ----------
+    def _load(self):
+        generation = cache.get(GENERATION_KEY)
+        rows = CustomUser.objects.order_by().values_list("email", "fullname", "id")
+        with self._lock:
+            self._by_id    = {}
+            self._by_email = {}
+            self._emails   = []
+            self._names    = []
+            self._misses   = {}
+            for entry in rows.iterator(chunk_size=5000):
+                self._index(entry)
+            self._emails.sort()
+            self._names.sort()
+            self._generation = generation
+            self._loaded     = True
+            self._checked_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        now = time.monotonic()
+        if self._loaded and now - self._checked_at < settings.USER_DIRECTORY_CHECK_SECONDS:
+            return
+        if not self._loaded or not self._catch_up(cache.get(GENERATION_KEY) or 0):
+            self._load()
+        self._checked_at = now
+
+    def _catch_up(self, generation):
+        """
+        Apply the changes published since our generation; False if they can
+        no longer all be read (then the caller reloads).
+        """
+        current = self._generation or 0
+        if generation == current:
+            return True
+        if generation < current or generation - current > MAX_CHANGES:
+            return False  # counter lost with the cache, or too far behind
+        keys    = [_change_key(n) for n in range(current + 1, generation + 1)]
+        changes = cache.get_many(keys)
+        if len(changes) < len(keys):
+            return False
+        pks  = set(changes.values())
+        rows = CustomUser.objects.filter(pk__in=pks).order_by().values_list("email", "fullname", "id")
+        with self._lock:
+            for pk in pks:
+                self._unindex(pk)
+            for entry in rows:
+                self._index(entry, keep_sorted=True)
+                self._misses.pop(entry[0], None)
+            self._generation = generation
+        return True
+
+    # ---------- index maintenance ----------
+    def _index(self, entry, keep_sorted=False):
+        email, fullname, pk = entry
+        add = bisect.insort if keep_sorted else list.append
+        self._by_id[pk] = entry
+        self._by_email.setdefault(email, entry)
+        add(self._emails, (email.lower(), pk))
+        add(self._names, (fullname.lower(), pk))
+
+    def _unindex(self, pk):
+        entry = self._by_id.pop(pk, None)
+        if entry is None:
+            return
+        email, fullname, _ = entry
+        if self._by_email.get(email) == entry:
+            del self._by_email[email]
+        for keys, key in ((self._emails, email.lower()), (self._names, fullname.lower())):
+            i = bisect.bisect_left(keys, (key, pk))
+            if i < len(keys) and keys[i] == (key, pk):
+                del keys[i]
+
+    def update(self, user):
+        """Apply a saved user to the local index."""
+        with self._lock:
+            if not self._loaded:
+                return
+            self._unindex(user.pk)
+            self._index((user.email, user.fullname, user.pk), keep_sorted=True)
+            self._misses.pop(user.email, None)
+
+    def remove(self, pk):
+        """Drop a deleted user from the local index."""
+        with self._lock:
+            if self._loaded:
+                self._unindex(pk)
+
+    def advance_generation(self, generation):
+        """
+        Adopt ``generation`` after applying our own change, unless another
+        process changed users in between (then the next check catches up).
+        """
+        with self._lock:
+            if self._loaded and (self._generation or 0) + 1 == generation:
+                self._generation = generation
+
+    # ---------- lookups ----------
+    def get(self, email):
+        """Return ``{"id", "email", "fullname"}`` for exactly ``email`` or None."""
+        now = time.monotonic()
+        with self._lock:
+            self._ensure_fresh()
+            entry = self._by_email.get(email)
+            if entry is not None:
+                return _as_dict(entry)
+            if self._misses.get(email, 0) > now:
+                return None
+
+        # Not indexed yet (e.g. just registered in another process):
+        # confirm with the database once, then remember the answer.
+        user = CustomUser.objects.filter(email=email).only("email", "fullname").first()
+        with self._lock:
+            if user is not None:
+                self.update(user)
+                return _as_dict((user.email, user.fullname, user.pk))
+            if len(self._misses) >= MAX_MISSES:
+                self._misses.clear()
+            self._misses[email] = now + settings.USER_DIRECTORY_MISS_TTL
+        return None
+
+    def search(self, prefix, limit=10):
+        """Users whose email or full name starts with ``prefix``."""
+        prefix = prefix.lower()
+        found  = []
+        with self._lock:
+            self._ensure_fresh()
+            for keys in (self._emails, self._names):
+                i = bisect.bisect_left(keys, (prefix,))
+                while i < len(keys) and len(found) < limit and keys[i][0].startswith(prefix):
+                    pk = keys[i][1]
+                    if pk not in found:
+                        found.append(pk)
+                    i += 1
+            return [_as_dict(self._by_id[pk]) for pk in found]
+
+
+def _as_dict(entry):
+    email, fullname, pk = entry
+    return {"id": pk, "email": email, "fullname": fullname}
+
+
+def _publish(pk):
+    """Publish a change of user ``pk`` to other processes; return its generation."""
+    cache.add(GENERATION_KEY, 0, None)
+    try:
+        generation = cache.incr(GENERATION_KEY)
+    except ValueError:
+        # evicted between add() and incr(); other processes reload
+        generation = 1
+        cache.set(GENERATION_KEY, generation, None)
+    cache.set(_change_key(generation), pk, CHANGE_TTL)
+    return generation
+
+
+def _published(pk, using):
+    # Other processes read the user from the database: only after commit
+    transaction.on_commit(lambda: directory.advance_generation(_publish(pk)), using=using)
+
+
+directory = UserDirectory()
+
+
+@receiver(post_save, sender=CustomUser, dispatch_uid="user_directory_save")
+def _user_saved(sender, instance, using, update_fields=None, **kwargs):
+    # last_login / password updates do not change the directory
+    if update_fields and not {"email", "fullname"} & set(update_fields):
+        return
+    directory.update(instance)
+    _published(instance.pk, using)
+
+
+@receiver(post_delete, sender=CustomUser, dispatch_uid="user_directory_delete")
+def _user_deleted(sender, instance, using, **kwargs):
+    directory.remove(instance.pk)
+    _published(instance.pk, using)
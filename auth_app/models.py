@@ -1,8 +1,18 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.functions import Upper
 
 class CustomUser(AbstractUser):
     fullname = models.CharField(max_length=100)
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Login and email-check look users up by email
+            models.Index(fields=["email"], name="user_email_idx"),
+            # Admin searches (core.lookups.UpperPrefix)
+            models.Index(Upper("email"), name="user_email_upper_idx"),
+            models.Index(Upper("fullname"), name="user_fullname_upper_idx"),
+        ]
+
     def __str__(self):
         return self.fullname
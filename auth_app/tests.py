@@ -1,3 +1,185 @@
-from django.test import TestCase
+"""
+Tests of the auth app. Run with ``python manage.py test``.
+"""
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from auth_app import directory as user_directory
+from auth_app.directory import UserDirectory, directory
+from auth_app.models import CustomUser
+
+
+MD5_HASHER = "django.contrib.auth.hashers.MD5PasswordHasher"
+
+
+class FastPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2 with few iterations, standing in for a newer default hasher."""
+    algorithm  = "pbkdf2_fast"
+    iterations = 10
+
+
+# ==========================
+# Login
+# ==========================
+
+@override_settings(PASSWORD_HASHERS=[MD5_HASHER])
+class LoginTests(TestCase):
+    databases = set(settings.SHARDS)
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(
+            username="alice@example.com", email="alice@example.com", password="pw12345!", fullname="Alice",
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.api   = APIClient()
+
+    def login(self, email="alice@example.com", password="pw12345!", **extra):
+        return self.api.post("/api/login/", {"email": email, "password": password}, format="json", **extra)
+
+    def test_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.login()
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()["token"], self.token.key)
+
+    def test_outdated_hash_is_upgraded(self):
+        hashers = [f"{__name__}.FastPBKDF2PasswordHasher", MD5_HASHER]
+        with override_settings(PASSWORD_HASHERS=hashers):
+            self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_fast$"))
+        with override_settings(PASSWORD_HASHERS=hashers), self.assertNumQueries(1):
+            self.assertEqual(self.login().status_code, 200)
+
+    def test_unknown_email_still_hashes(self):
+        with mock.patch.object(CustomUser, "set_password", autospec=True) as set_password:
+            unknown = self.login(email="nobody@example.com")
+        set_password.assert_called_once_with(mock.ANY, "pw12345!")
+        wrong = self.login(password="wrong")
+        self.assertEqual((unknown.status_code, unknown.json()), (wrong.status_code, wrong.json()))
+
+    def test_body_that_is_not_an_object(self):
+        for body in ([], ["alice@example.com"], "alice", 1):
+            response = self.api.post("/api/login/", body, format="json")
+            self.assertEqual(response.status_code, 400, response.content)
+
+
+@override_settings(PASSWORD_HASHERS=[MD5_HASHER], LOGIN_THROTTLE_RATES={"ip": "3/min", "email": "2/min"})
+class LoginThrottleTests(TestCase):
+    databases = set(settings.SHARDS)
+
+    def setUp(self):
+        cache.clear()
+        self.api = APIClient()
+
+    def login(self, email, **extra):
+        return self.api.post(
+            "/api/login/", {"email": email, "password": "wrong"}, format="json", **extra,
+        )
+
+    def test_email_bucket(self):
+        self.assertEqual(self.login("alice@example.com").status_code, 400)
+        self.assertEqual(self.login("ALICE@example.com ").status_code, 400)
+        response = self.login("alice@example.com", REMOTE_ADDR="10.0.0.2")
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+
+    def test_ip_bucket_ignores_forwarded_for(self):
+        for i in range(3):
+            response = self.login(f"user{i}@example.com", HTTP_X_FORWARDED_FOR=f"10.1.0.{i}")
+            self.assertEqual(response.status_code, 400)
+        response = self.login("user9@example.com", HTTP_X_FORWARDED_FOR="10.1.0.9")
+        self.assertEqual(response.status_code, 429)
+        # Another client address has its own budget
+        self.assertEqual(self.login("user9@example.com", REMOTE_ADDR="10.0.0.2").status_code, 400)
+
+    def test_forwarded_for_behind_configured_proxies(self):
+        with override_settings(REST_FRAMEWORK={"NUM_PROXIES": 1}):
+            for i in range(4):
+                response = self.login(f"user{i}@example.com", HTTP_X_FORWARDED_FOR=f"10.1.0.{i}")
+                self.assertEqual(response.status_code, 400)
+
+
+# ==========================
+# User directory
+# ==========================
+
+@override_settings(PASSWORD_HASHERS=[MD5_HASHER], USER_DIRECTORY_CHECK_SECONDS=0)
+class UserDirectoryTests(TestCase):
+    databases = set(settings.SHARDS)
+
+    def setUp(self):
+        cache.clear()
+        directory._loaded = False
+        self.alice = self.make_user("Alice@example.com", "Alice Adams")
+        self.make_user("bob@example.com", "Bob Baker")
+        self.make_user("al@example.com", "Zed Allen")
+        self.api = APIClient()
+        self.api.force_authenticate(self.alice)
+
+    def make_user(self, email, fullname):
+        with self.captureOnCommitCallbacks(execute=True):
+            return CustomUser.objects.create_user(username=email, email=email, password="pw", fullname=fullname)
+
+    def emails(self, prefix, limit=10, other=directory):
+        return [user["email"] for user in other.search(prefix, limit)]
+
+    def test_email_check_is_exact(self):
+        response = self.api.get("/api/email-check/", {"email": "Alice@example.com"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(), {"id": self.alice.pk, "email": "Alice@example.com", "fullname": "Alice Adams"},
+        )
+        response = self.api.get("/api/email-check/", {"email": "alice@example.com"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_search_by_email_or_name(self):
+        response = self.api.get("/api/users/search/", {"prefix": "AL"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([user["email"] for user in response.json()], ["al@example.com", "Alice@example.com"])
+        self.assertEqual(self.emails("bob b"), ["bob@example.com"])
+        self.assertEqual(self.emails("al", limit=1), ["al@example.com"])
+        self.assertEqual(self.api.get("/api/users/search/").status_code, 400)
+
+    def test_other_process_applies_only_the_changes(self):
+        other = UserDirectory()  # the directory of another process
+        self.assertEqual(self.emails("ali", other=other), ["Alice@example.com"])
+
+        self.alice.fullname = "Alice Carter"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.alice.save()
+        carol = self.make_user("carol@example.com", "Carol")
+        with self.captureOnCommitCallbacks(execute=True):
+            CustomUser.objects.get(email="bob@example.com").delete()
+
+        with mock.patch.object(other, "_load") as load, self.assertNumQueries(1):
+            self.assertEqual(self.emails("carol", other=other), ["carol@example.com"])
+        load.assert_not_called()
+        self.assertEqual(other.search("alice c"), [
+            {"id": self.alice.pk, "email": "Alice@example.com", "fullname": "Alice Carter"},
+        ])
+        self.assertEqual(self.emails("bob", other=other), [])
+        self.assertEqual(other.get("carol@example.com")["id"], carol.pk)
+
+    def test_expired_changes_reload(self):
+        other = UserDirectory()
+        other.search("a")
+        self.make_user("carol@example.com", "Carol")
+        cache.delete(user_directory._change_key(cache.get(user_directory.GENERATION_KEY)))
+        with mock.patch.object(other, "_load", wraps=other._load) as load:
+            self.assertEqual(self.emails("carol", other=other), ["carol@example.com"])
+        load.assert_called_once()
+
+    def test_uncommitted_changes_are_not_published(self):
+        generation = cache.get(user_directory.GENERATION_KEY)
+        CustomUser.objects.create_user(username="x@example.com", email="x@example.com", password="pw")
+        self.assertEqual(cache.get(user_directory.GENERATION_KEY), generation)
+        # The local index has it already
+        self.assertEqual(self.emails("x@"), ["x@example.com"])
@@ -12,5 +12,14 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+# Serve the hot read endpoints with the async views under ASGI.
+os.environ.setdefault('KANMIND_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
+
+# Import views, build URL patterns and serializers now instead of on the
+# first request (before fork with a preloading server, see core/preload.py).
+if os.environ.get('KANMIND_PRELOAD', '1') == '1':
+    from core.preload import warm
+
+    warm()
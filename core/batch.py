@@ -0,0 +1,191 @@
+"""
+Batched API requests.
+
+``POST /api/batch/`` runs several API requests in one HTTP round-trip::
+
+    {
+      "parallel": false,
+      "requests": [
+        {"method": "GET",  "path": "/api/boards/1/"},
+        {"method": "POST", "path": "/api/tasks/7/comments/", "body": {"content": "Hi"}}
+      ]
+    }
+
+Each sub-request is resolved against the normal URL conf and handled by the
+normal view, so permissions, validation and throttling behave exactly as
+for single requests. The batch is authenticated once; the sub-requests reuse
+that user and token and skip the middleware stack. They run one after the
+other on the same database connection. With ``"parallel": true`` a batch
+consisting only of GET requests is spread over a small thread pool instead.
+The total cost of a batch is bounded (``BATCH_MAX_COST``, where GET costs
+1 and writes cost 2).
+
+JSON bodies of the sub-responses are embedded as JSON and other text as a
+string; binary bodies are base64-encoded and marked with
+``"encoding": "base64"``. A batch of safe-method requests only counts as a
+read for replica routing (see `is_read_only`).
+"""
+import base64
+import contextvars
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.http import HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+from rest_framework import serializers, status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+
+PATH         = "/api/batch/"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+COSTS        = {"GET": 1, "HEAD": 1, "OPTIONS": 1}
+WRITE_COST   = 2
+
+
+def is_read_only(request):
+    """
+    Whether ``request`` is a batch of safe-method requests only. Used by
+    `core.middleware.ReplicaRoutingMiddleware`, which decides before the
+    view runs; anything it cannot read counts as a write.
+    """
+    if request.method != "POST" or request.path_info != PATH:
+        return False
+    try:
+        subs = json.loads(request.body)["requests"]
+        return bool(subs) and all(sub["method"] in SAFE_METHODS for sub in subs)
+    except (ValueError, KeyError, TypeError):
+        return False
+
+
+class SubRequestSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=["GET", "HEAD", "OPTIONS", "POST", "PUT", "PATCH", "DELETE"])
+    path   = serializers.CharField()
+    body   = serializers.JSONField(required=False)
+
+    def validate_path(self, value):
+        path = urlsplit(value).path
+        if not path.startswith("/api/") or path.startswith(PATH):
+            raise serializers.ValidationError("Only API endpoints (except batch) can be batched.")
+        return value
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = SubRequestSerializer(many=True, allow_empty=False)
+    parallel = serializers.BooleanField(default=False)
+
+    def validate_requests(self, value):
+        if len(value) > settings.BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(
+                f"At most {settings.BATCH_MAX_REQUESTS} requests per batch."
+            )
+        cost = sum(COSTS.get(sub["method"], WRITE_COST) for sub in value)
+        if cost > settings.BATCH_MAX_COST:
+            raise serializers.ValidationError(
+                f"Batch too expensive ({cost} > {settings.BATCH_MAX_COST})."
+            )
+        return value
+
+
+def _build_request(outer, sub):
+    """An HttpRequest for one sub-request, authenticated like ``outer``."""
+    url  = urlsplit(sub["path"])
+    body = json.dumps(sub["body"]).encode() if "body" in sub else b""
+
+    request = HttpRequest()
+    request.method    = sub["method"]
+    request.path      = request.path_info = url.path
+    request.GET       = QueryDict(url.query)
+    request.COOKIES   = outer.COOKIES
+    request.META      = {
+        **outer.META,
+        "REQUEST_METHOD": sub["method"],
+        "PATH_INFO":      url.path,
+        "QUERY_STRING":   url.query,
+        "CONTENT_TYPE":   "application/json",
+        "CONTENT_LENGTH": str(len(body)),
+    }
+    request._stream       = io.BytesIO(body)
+    request._read_started = False
+
+    # Picked up by DRF's Request: no second token lookup
+    request._force_auth_user  = outer.user
+    request._force_auth_token = outer.auth
+    return request
+
+
+def _run(outer, sub):
+    """Dispatch one sub-request and return its serialized response."""
+    request = _build_request(outer, sub)
+    try:
+        match = resolve(request.path_info)
+    except Resolver404:
+        return {"status": status.HTTP_404_NOT_FOUND, "headers": {}, "body": {"detail": "Not found."}}
+    request.resolver_match = match
+
+    view = match.func
+    if iscoroutinefunction(view):
+        view = async_to_sync(view)
+    response = view(request, *match.args, **match.kwargs)
+    if hasattr(response, "render"):
+        response.render()
+
+    headers = {k: v for k, v in response.items() if k not in ("Content-Type", "Content-Length")}
+    result  = {"status": response.status_code, "headers": headers, "body": None}
+    content = response.content
+    if not content:
+        return result
+    if response.get("Content-Type", "").startswith("application/json"):
+        result["body"] = json.loads(content)
+        return result
+    try:
+        result["body"] = content.decode(response.charset)
+    except UnicodeDecodeError:
+        result["body"]     = base64.b64encode(content).decode()
+        result["encoding"] = "base64"
+    return result
+
+
+def _run_in_thread(context, outer, sub):
+    try:
+        return context.run(_run, outer, sub)
+    finally:
+        # Pool threads open their own connections; do not leak them
+        connections.close_all()
+
+
+class BatchView(APIView):
+    """
+    Run several API requests in one.
+    POST /api/batch/
+    Returns {"responses": [{"status", "headers", "body"}, ...]} in request order.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        subs     = serializer.validated_data["requests"]
+        parallel = serializer.validated_data["parallel"]
+        outer    = request._request
+        outer.user, outer.auth = request.user, request.auth
+
+        if parallel and all(sub["method"] in SAFE_METHODS for sub in subs):
+            with ThreadPoolExecutor(max_workers=settings.BATCH_MAX_WORKERS) as pool:
+                # Each thread runs in a copy of this context (replica routing,
+                # activity buffer, ...)
+                futures = [
+                    pool.submit(_run_in_thread, contextvars.copy_context(), outer, sub)
+                    for sub in subs
+                ]
+                responses = [future.result() for future in futures]
+        else:
+            responses = [_run(outer, sub) for sub in subs]
+
+        return Response({"responses": responses}, status=status.HTTP_200_OK)
@@ -0,0 +1,109 @@
+"""
+Environment-driven database configuration.
+
+`database_from_env` builds one entry of ``DATABASES`` from ``<PREFIX>_*``
+environment variables, e.g. for the primary::
+
+    DB_ENGINE=postgresql DB_NAME=kanmind DB_USER=kanmind DB_HOST=db
+    DB_CONN_MAX_AGE=60 DB_CONN_HEALTH_CHECKS=1 DB_POOL=0
+
+Without any variables the local SQLite file is used, as before. SQLite
+connections are tuned by `apply_sqlite_pragmas` (WAL, synchronous=NORMAL,
+busy timeout, mmap and cache size) as soon as they are opened.
+"""
+import os
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+ENGINES = {
+    "sqlite":     "django.db.backends.sqlite3",
+    "postgresql": "django.db.backends.postgresql",
+    "mysql":      "django.db.backends.mysql",
+}
+
+# Applied to every new SQLite connection; override single values with
+# SQLITE_<PRAGMA> environment variables (e.g. SQLITE_CACHE_SIZE=-64000).
+DEFAULT_SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",       # readers no longer block on a writer
+    "synchronous":  "NORMAL",    # safe with WAL, far fewer fsyncs
+    "busy_timeout": 5000,        # ms to wait for a lock instead of failing
+    "mmap_size":    268435456,   # 256 MiB memory-mapped reads
+    "cache_size":   -20000,      # negative = KiB, i.e. ~20 MB page cache
+    "foreign_keys": "ON",
+}
+
+
+def _env(prefix, name, default=None):
+    return os.environ.get(f"{prefix}_{name}", default)
+
+
+def _env_bool(prefix, name, default=False):
+    value = _env(prefix, name)
+    if value is None:
+        return default
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+def database_from_env(prefix="DB", default_name=None):
+    """
+    Return a ``DATABASES`` entry configured by ``<prefix>_*`` variables.
+
+    * ``ENGINE``: ``sqlite`` (default), ``postgresql``, ``mysql`` or a full
+      backend path
+    * ``NAME``, ``USER``, ``PASSWORD``, ``HOST``, ``PORT``
+    * ``CONN_MAX_AGE``: seconds to keep connections open (``None`` = forever)
+    * ``CONN_HEALTH_CHECKS``: ping persistent connections before reuse
+    * ``POOL``: use the PostgreSQL connection pool (needs ``psycopg[pool]``)
+    """
+    engine = _env(prefix, "ENGINE", "sqlite")
+    engine = ENGINES.get(engine, engine)
+    name   = _env(prefix, "NAME", default_name)
+
+    config = {
+        "ENGINE": engine,
+        "NAME":   name,
+        "CONN_HEALTH_CHECKS": _env_bool(prefix, "CONN_HEALTH_CHECKS", True),
+        "OPTIONS": {},
+    }
+
+    max_age = _env(prefix, "CONN_MAX_AGE", "60")
+    config["CONN_MAX_AGE"] = None if max_age.lower() == "none" else int(max_age)
+
+    if engine == ENGINES["sqlite"]:
+        # Take the write lock when the transaction starts, so concurrent
+        # writers queue on busy_timeout instead of failing mid-transaction.
+        config["OPTIONS"]["transaction_mode"] = "IMMEDIATE"
+        return config
+
+    for key in ("USER", "PASSWORD", "HOST", "PORT"):
+        config[key] = _env(prefix, key, "")
+
+    if engine == ENGINES["postgresql"] and _env_bool(prefix, "POOL"):
+        # Pooled connections are handed back after each request; Django
+        # refuses persistent connections on top of a pool.
+        config["OPTIONS"]["pool"] = True
+        config["CONN_MAX_AGE"] = 0
+
+    return config
+
+
+def sqlite_pragmas_from_env():
+    """Default SQLite pragmas with ``SQLITE_<NAME>`` overrides applied."""
+    return {
+        name: os.environ.get(f"SQLITE_{name.upper()}", value)
+        for name, value in DEFAULT_SQLITE_PRAGMAS.items()
+    }
+
+
+@receiver(connection_created, dispatch_uid="core.database.apply_sqlite_pragmas")
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Tune every new SQLite connection with ``settings.SQLITE_PRAGMAS``."""
+    if connection.vendor != "sqlite":
+        return
+    pragmas = getattr(settings, "SQLITE_PRAGMAS", {})
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
@@ -0,0 +1,33 @@
+"""
+Custom field lookups.
+
+`UpperPrefix` (``field__iprefix="ab"``) is a case-insensitive "starts with"
+that an index on ``Upper(field)`` can serve. ``istartswith`` compiles to a
+``LIKE`` (on PostgreSQL around ``UPPER()``), which SQLite never runs on an
+index and PostgreSQL only with ``*_pattern_ops``; a range on
+``UPPER(field)`` uses a plain B-tree index on every backend. The admin
+searches use it (``search_fields = ("email__iprefix", ...)``).
+
+Matching follows code point order, which is exact with SQLite's BINARY and
+PostgreSQL's "C" collation.
+"""
+from django.db.models import CharField, Lookup
+from django.db.models.functions import Upper
+
+
+# Sorts after every character, so ``prefix + LAST`` bounds all strings
+# that start with ``prefix``
+LAST = "\U0010ffff"
+
+
+@CharField.register_lookup
+class UpperPrefix(Lookup):
+    lookup_name = "iprefix"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = compiler.compile(Upper(self.lhs))
+        prefix = str(self.rhs)
+        return (
+            f"{lhs} >= UPPER(%s) AND {lhs} < UPPER(%s)",
+            [*lhs_params, prefix, *lhs_params, prefix + LAST],
+        )
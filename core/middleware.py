@@ -0,0 +1,208 @@
+"""
+Project-wide middleware.
+"""
+import hashlib
+import random
+import sys
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.handlers.exception import convert_exception_to_response
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.module_loading import import_string
+
+from core import batch, profiling, routers
+
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def _client_key(request):
+    """
+    Identify the client for read-your-writes stickiness.
+
+    The API authenticates with `Authorization: Token ...`, which is available
+    here without a database lookup. The header is hashed so no credentials
+    end up in the cache.
+    """
+    ident = (
+        request.META.get("HTTP_AUTHORIZATION")
+        or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        or request.META.get("REMOTE_ADDR")
+    )
+    if not ident:
+        return None
+    return "db-sticky:" + hashlib.sha256(ident.encode()).hexdigest()
+
+
+def _is_write(request):
+    return request.method not in SAFE_METHODS and not batch.is_read_only(request)
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Let safe-method requests read from the replica.
+
+    Unsafe requests (POST, PATCH, DELETE, ...) read from the primary and pin
+    the client to it for ``REPLICA_STICKY_SECONDS``, so a client always sees
+    its own writes even while the replica is lagging behind. A batch of
+    reads (``POST /api/batch/`` with safe sub-requests only) is a read.
+
+    Works in sync (WSGI) and async (ASGI) chains.
+    """
+    sync_capable  = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode   = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not routers.replica_configured():
+            return self.get_response(request)
+
+        key         = _client_key(request)
+        is_write    = _is_write(request)
+        use_primary = is_write or (key is not None and cache.get(key) is not None)
+
+        token = routers.use_primary_for_reads(use_primary)
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.reset_read_routing(token)
+
+        if is_write and key is not None:
+            cache.set(key, 1, settings.REPLICA_STICKY_SECONDS)
+        return response
+
+    async def __acall__(self, request):
+        if not routers.replica_configured():
+            return await self.get_response(request)
+
+        key         = _client_key(request)
+        is_write    = _is_write(request)
+        use_primary = is_write or (key is not None and await cache.aget(key) is not None)
+
+        token = routers.use_primary_for_reads(use_primary)
+        try:
+            response = await self.get_response(request)
+        finally:
+            routers.reset_read_routing(token)
+
+        if is_write and key is not None:
+            await cache.aset(key, 1, settings.REPLICA_STICKY_SECONDS)
+        return response
+
+
+class RateLimitHeadersMiddleware(MiddlewareMixin):
+    """
+    Report the tightest rate-limit budget recorded by the throttles in
+    core.throttling as ``X-RateLimit-Limit/-Remaining/-Reset`` headers.
+    """
+
+    def process_response(self, request, response):
+        budget = getattr(request, "rate_limit", None)
+        if budget is not None:
+            limit, remaining, reset = budget
+            response["X-RateLimit-Limit"]     = str(limit)
+            response["X-RateLimit-Remaining"] = str(remaining)
+            response["X-RateLimit-Reset"]     = str(reset)
+        return response
+
+
+class BrowserOnlyMiddleware:
+    """
+    Run ``BROWSER_MIDDLEWARE`` (sessions, CSRF, messages, ...) only for
+    requests outside ``API_PATH_PREFIX``; API requests skip the whole chain.
+
+    The wrapped middleware may hook into ``process_view`` (as CSRF does);
+    ``process_template_response`` and ``process_exception`` are not routed.
+    """
+    sync_capable  = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode   = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            self.process_view = self._aprocess_view
+
+        # Same construction as django.core.handlers.base.load_middleware
+        handler, self.view_hooks = get_response, []
+        for path in reversed(settings.BROWSER_MIDDLEWARE):
+            instance = import_string(path)(handler)
+            for hook in ("process_template_response", "process_exception"):
+                if hasattr(instance, hook):
+                    raise ImproperlyConfigured(f"{path}.{hook} is not supported in BROWSER_MIDDLEWARE.")
+            if hasattr(instance, "process_view"):
+                self.view_hooks.insert(0, instance.process_view)
+            handler = convert_exception_to_response(instance)
+        self.browser_chain = handler
+
+    def _is_api(self, request):
+        return request.path_info.startswith(settings.API_PATH_PREFIX)
+
+    def __call__(self, request):
+        if self._is_api(request):
+            return self.get_response(request)
+        return self.browser_chain(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if self._is_api(request):
+            return None
+        for hook in self.view_hooks:
+            response = hook(request, view_func, view_args, view_kwargs)
+            if response is not None:
+                return response
+        return None
+
+    async def _aprocess_view(self, request, view_func, view_args, view_kwargs):
+        # API requests return without the thread hop Django would add for a
+        # sync process_view in an async chain
+        if self._is_api(request):
+            return None
+        return await sync_to_async(BrowserOnlyMiddleware.process_view)(
+            self, request, view_func, view_args, view_kwargs,
+        )
+
+
+class ProfilingMiddleware:
+    """
+    Sample the stacks of a fraction of the requests and keep the profiles of
+    the sampled and the slow ones, aggregated per view (see core.profiling).
+
+    Only added to MIDDLEWARE when profiling is configured. It profiles the
+    thread that runs the sync chain, so under ASGI the async views are not
+    visible in the profiles.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sampled = random.random() < settings.PROFILE_SAMPLE_RATE
+        slow_ms = settings.PROFILE_SLOW_MS
+        if not sampled and not slow_ms:
+            return self.get_response(request)
+
+        sampler = profiling.sampler()
+        started = time.perf_counter()
+        sampler.start(sys._getframe())
+        try:
+            response = self.get_response(request)
+        finally:
+            stacks = sampler.stop()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        if sampled or (slow_ms and elapsed_ms >= slow_ms):
+            match = request.resolver_match
+            profiling.record(match.view_name if match else "unresolved", stacks)
+        return response
@@ -0,0 +1,50 @@
+"""
+Warm a worker before it serves traffic.
+
+Called at the end of core/wsgi.py and core/asgi.py (``KANMIND_PRELOAD=0``
+turns it off). With a pre-forking server (``gunicorn --preload``) the work is
+done once in the master and shared by all workers through copy-on-write;
+otherwise it moves the cost out of the first request of each worker.
+
+- imports the API views and serializers and builds the serializer fields
+- populates the URL resolver (and the async view table)
+- checks that every database can be reached, which also imports the
+  backends; this is not a warm-up: the connections are closed again, since
+  sockets must not be shared with forked workers, and the first request of
+  each worker still opens its own
+"""
+import logging
+import time
+
+from django.db import connections
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+
+def _warm_serializers():
+    from kanban_app.api import serializers as kanban
+    from auth_app.api import serializers as auth
+
+    for module in (kanban, auth):
+        for name in dir(module):
+            cls = getattr(module, name)
+            if isinstance(cls, type) and name.endswith("Serializer") and cls.__module__ == module.__name__:
+                try:
+                    cls().fields
+                except Exception:  # needs context to build; imported at least
+                    pass
+
+
+def _check_databases():
+    for alias in connections:
+        connections[alias].ensure_connection()
+    connections.close_all()
+
+
+def warm():
+    started = time.perf_counter()
+    get_resolver().reverse_dict  # imports every view module and compiles the patterns
+    _warm_serializers()
+    _check_databases()
+    logger.info("Preloaded worker in %.0f ms", (time.perf_counter() - started) * 1000)
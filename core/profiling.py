@@ -0,0 +1,182 @@
+"""
+Sampling profiler for slow API requests.
+
+`core.middleware.ProfilingMiddleware` profiles a fraction of the requests
+(``PROFILE_SAMPLE_RATE``) and keeps the profile of every request slower than
+``PROFILE_SLOW_MS``. While a request is profiled, one background thread per
+process reads the stack of the request's thread every
+``PROFILE_INTERVAL_MS`` via ``sys._current_frames()``; the request itself
+runs untouched (no tracing hooks), so the overhead is that of the sampler
+thread.
+
+Samples are kept per view in "collapsed stack" form, one
+``frame;frame;frame count`` line per distinct stack of a request, appended
+to ``PROFILE_DIR/<view>.<pid>.folded`` — the input format of flamegraph.pl
+and speedscope, which add up repeated stacks. ``GET /api/profiles/`` (staff only) summarises the hottest
+functions across all files.
+"""
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}:{code.co_qualname}"
+
+
+def _collapse(frame, root):
+    """The stack from ``root`` (exclusive) down to ``frame``, root first."""
+    labels = []
+    while frame is not None and frame is not root:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class Sampler:
+    """Samples the stacks of the threads registered with `start`."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._active  = {}  # thread id -> (root frame, Counter of stacks)
+        self._lock    = threading.Lock()
+        self._wakeup  = threading.Event()
+        self._thread  = None
+
+    def start(self, root):
+        """Sample the calling thread below the frame ``root``."""
+        with self._lock:
+            self._active[threading.get_ident()] = (root, Counter())
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def stop(self):
+        """
+        Stop sampling the calling thread and return its stack counts. The
+        sampler only counts under the lock, so they no longer change.
+        """
+        with self._lock:
+            _, stacks = self._active.pop(threading.get_ident(), (None, Counter()))
+        return stacks
+
+    def _run(self):
+        while True:
+            with self._lock:
+                targets = dict(self._active)
+                if not targets:
+                    self._wakeup.clear()
+            if not targets:
+                self._wakeup.wait()
+                continue
+            frames  = sys._current_frames()
+            samples = [
+                (ident, stacks, _collapse(frames[ident], root))
+                for ident, (root, stacks) in targets.items() if ident in frames
+            ]
+            del frames
+            with self._lock:
+                for ident, stacks, stack in samples:
+                    # Skip threads that stopped while their stack was read
+                    if self._active.get(ident, (None, None))[1] is stacks:
+                        stacks[stack] += 1
+            time.sleep(self.interval)
+
+
+_sampler    = None
+_write_lock = threading.Lock()
+
+
+def sampler():
+    global _sampler
+    if _sampler is None:
+        _sampler = Sampler(settings.PROFILE_INTERVAL_MS / 1000)
+    return _sampler
+
+
+def _profile_dir():
+    return Path(settings.PROFILE_DIR)
+
+
+def record(view_name, stacks):
+    """Append a request's samples to the view's profile file."""
+    if not stacks:
+        return
+    name  = re.sub(r"[^\w.-]", "_", view_name)
+    lines = "".join(f"{stack} {count}\n" for stack, count in stacks.items())
+    directory = _profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    # One write per request; the lock keeps threads' lines apart
+    with _write_lock, open(directory / f"{name}.{os.getpid()}.folded", "a") as file:
+        file.write(lines)
+
+
+def load():
+    """Merge the profile files of all processes: {view: Counter of stacks}."""
+    merged = defaultdict(Counter)
+    directory = _profile_dir()
+    if not directory.is_dir():
+        return merged
+    for path in directory.glob("*.folded"):
+        view = path.name.rsplit(".", 2)[0]
+        for line in path.read_text().splitlines():
+            stack, _, count = line.rpartition(" ")
+            if stack and count.isdigit():
+                merged[view][stack] += int(count)
+    return merged
+
+
+def hot_functions(stacks, limit):
+    """
+    Top ``limit`` functions by samples: ``self`` counts samples where the
+    function was running, ``total`` those where it was anywhere on the stack.
+    """
+    own, total = Counter(), Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(";")
+        own[frames[-1]] += count
+        for frame in set(frames):
+            total[frame] += count
+    rows = [
+        {"function": function, "self": own[function], "total": total[function]}
+        for function in total
+    ]
+    rows.sort(key=lambda row: (row["self"], row["total"]), reverse=True)
+    return rows[:limit]
+
+
+class ProfileSummaryView(APIView):
+    """
+    Hottest functions per profiled view (staff only).
+    GET /api/profiles/?view=<view name>&limit=20
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        try:
+            limit = min(max(int(request.query_params.get("limit", 20)), 1), 200)
+        except ValueError:
+            limit = 20
+        only = request.query_params.get("view")
+
+        views = []
+        for view, stacks in sorted(load().items()):
+            if only and view != only:
+                continue
+            views.append({
+                "view":    view,
+                "samples": sum(stacks.values()),
+                "top":     hot_functions(stacks, limit),
+            })
+        return Response({"interval_ms": settings.PROFILE_INTERVAL_MS, "views": views})
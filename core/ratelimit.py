@@ -0,0 +1,147 @@
+"""
+Token-bucket rate limiting.
+
+A bucket holds up to ``capacity`` tokens and refills at ``rate`` tokens per
+second; each request takes one. Bursts up to the capacity pass, sustained
+traffic is limited to the refill rate. Rates are written like DRF rates:
+``"10/min"`` means a capacity of 10 that refills completely in one minute.
+
+Bucket state lives in a store:
+
+* `CacheStore` keeps it in Django's cache, shared by all processes that use
+  the same cache backend. Every update is a single atomic ``incr``, so
+  concurrent processes never let extra requests through (with Redis,
+  Memcached or the local-memory cache; the database and file caches do not
+  increment atomically).
+* `LocalStore` keeps it in a dict in process memory, shared by all threads
+  of the process. There is no I/O, so a check costs about a microsecond, but
+  every process enforces its own budget.
+"""
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+PERIODS = {"s": 1, "sec": 1, "m": 60, "min": 60, "h": 3600, "hour": 3600, "d": 86400, "day": 86400}
+
+
+def parse_rate(rate):
+    """``"10/min"`` -> ``(10, 10 / 60)``: capacity and tokens per second."""
+    num, period = rate.split("/")
+    capacity = int(num)
+    return capacity, capacity / PERIODS[period]
+
+
+def _take(state, capacity, refill, now, tokens):
+    """Refill ``state = (level, stamp)`` up to ``now`` and try to take tokens."""
+    level, stamp = state
+    level = min(capacity, level + (now - stamp) * refill)
+    allowed = level >= tokens
+    if allowed:
+        level -= tokens
+    return allowed, level
+
+
+class LocalStore:
+    """Bucket state in process memory."""
+
+    def __init__(self, max_keys=100_000):
+        self._lock     = threading.Lock()
+        self._buckets  = {}
+        self._max_keys = max_keys
+
+    def take(self, key, capacity, refill, ttl, tokens):
+        now = time.monotonic()
+        with self._lock:
+            state = self._buckets.get(key)
+            if state is None:
+                if len(self._buckets) >= self._max_keys:
+                    self._buckets.clear()  # crude bound; buckets simply start full again
+                state = (capacity, now)
+            allowed, level = _take(state, capacity, refill, now, tokens)
+            self._buckets[key] = (level, now)
+        return allowed, level
+
+
+class CacheStore:
+    """
+    Bucket state in Django's cache, as one integer per bucket: the tokens
+    taken from it, counted in thousandths and starting from the tokens
+    earned since the epoch. The level is then ``capacity + earned - taken``
+    and a request takes its tokens with one ``incr``; a request the bucket
+    cannot serve gives them back with ``decr``.
+
+    A bucket's key expires when the bucket would be full again, and the next
+    request starts a new, full one. Credit beyond the capacity, which builds
+    up at most until the key expires (one second of refill), is dropped.
+    """
+    SCALE = 1000
+
+    def __init__(self, backend=None):
+        self.cache = backend or cache
+
+    def take(self, key, capacity, refill, ttl, tokens):
+        now    = time.time()  # wall clock: the bucket is shared by processes
+        earned = round(now * refill * self.SCALE)
+        full   = capacity * self.SCALE
+        need   = round(tokens * self.SCALE)
+
+        try:
+            taken = self.cache.incr(key, need)
+        except ValueError:
+            # No bucket yet (or it expired full): start a full one
+            if self.cache.add(key, earned + need, ttl):
+                taken = earned + need
+            else:
+                taken = self.cache.incr(key, need)
+
+        level = full + earned - (taken - need)  # before this request
+        if level > full:
+            self.cache.incr(key, level - full)
+            level = full
+        allowed = level >= need
+        if allowed:
+            level -= need
+        else:
+            self.cache.decr(key, need)
+        # Expire the key once the bucket has refilled
+        self.cache.touch(key, max(1, math.ceil((full - level) / (refill * self.SCALE))))
+        return allowed, level / self.SCALE
+
+
+_local_store = LocalStore()
+
+
+def default_store():
+    """The store selected by ``RATE_LIMIT_STORE`` (``cache`` or ``local``)."""
+    if getattr(settings, "RATE_LIMIT_STORE", "cache") == "local":
+        return _local_store
+    return CacheStore()
+
+
+class TokenBucket:
+    """A family of token buckets with the same rate, one per key."""
+
+    def __init__(self, prefix, rate, store=None):
+        self.prefix = prefix
+        self.rate   = rate
+        self.capacity, self.refill = parse_rate(rate)
+        self.store  = store or default_store()
+        # Keep idle buckets only until they would be full again
+        self.ttl = int(self.capacity / self.refill) + 1
+
+    def consume(self, key, tokens=1):
+        """
+        Take ``tokens`` from the bucket of ``key``.
+
+        Returns ``(allowed, remaining, retry_after)``: whole tokens left and
+        seconds until enough tokens are available again (0 when allowed).
+        """
+        allowed, level = self.store.take(
+            f"{self.prefix}:{key}", self.capacity, self.refill, self.ttl, tokens,
+        )
+        retry_after = 0.0 if allowed else (tokens - level) / self.refill
+        return allowed, int(level), retry_after
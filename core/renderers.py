@@ -0,0 +1,53 @@
+"""
+Compact binary encodings of the API responses.
+
+Clients that send ``Accept: application/msgpack`` (MessagePack) or
+``Accept: application/cbor`` (CBOR) get the same serializer data as the JSON
+clients, encoded in binary: numbers and short strings take fewer bytes and
+nothing needs escaping. Each renderer is only offered (``settings.
+REST_FRAMEWORK``) when its optional package is installed — ``msgpack``
+resp. ``cbor2``; without it such requests are answered with ``406 Not
+Acceptable``.
+
+Values without a binary counterpart (dates, decimals, UUIDs, lazy strings)
+are converted exactly as the JSON renderer converts them.
+"""
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:  # optional dependency
+    cbor2 = None
+
+
+_plain = JSONEncoder().default
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type   = "application/msgpack"
+    format       = "msgpack"
+    charset      = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=_plain)
+
+
+class CBORRenderer(BaseRenderer):
+    media_type   = "application/cbor"
+    format       = "cbor"
+    charset      = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return cbor2.dumps(data, default=lambda encoder, value: encoder.encode(_plain(value)))
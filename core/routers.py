@@ -0,0 +1,143 @@
+"""
+Database routers for the project.
+
+`PrimaryReplicaRouter` sends writes to the primary (``default``) database and
+reads to the ``replica`` alias, but only while the current request allowed it.
+The decision is taken per request by `core.middleware.ReplicaRoutingMiddleware`;
+everything outside a request (shell, management commands, migrations) keeps
+reading from the primary, and so do reads inside a transaction on the
+primary, which have to see its uncommitted writes.
+
+`BoardShardRouter` comes first and only answers for board data: with shards
+configured (``settings.SHARDS``), boards and the rows that belong to them
+go to the shard pinned for the current context by `kanban_app.sharding`.
+Users are a reference table copied to every shard, so board queries can
+still join them there.
+"""
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+
+PRIMARY_ALIAS = "default"
+REPLICA_ALIAS = "replica"
+
+# Models stored on the shard of their board
+SHARDED_MODELS = {
+    "kanban_app.board",
+    "kanban_app.board_members",
+    "kanban_app.task",
+    "kanban_app.comment",
+    "kanban_app.reminder",
+    "kanban_app.remindersweep",
+    "kanban_app.activity",
+    "kanban_app.statustransition",
+    "kanban_app.boarddailystats",
+}
+# Kept on the primary and copied to every shard
+REPLICATED_MODELS = {"auth_app.customuser"}
+
+# True -> reads go to the primary. Context variables work for threads and
+# for async tasks alike, so WSGI and ASGI workers are both covered.
+_read_from_primary: ContextVar[bool] = ContextVar("read_from_primary", default=True)
+
+
+def use_primary_for_reads(value: bool = True):
+    """Pin reads of the current context to the primary (or release them)."""
+    return _read_from_primary.set(value)
+
+
+def reset_read_routing(token) -> None:
+    """Restore the routing state saved by `use_primary_for_reads`."""
+    _read_from_primary.reset(token)
+
+
+def replica_configured() -> bool:
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+# Shard holding the board data of the current context (None = not pinned)
+_shard: ContextVar[str | None] = ContextVar("shard", default=None)
+
+
+def pin_shard(alias):
+    """Route board data of the current context to ``alias`` (None unpins)."""
+    return _shard.set(alias)
+
+
+def unpin_shard(token) -> None:
+    """Restore the shard saved by `pin_shard`."""
+    _shard.reset(token)
+
+
+def pinned_shard():
+    return _shard.get()
+
+
+def sharding_enabled() -> bool:
+    return len(settings.SHARDS) > 1
+
+
+class PrimaryReplicaRouter:
+    """Route reads to the replica when allowed, writes always to the primary."""
+
+    def db_for_read(self, model, **hints):
+        if _read_from_primary.get() or not replica_configured():
+            return PRIMARY_ALIAS
+        if connections[PRIMARY_ALIAS].in_atomic_block:
+            return PRIMARY_ALIAS
+        return REPLICA_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primary and replica hold the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # A real replica gets its schema through replication; migrating it
+        # explicitly (e.g. a local SQLite stand-in) is still allowed.
+        return None
+
+
+class BoardShardRouter:
+    """
+    Send board data to the pinned shard, or to the shard of the instance it
+    is reached from (``board.tasks``, ``task.comments``, ``board.members``).
+    Answers nothing while sharding is off, so the routers below decide.
+    """
+
+    def _shard_for(self, model, hints):
+        if not sharding_enabled():
+            return None
+        label    = model._meta.label_lower
+        instance = hints.get("instance")
+        if instance is not None and instance._meta.label_lower in SHARDED_MODELS:
+            db = instance._state.db
+            if db in settings.SHARDS and label in SHARDED_MODELS | REPLICATED_MODELS:
+                return db
+        if label in SHARDED_MODELS:
+            return _shard.get() or PRIMARY_ALIAS
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._shard_for(model, hints)
+
+    def db_for_write(self, model, **hints):
+        if model._meta.label_lower in REPLICATED_MODELS:
+            # Written on the primary, copied by kanban_app.sharding
+            return None
+        return self._shard_for(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == PRIMARY_ALIAS or db not in settings.SHARDS:
+            return None
+        # Shards get every table, so that deleting a user cascades there as
+        # on the primary; only the sharded ones hold rows. Data migrations
+        # (no model) only run on the primary.
+        return model_name is not None
@@ -10,8 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+from importlib.util import find_spec
 from pathlib import Path
 
+from core.database import database_from_env, sqlite_pragmas_from_env
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -28,6 +32,11 @@ DEBUG = True
 ALLOWED_HOSTS = []
 
 
+# Deployment profile: 'full' (API + admin) or 'api' (API only). The API
+# profile leaves out the admin and the message framework, which the
+# token-authenticated API never uses, so workers import and check less.
+KANMIND_PROFILE = os.environ.get('KANMIND_PROFILE', 'full')
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -43,17 +52,51 @@ INSTALLED_APPS = [
     'auth_app',
     'kanban_app',
 ]
+ADMIN_ONLY_APPS = ['django.contrib.admin', 'django.contrib.messages']
+if KANMIND_PROFILE == 'api':
+    INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in ADMIN_ONLY_APPS]
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',      # muss ganz oben stehen
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
+    'core.middleware.RateLimitHeadersMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'core.middleware.BrowserOnlyMiddleware',
+    'kanban_app.middleware.IdempotencyMiddleware',
+    'kanban_app.middleware.ShardWritesMiddleware',
+    'kanban_app.middleware.ActivityMiddleware',
+]
+
+# Run by core.middleware.BrowserOnlyMiddleware for everything outside
+# API_PATH_PREFIX (admin, browsable API). The API authenticates with tokens
+# and needs no sessions, CSRF cookies, messages or frame headers.
+API_PATH_PREFIX    = '/api/'
+BROWSER_MIDDLEWARE = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
+if KANMIND_PROFILE == 'api':
+    BROWSER_MIDDLEWARE.remove('django.contrib.messages.middleware.MessageMiddleware')
+
+# Sampling profiler (core.profiling): profile this fraction of requests,
+# and/or keep the profile of every request slower than PROFILE_SLOW_MS.
+# Collapsed stacks per view go to PROFILE_DIR; GET /api/profiles/ (staff)
+# lists the hottest functions. Off unless one of the two is set.
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_SLOW_MS     = float(os.environ.get('PROFILE_SLOW_MS', 0))
+PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', 5))
+PROFILE_DIR         = os.environ.get('PROFILE_DIR', BASE_DIR / 'profiles')
+if PROFILE_SAMPLE_RATE or PROFILE_SLOW_MS:
+    MIDDLEWARE.insert(MIDDLEWARE.index('core.middleware.BrowserOnlyMiddleware'),
+                      'core.middleware.ProfilingMiddleware')
+
+# The admin checks look for these middleware in MIDDLEWARE only; they run
+# for the admin from BROWSER_MIDDLEWARE.
+SILENCED_SYSTEM_CHECKS = ['admin.E408', 'admin.E409', 'admin.E410']
 
 ROOT_URLCONF = 'core.urls'
 
@@ -66,26 +109,95 @@ TEMPLATES = [
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
-                'django.contrib.messages.context_processors.messages',
-            ],
+            ] + (
+                ['django.contrib.messages.context_processors.messages']
+                if 'django.contrib.messages' in INSTALLED_APPS else []
+            ),
         },
     },
 ]
 
 WSGI_APPLICATION = 'core.wsgi.application'
 
+# Serve the hot read endpoints with async views (kanban_app/api/async_views.py).
+# core/asgi.py switches this on; under WSGI the sync DRF views are used.
+ASYNC_READ_VIEWS = os.environ.get('KANMIND_ASYNC_VIEWS', '0') == '1'
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
 DATABASES = {
+    'default': database_from_env('DB', default_name=BASE_DIR / 'db.sqlite3'),
+}
+
+# Optional read replica, configured through DB_REPLICA_* variables. Safe-method
+# API requests read from it, writes and everything outside a request use the
+# primary ('default').
+# Locally two SQLite files can stand in for primary and replica:
+#   DB_REPLICA_NAME=db.replica.sqlite3
+# In tests the replica mirrors the test database. TestCase runs every test in
+# a transaction on the primary, so its reads stay there (core.routers); tests
+# that read through the replica need TransactionTestCase.
+if os.environ.get('DB_REPLICA_NAME'):
+    DATABASES['replica'] = database_from_env('DB_REPLICA')
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+# Board shards (kanban_app.sharding): DB_SHARDS names further databases,
+# each configured like the primary through DB_<NAME>_* variables (by default
+# the local SQLite file db.<name>.sqlite3). Boards with their tasks and
+# comments live on one of 'default' and these shards; users are copied to
+# all of them. Without DB_SHARDS everything stays on 'default'.
+#   DB_SHARDS=shard1,shard2
+SHARDS = ['default']
+for _shard in filter(None, os.environ.get('DB_SHARDS', '').split(',')):
+    DATABASES[_shard] = database_from_env(
+        f'DB_{_shard.upper()}', default_name=BASE_DIR / f'db.{_shard}.sqlite3',
+    )
+    SHARDS.append(_shard)
+
+# Applied to every SQLite connection by core.database.apply_sqlite_pragmas.
+SQLITE_PRAGMAS = sqlite_pragmas_from_env()
+
+DATABASE_ROUTERS = ['core.routers.BoardShardRouter', 'core.routers.PrimaryReplicaRouter']
+
+# Seconds a process trusts its cached board -> shard lookups; threads that
+# query all shards at once for per-user lists (0 = one after the other);
+# seconds move_board waits at most for the writes in progress to finish.
+SHARD_DIRECTORY_TTL      = float(os.environ.get('SHARD_DIRECTORY_TTL', 5))
+SHARD_FANOUT_WORKERS     = int(os.environ.get('SHARD_FANOUT_WORKERS', 8))
+SHARD_MOVE_DRAIN_SECONDS = float(os.environ.get('SHARD_MOVE_DRAIN_SECONDS', 30))
+
+# After a write, the client keeps reading from the primary for this many
+# seconds so it always sees its own changes (read-your-writes).
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+
+
+# Cache (rate limits and other shared state). Local memory by default;
+# use a shared backend in production, e.g.
+#   CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+#   CACHE_LOCATION=redis://127.0.0.1:6379
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND':  os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
     }
 }
 
 
+# Password hashing
+# The first hasher hashes new passwords; the others still verify existing
+# ones, which are rehashed with the first hasher on the next login.
+# Comma-separated override, e.g. PASSWORD_HASHERS=django.contrib.auth.hashers.ScryptPasswordHasher,...
+PASSWORD_HASHERS = os.environ.get('PASSWORD_HASHERS', ','.join([
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+])).split(',')
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -133,11 +245,133 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'auth_app.CustomUser'
 
 
+# Binary response encodings (core.renderers), offered to clients that ask
+# for them via Accept when the optional package is installed.
+BINARY_RENDERER_CLASSES = [
+    renderer for package, renderer in [
+        ('msgpack', 'core.renderers.MessagePackRenderer'),
+        ('cbor2',   'core.renderers.CBORRenderer'),
+    ]
+    if find_spec(package)
+]
+
 # REST framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.TokenAuthentication',
-    ]
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+        *BINARY_RENDERER_CLASSES,
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'core.throttling.UserRateThrottle',
+        'core.throttling.EndpointRateThrottle',
+    ],
+    # Proxies in front of the app that append to X-Forwarded-For. Unset, the
+    # throttles key clients on REMOTE_ADDR and ignore the header, which any
+    # client can set.
+    'NUM_PROXIES': int(os.environ['NUM_PROXIES']) if os.environ.get('NUM_PROXIES') else None,
+}
+
+# API rate limits (core.throttling): token buckets per user (anonymous
+# clients per IP) across the API, and per user and endpoint (URL name).
+API_THROTTLE_RATES = {
+    'user': os.environ.get('API_THROTTLE_USER', '600/min'),
+    'anon': os.environ.get('API_THROTTLE_ANON', '60/min'),
+}
+ENDPOINT_THROTTLE_RATES = {
+    'task-list-create':  '120/min',
+    'board-list-create': '120/min',
+    'board-detail':      '120/min',
+}
+# POST /api/batch/ (core.batch): sub-requests per batch, total cost
+# (GET = 1, writes = 2) and threads for parallel read-only batches
+BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', 20))
+BATCH_MAX_COST     = int(os.environ.get('BATCH_MAX_COST', 30))
+BATCH_MAX_WORKERS  = int(os.environ.get('BATCH_MAX_WORKERS', 4))
+# Service accounts (emails) that are never throttled
+THROTTLE_BYPASS_USERS = [
+    email for email in os.environ.get('THROTTLE_BYPASS_USERS', '').split(',') if email
+]
+# Where bucket state lives: 'cache' (shared by all processes using the cache)
+# or 'local' (process memory, no I/O, budget enforced per process)
+RATE_LIMIT_STORE = os.environ.get('RATE_LIMIT_STORE', 'cache')
+
+
+# Background jobs (kanban_app.jobs, python manage.py run_worker)
+JOB_MAX_ATTEMPTS      = int(os.environ.get('JOB_MAX_ATTEMPTS', 5))
+JOB_RETRY_BACKOFF     = float(os.environ.get('JOB_RETRY_BACKOFF', 10))    # seconds, doubled per attempt
+JOB_RETRY_BACKOFF_MAX = float(os.environ.get('JOB_RETRY_BACKOFF_MAX', 3600))
+JOB_LOCK_TIMEOUT      = int(os.environ.get('JOB_LOCK_TIMEOUT', 600))      # running jobs older than this are re-claimed
+
+# Maintenance jobs the workers enqueue themselves: name -> seconds between
+# runs. Set to {} to run the management commands from cron instead.
+PERIODIC_JOBS = {
+    'send_due_reminders':     3600,
+    'archive_done_tasks':     86400,
+    'purge_idempotency_keys': 86400,
+}
+
+# Due-date reminders (kanban_app.reminders, python manage.py send_due_reminders)
+REMINDER_LEAD_DAYS  = int(os.environ.get('REMINDER_LEAD_DAYS', 1))      # "due soon" = due within this many days
+REMINDER_BATCH_SIZE = int(os.environ.get('REMINDER_BATCH_SIZE', 1000))
+
+# Reminder mails go to the console unless another backend is configured,
+# e.g. EMAIL_BACKEND=django.core.mail.backends.filebased.EmailBackend.
+EMAIL_BACKEND      = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+EMAIL_FILE_PATH    = os.environ.get('EMAIL_FILE_PATH', BASE_DIR / 'sent_emails')
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'noreply@kanmind.local')
+
+# Card rank keys longer than this trigger a background rebalance of the
+# column (kanban_app.ranking).
+TASK_POSITION_MAX_LENGTH = int(os.environ.get('TASK_POSITION_MAX_LENGTH', 16))
+
+# Rows removed per DELETE when purging a deleted board.
+BOARD_PURGE_BATCH_SIZE = int(os.environ.get('BOARD_PURGE_BATCH_SIZE', 1000))
+
+# Tasks done for longer than this many days are archived (hidden unless
+# ?include_archived=1) by the archive_done_tasks job/command, in batches.
+TASK_ARCHIVE_AFTER_DAYS = int(os.environ.get('TASK_ARCHIVE_AFTER_DAYS', 90))
+TASK_ARCHIVE_BATCH_SIZE = int(os.environ.get('TASK_ARCHIVE_BATCH_SIZE', 1000))
+
+# Admin changelists count at most this many rows; larger unfiltered tables
+# show the database's row estimate (core.pagination).
+ADMIN_COUNT_LIMIT = int(os.environ.get('ADMIN_COUNT_LIMIT', 10000))
+
+# Concurrent identical board reads are built once per process
+# (core.singleflight). SINGLEFLIGHT_SHARED also hands results to other
+# processes through the cache, where they stay SINGLEFLIGHT_SHARED_TTL
+# seconds; waiters give up and compute themselves after SINGLEFLIGHT_TIMEOUT.
+SINGLEFLIGHT_SHARED     = os.environ.get('SINGLEFLIGHT_SHARED', '0') == '1'
+SINGLEFLIGHT_SHARED_TTL = float(os.environ.get('SINGLEFLIGHT_SHARED_TTL', 1))
+SINGLEFLIGHT_TIMEOUT    = float(os.environ.get('SINGLEFLIGHT_TIMEOUT', 10))
+
+# Seconds a user's dashboard summary (GET /api/summary/) stays cached;
+# changes to their tasks and boards drop it earlier (kanban_app.summary).
+SUMMARY_CACHE_SECONDS = int(os.environ.get('SUMMARY_CACHE_SECONDS', 300))
+
+# Status transitions folded into the daily board stats per rollup batch
+# (kanban_app.analytics).
+ANALYTICS_ROLLUP_BATCH_SIZE = int(os.environ.get('ANALYTICS_ROLLUP_BATCH_SIZE', 1000))
+
+# Idempotency-Key on the create endpoints (kanban_app.idempotency)
+IDEMPOTENCY_KEY_TTL      = int(os.environ.get('IDEMPOTENCY_KEY_TTL', 86400))     # seconds a key is remembered
+IDEMPOTENCY_WAIT_TIMEOUT = float(os.environ.get('IDEMPOTENCY_WAIT_TIMEOUT', 10)) # a duplicate waits this long for the first request
+IDEMPOTENCY_LOCK_TIMEOUT = int(os.environ.get('IDEMPOTENCY_LOCK_TIMEOUT', 60))   # unfinished keys older than this are taken over
+
+
+# In-memory user directory (auth_app.directory): how often a process checks
+# for user changes made elsewhere, and how long unknown emails are remembered.
+USER_DIRECTORY_CHECK_SECONDS = float(os.environ.get('USER_DIRECTORY_CHECK_SECONDS', 5))
+USER_DIRECTORY_MISS_TTL      = float(os.environ.get('USER_DIRECTORY_MISS_TTL', 30))
+
+# Login throttling: token buckets per client IP and per email address,
+# checked before any password hash is computed.
+LOGIN_THROTTLE_RATES = {
+    'ip':    os.environ.get('LOGIN_THROTTLE_IP', '30/min'),
+    'email': os.environ.get('LOGIN_THROTTLE_EMAIL', '10/min'),
 }
 
 
@@ -0,0 +1,185 @@
+"""
+Request coalescing ("single flight") for expensive identical reads.
+
+When many clients ask for the same payload at the same moment (e.g. every
+member refetching a board right after it changed), only the first request
+computes it; the others wait for that computation and reuse its result, the
+rendered bytes. Waiting happens per process, for threads (`SingleFlight.do`)
+and for coroutines on the event loop (`SingleFlight.ado`).
+
+With ``SINGLEFLIGHT_SHARED`` the result is also handed across processes: the
+first process takes a lock in the cache and publishes the result there for
+``SINGLEFLIGHT_SHARED_TTL`` seconds; other processes poll for it instead of
+computing. Results are shared only between requests that overlap (or follow
+within that TTL), so callers put everything that changes the payload, such
+as object versions, into the key.
+
+If the computation fails or takes longer than ``SINGLEFLIGHT_TIMEOUT``, the
+waiting requests compute the result themselves. ``GET /api/singleflight/``
+(staff only) shows how often requests were coalesced in this process.
+"""
+import asyncio
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+
+POLL_INTERVAL = 0.02
+
+_FAILED = object()
+
+_groups = {}
+
+
+class _Call:
+    def __init__(self):
+        self.event  = threading.Event()
+        self.result = _FAILED
+
+
+class SingleFlight:
+    """A named group of coalesced computations (see module docstring)."""
+
+    def __init__(self, name):
+        self.name     = name
+        self._lock    = threading.Lock()
+        self._calls   = {}   # key -> _Call of the computing thread
+        self._futures = {}   # key -> Future of the computing coroutine
+        self._stats   = Counter()
+        _groups[name] = self
+
+    def _count(self, outcome):
+        with self._lock:
+            self._stats[outcome] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    # ---------- threads ----------
+
+    def do(self, key, compute):
+        """Return ``compute()``, shared with concurrent calls for ``key``."""
+        with self._lock:
+            call   = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.event.wait(settings.SINGLEFLIGHT_TIMEOUT)
+            if call.result is not _FAILED:
+                self._count("coalesced")
+                return call.result
+            self._count("fallback")
+            return compute()
+
+        try:
+            call.result = self._shared(key, compute)
+            return call.result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def _shared(self, key, compute):
+        if not settings.SINGLEFLIGHT_SHARED:
+            self._count("computed")
+            return compute()
+
+        result_key = f"singleflight:{self.name}:{key}"
+        lock_key   = result_key + ":lock"
+        result     = cache.get(result_key)
+        if result is None and not cache.add(lock_key, 1, settings.SINGLEFLIGHT_TIMEOUT):
+            deadline = time.monotonic() + settings.SINGLEFLIGHT_TIMEOUT
+            while result is None and time.monotonic() < deadline:
+                time.sleep(POLL_INTERVAL)
+                result = cache.get(result_key)
+            if result is None:
+                self._count("fallback")
+                return compute()
+        if result is not None:
+            self._count("shared")
+            return result
+
+        try:
+            self._count("computed")
+            result = compute()
+            cache.set(result_key, result, settings.SINGLEFLIGHT_SHARED_TTL)
+            return result
+        finally:
+            cache.delete(lock_key)
+
+    # ---------- coroutines ----------
+
+    async def ado(self, key, compute):
+        """Async `do`: ``await compute()``, shared with concurrent calls for ``key``."""
+        future = self._futures.get(key)
+        if future is not None:
+            try:
+                result = await asyncio.wait_for(asyncio.shield(future), settings.SINGLEFLIGHT_TIMEOUT)
+            except asyncio.TimeoutError:
+                result = _FAILED
+            if result is not _FAILED:
+                self._count("coalesced")
+                return result
+            self._count("fallback")
+            return await compute()
+
+        future = self._futures[key] = asyncio.get_running_loop().create_future()
+        result = _FAILED
+        try:
+            result = await self._ashared(key, compute)
+            return result
+        finally:
+            self._futures.pop(key, None)
+            future.set_result(result)
+
+    async def _ashared(self, key, compute):
+        if not settings.SINGLEFLIGHT_SHARED:
+            self._count("computed")
+            return await compute()
+
+        result_key = f"singleflight:{self.name}:{key}"
+        lock_key   = result_key + ":lock"
+        result     = await cache.aget(result_key)
+        if result is None and not await cache.aadd(lock_key, 1, settings.SINGLEFLIGHT_TIMEOUT):
+            deadline = time.monotonic() + settings.SINGLEFLIGHT_TIMEOUT
+            while result is None and time.monotonic() < deadline:
+                await asyncio.sleep(POLL_INTERVAL)
+                result = await cache.aget(result_key)
+            if result is None:
+                self._count("fallback")
+                return await compute()
+        if result is not None:
+            self._count("shared")
+            return result
+
+        try:
+            self._count("computed")
+            result = await compute()
+            await cache.aset(result_key, result, settings.SINGLEFLIGHT_SHARED_TTL)
+            return result
+        finally:
+            await cache.adelete(lock_key)
+
+
+class SingleFlightStatsView(APIView):
+    """
+    Coalescing counters of this process per group (staff only).
+    GET /api/singleflight/
+
+    ``computed``: requests that built the payload, ``coalesced``: requests
+    that waited for one in this process, ``shared``: results taken from
+    another process, ``fallback``: waits that failed or timed out.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({name: group.stats() for name, group in sorted(_groups.items())})
@@ -0,0 +1,646 @@
+"""
+Tests of the project-wide pieces in core. Run with ``python manage.py test``;
+classes tagged ``benchmark`` print timings (``--exclude-tag benchmark``).
+
+`ReplicaReadTests` needs a replica and is skipped without one; run it with
+two SQLite files standing in for primary and replica:
+
+    DB_REPLICA_NAME=db.replica.sqlite3 python manage.py test core
+"""
+import base64
+import importlib.util
+import os
+import runpy
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib import admin
+from django.core.cache import cache
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings, tag,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import path, resolve
+from django.utils.module_loading import import_string
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.views import APIView
+
+from auth_app.models import CustomUser
+from core import profiling, routers
+from core.batch import BatchView
+from core.ratelimit import CacheStore, TokenBucket
+from core.throttling import EndpointRateThrottle, UserRateThrottle
+from core.database import DEFAULT_SQLITE_PRAGMAS, database_from_env, sqlite_pragmas_from_env
+from core.middleware import BrowserOnlyMiddleware, ReplicaRoutingMiddleware
+
+
+FAST_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+HAS_REPLICA = "replica" in settings.DATABASES
+
+# URLconf of the batch tests: the batch endpoint and two plain sub-requests
+urlpatterns = [
+    path("api/batch/",  BatchView.as_view()),
+    path("api/text/",   lambda request: HttpResponse("héllo", content_type="text/plain; charset=utf-8")),
+    path("api/binary/", lambda request: HttpResponse(b"\x00\xff\xfe", content_type="application/octet-stream")),
+]
+
+
+# ==========================
+# Read replica
+# ==========================
+
+def _read_alias(request):
+    # Users are never sharded, so only the replica router decides
+    return HttpResponse(CustomUser.objects.all().db)
+
+
+async def _aread_alias(request):
+    return _read_alias(request)
+
+
+@mock.patch("core.routers.replica_configured", return_value=True)
+class ReplicaRoutingTests(SimpleTestCase):
+    """Routing decisions of the router and the middleware (no queries run)."""
+
+    def setUp(self):
+        cache.clear()
+        self.factory    = RequestFactory()
+        self.middleware = ReplicaRoutingMiddleware(_read_alias)
+
+    def request(self, method, token="alice", middleware=None, path="/api/boards/", data=None):
+        middleware = middleware or self.middleware
+        request    = getattr(self.factory, method)(
+            path, data, content_type="application/json", HTTP_AUTHORIZATION=f"Token {token}",
+        )
+        if middleware.async_mode:
+            return async_to_sync(middleware)(request).content.decode()
+        return middleware(request).content.decode()
+
+    def test_outside_requests_read_from_primary(self, configured):
+        self.assertEqual(CustomUser.objects.all().db, "default")
+
+    def test_writes_go_to_primary(self, configured):
+        token = routers.use_primary_for_reads(False)
+        try:
+            self.assertEqual(CustomUser.objects.all().db, "replica")
+            self.assertEqual(routers.PrimaryReplicaRouter().db_for_write(CustomUser), "default")
+        finally:
+            routers.reset_read_routing(token)
+
+    def test_transactions_read_from_primary(self, configured):
+        token = routers.use_primary_for_reads(False)
+        try:
+            with mock.patch.object(connections["default"], "in_atomic_block", True):
+                self.assertEqual(CustomUser.objects.all().db, "default")
+        finally:
+            routers.reset_read_routing(token)
+
+    def test_safe_requests_read_from_replica(self, configured):
+        self.assertEqual(self.request("get"), "replica")
+        self.assertEqual(self.request("head"), "replica")
+
+    def test_write_sticks_client_to_primary(self, configured):
+        self.assertEqual(self.request("post"), "default")
+        self.assertEqual(self.request("get"), "default")
+        # Other clients still read from the replica
+        self.assertEqual(self.request("get", token="bob"), "replica")
+
+    @override_settings(REPLICA_STICKY_SECONDS=0)
+    def test_stickiness_expires(self, configured):
+        self.request("patch")
+        self.assertEqual(self.request("get"), "replica")
+
+    def test_batch_of_reads_is_a_read(self, configured):
+        reads = {"requests": [{"method": "GET", "path": "/api/boards/"}]}
+        self.assertEqual(self.request("post", path="/api/batch/", data=reads), "replica")
+        self.assertEqual(self.request("get"), "replica")
+
+        writes = {"requests": [*reads["requests"], {"method": "POST", "path": "/api/boards/"}]}
+        self.assertEqual(self.request("post", path="/api/batch/", data=writes), "default")
+        self.assertEqual(self.request("get"), "default")
+
+    def test_async_chain(self, configured):
+        middleware = ReplicaRoutingMiddleware(_aread_alias)
+        self.assertTrue(middleware.async_mode)
+        self.assertEqual(self.request("get", middleware=middleware), "replica")
+        self.assertEqual(self.request("delete", middleware=middleware), "default")
+        self.assertEqual(self.request("get", middleware=middleware), "default")
+
+    def test_routing_is_reset_after_request(self, configured):
+        self.request("get")
+        self.assertEqual(CustomUser.objects.all().db, "default")
+
+    def test_off_without_replica(self, configured):
+        configured.return_value = False
+        self.assertEqual(self.request("get"), "default")
+
+
+@unittest.skipUnless(HAS_REPLICA, "needs DB_REPLICA_NAME")
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class ReplicaReadTests(TransactionTestCase):
+    """
+    Requests against the two databases. The test replica mirrors the test
+    database, so this needs TransactionTestCase (see core/settings.py).
+    """
+    databases = {"default", "replica"} if HAS_REPLICA else {"default"}
+
+    def setUp(self):
+        cache.clear()
+        user = CustomUser.objects.create_user(
+            username="alice@example.com", email="alice@example.com", password="pw12345!",
+        )
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION="Token " + Token.objects.create(user=user).key)
+
+    def queries(self, method, path, **kwargs):
+        """Run a request; return the number of queries on (primary, replica)."""
+        with CaptureQueriesContext(connections["default"]) as primary, \
+                CaptureQueriesContext(connections["replica"]) as replica:
+            response = getattr(self.api, method)(path, format="json", **kwargs)
+        self.assertLess(response.status_code, 300, response.content)
+        return len(primary), len(replica)
+
+    def test_read_your_writes(self):
+        primary, replica = self.queries("get", "/api/boards/")
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+        primary, replica = self.queries("post", "/api/boards/", data={"title": "New"})
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+        # Within REPLICA_STICKY_SECONDS this client reads its own write
+        primary, replica = self.queries("get", "/api/boards/")
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+
+# ==========================
+# Batch requests
+# ==========================
+
+@override_settings(ROOT_URLCONF=__name__, PASSWORD_HASHERS=FAST_HASHERS)
+class BatchTests(TestCase):
+    databases = set(settings.SHARDS)
+
+    def setUp(self):
+        user = CustomUser.objects.create_user(
+            username="alice@example.com", email="alice@example.com", password="pw12345!",
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(user)
+
+    def test_text_and_binary_bodies(self):
+        response = self.api.post("/api/batch/", {"requests": [
+            {"method": "GET", "path": "/api/text/"},
+            {"method": "GET", "path": "/api/binary/"},
+        ]}, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        text, binary = response.json()["responses"]
+        self.assertEqual(text["body"], "héllo")
+        self.assertNotIn("encoding", text)
+        self.assertEqual(binary["encoding"], "base64")
+        self.assertEqual(base64.b64decode(binary["body"]), b"\x00\xff\xfe")
+
+
+# ==========================
+# Lookups
+# ==========================
+
+class UpperPrefixTests(TestCase):
+    databases = set(settings.SHARDS)
+
+    @classmethod
+    def setUpTestData(cls):
+        for email in ("alice@example.com", "ALbert@example.com", "bob@example.com", "al_x@example.com"):
+            CustomUser.objects.create(username=email, email=email)
+
+    def emails(self, prefix):
+        return sorted(CustomUser.objects.filter(email__iprefix=prefix).values_list("email", flat=True))
+
+    def test_case_insensitive_prefix(self):
+        self.assertEqual(self.emails("aL"), ["ALbert@example.com", "al_x@example.com", "alice@example.com"])
+        self.assertEqual(self.emails("al_"), ["al_x@example.com"])
+        self.assertEqual(self.emails("bob@example.com"), ["bob@example.com"])
+        self.assertEqual(self.emails("c"), [])
+
+    @unittest.skipUnless(connection.vendor == "sqlite", "SQLite query plan")
+    def test_uses_upper_index(self):
+        sql, params = CustomUser.objects.filter(email__iprefix="al").query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            plan = " ".join(row[-1] for row in cursor.fetchall())
+        self.assertIn("user_email_upper_idx", plan)
+
+    def test_admin_search(self):
+        model_admin = admin.site._registry[CustomUser]
+        request     = RequestFactory().get("/admin/auth_app/customuser/")
+        users, _    = model_admin.get_search_results(request, CustomUser.objects.all(), "AL")
+        self.assertEqual(
+            sorted(users.values_list("email", flat=True)),
+            ["ALbert@example.com", "al_x@example.com", "alice@example.com"],
+        )
+
+
+# ==========================
+# Response formats
+# ==========================
+
+HAS_MSGPACK = importlib.util.find_spec("msgpack") is not None
+HAS_CBOR    = importlib.util.find_spec("cbor2") is not None
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class BinaryRendererTests(TestCase):
+    databases = set(settings.SHARDS)
+
+    def setUp(self):
+        cache.clear()
+        user = CustomUser.objects.create_user(
+            username="alice@example.com", email="alice@example.com", password="pw12345!",
+        )
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION="Token " + Token.objects.create(user=user).key)
+        self.api.post("/api/boards/", {"title": "Board"}, format="json")
+
+    def get(self, media_type):
+        response = self.api.get("/api/boards/", HTTP_ACCEPT=media_type)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], media_type)
+        return response.content
+
+    @unittest.skipUnless(HAS_MSGPACK, "msgpack is not installed")
+    def test_msgpack(self):
+        import msgpack
+        self.assertEqual(msgpack.unpackb(self.get("application/msgpack")), self.api.get("/api/boards/").json())
+
+    @unittest.skipUnless(HAS_CBOR, "cbor2 is not installed")
+    def test_cbor(self):
+        import cbor2
+        self.assertEqual(cbor2.loads(self.get("application/cbor")), self.api.get("/api/boards/").json())
+
+    def test_without_the_packages(self):
+        # Evaluate the settings as they would be without msgpack and cbor2
+        real = importlib.util.find_spec
+        with mock.patch(
+            "importlib.util.find_spec",
+            side_effect=lambda name, *args: None if name in ("msgpack", "cbor2") else real(name, *args),
+        ):
+            config = runpy.run_path(os.path.join(settings.BASE_DIR, "core", "settings.py"))
+        self.assertEqual(config["BINARY_RENDERER_CLASSES"], [])
+
+        class View(APIView):
+            permission_classes = []
+            renderer_classes   = [
+                import_string(path) for path in config["REST_FRAMEWORK"]["DEFAULT_RENDERER_CLASSES"]
+            ]
+
+            def get(self, request):
+                return Response({"ok": True})
+
+        factory = APIRequestFactory()
+        for media_type in ("application/msgpack", "application/cbor"):
+            response = View.as_view()(factory.get("/", HTTP_ACCEPT=media_type))
+            self.assertEqual(response.status_code, 406)
+        self.assertEqual(View.as_view()(factory.get("/", HTTP_ACCEPT="application/json")).status_code, 200)
+
+
+# ==========================
+# Database configuration
+# ==========================
+
+class DatabaseFromEnvTests(SimpleTestCase):
+    def config(self, **env):
+        with mock.patch.dict(os.environ, env, clear=True):
+            return database_from_env("DB", default_name="db.sqlite3")
+
+    def test_sqlite_default(self):
+        config = self.config()
+        self.assertEqual(config["ENGINE"], "django.db.backends.sqlite3")
+        self.assertEqual(config["NAME"], "db.sqlite3")
+        self.assertEqual(config["CONN_MAX_AGE"], 60)
+        self.assertTrue(config["CONN_HEALTH_CHECKS"])
+        self.assertEqual(config["OPTIONS"], {"transaction_mode": "IMMEDIATE"})
+
+    def test_persistent_connections(self):
+        self.assertIsNone(self.config(DB_CONN_MAX_AGE="none")["CONN_MAX_AGE"])
+        self.assertEqual(self.config(DB_CONN_MAX_AGE="0")["CONN_MAX_AGE"], 0)
+        self.assertFalse(self.config(DB_CONN_HEALTH_CHECKS="0")["CONN_HEALTH_CHECKS"])
+
+    def test_postgresql_pool(self):
+        config = self.config(
+            DB_ENGINE="postgresql", DB_NAME="kanmind", DB_HOST="db", DB_USER="kanmind", DB_POOL="1",
+        )
+        self.assertEqual(config["ENGINE"], "django.db.backends.postgresql")
+        self.assertEqual((config["NAME"], config["HOST"], config["USER"]), ("kanmind", "db", "kanmind"))
+        self.assertEqual(config["OPTIONS"], {"pool": True})
+        # Django refuses persistent connections on top of a pool
+        self.assertEqual(config["CONN_MAX_AGE"], 0)
+
+    def test_prefix(self):
+        with mock.patch.dict(os.environ, {"DB_REPLICA_NAME": "replica.sqlite3"}, clear=True):
+            self.assertEqual(database_from_env("DB_REPLICA")["NAME"], "replica.sqlite3")
+
+    def test_pragma_overrides(self):
+        with mock.patch.dict(os.environ, {"SQLITE_CACHE_SIZE": "-64000"}, clear=True):
+            pragmas = sqlite_pragmas_from_env()
+        self.assertEqual(pragmas["cache_size"], "-64000")
+        self.assertEqual(pragmas["journal_mode"], "WAL")
+
+
+class SQLitePragmaTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    @unittest.skipUnless(connection.vendor == "sqlite", "SQLite only")
+    def test_applied_to_connections(self):
+        self.assertEqual(self.pragma("synchronous"), 1)  # NORMAL
+        self.assertEqual(self.pragma("busy_timeout"), 5000)
+        self.assertEqual(self.pragma("foreign_keys"), 1)
+        self.assertEqual(self.pragma("cache_size"), -20000)
+
+
+@tag("benchmark")
+class SQLiteWriterBenchmark(SimpleTestCase):
+    """
+    Concurrent writers on one SQLite file, with the pragmas and IMMEDIATE
+    transactions of core.database against SQLite's defaults. Each
+    transaction reads, then inserts, as most ORM writes do.
+    """
+    writers      = 8
+    transactions = 150
+
+    def run_writers(self, pragmas, begin):
+        path = os.path.join(self.directory, f"{begin.replace(' ', '_')}.sqlite3")
+        setup = sqlite3.connect(path)
+        for name, value in pragmas.items():
+            setup.execute(f"PRAGMA {name} = {value}")
+        setup.execute("CREATE TABLE row (id INTEGER PRIMARY KEY, writer INTEGER, n INTEGER)")
+        setup.commit()
+        setup.close()
+        errors = []
+
+        def write(writer):
+            db = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+            for name, value in pragmas.items():
+                db.execute(f"PRAGMA {name} = {value}")
+            for _ in range(self.transactions):
+                try:
+                    db.execute(begin)
+                    n = db.execute("SELECT COUNT(*) FROM row WHERE writer = ?", [writer]).fetchone()[0]
+                    db.execute("INSERT INTO row (writer, n) VALUES (?, ?)", [writer, n])
+                    db.execute("COMMIT")
+                except sqlite3.OperationalError as exc:
+                    errors.append(str(exc))
+                    if db.in_transaction:
+                        db.execute("ROLLBACK")
+            db.close()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(self.writers) as pool:
+            list(pool.map(write, range(self.writers)))
+        elapsed = time.perf_counter() - start
+        done    = self.writers * self.transactions - len(errors)
+        return done / elapsed, len(errors)
+
+    def test_concurrent_writers(self):
+        with tempfile.TemporaryDirectory() as self.directory:
+            before, before_errors = self.run_writers({}, "BEGIN")
+            after, after_errors   = self.run_writers(DEFAULT_SQLITE_PRAGMAS, "BEGIN IMMEDIATE")
+        print(f"\n  SQLite defaults:       {before:7.0f} tx/s, {before_errors} failed")
+        print(f"  core.database tuning:  {after:7.0f} tx/s, {after_errors} failed")
+        self.assertEqual(after_errors, 0)
+
+
+# ==========================
+# Rate limiting
+# ==========================
+
+class CacheStoreTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.bucket = TokenBucket("test", "10/min", store=CacheStore())
+
+    def take(self, key="client"):
+        return self.bucket.consume(key)[0]
+
+    def test_burst_then_refill(self):
+        now = time.time()
+        with mock.patch("core.ratelimit.time.time", return_value=now):
+            self.assertEqual(sum(self.take() for _ in range(15)), 10)
+            # Other keys have their own bucket
+            self.assertTrue(self.take("other"))
+        with mock.patch("core.ratelimit.time.time", return_value=now + 12):
+            self.assertEqual(sum(self.take() for _ in range(5)), 2)
+
+    def test_idle_credit_is_capped(self):
+        now = time.time()
+        with mock.patch("core.ratelimit.time.time", return_value=now):
+            self.take()
+        # After a long idle the bucket holds only its capacity
+        with mock.patch("core.ratelimit.time.time", return_value=now + 3600):
+            self.assertEqual(sum(self.take() for _ in range(15)), 10)
+
+    def test_concurrent_takes_never_over_admit(self):
+        # One store per thread, as separate processes would have
+        def take(_):
+            return TokenBucket("test", "10/min", store=CacheStore()).consume("client")[0]
+
+        with ThreadPoolExecutor(16) as pool:
+            allowed = sum(pool.map(take, range(200)))
+        self.assertEqual(allowed, 10)
+
+
+@tag("benchmark")
+@override_settings(
+    API_THROTTLE_RATES={"user": "1000000/s"}, ENDPOINT_THROTTLE_RATES={"task-list-create": "1000000/s"},
+)
+class ThrottleBenchmark(SimpleTestCase):
+    """Time the two API throttles of one request, with each bucket store."""
+    requests = 20_000
+
+    def per_request(self, store):
+        request = APIRequestFactory().get("/api/tasks/")
+        request.resolver_match = resolve("/api/tasks/")
+        request = Request(request)
+        request.user = CustomUser(pk=1, email="alice@example.com")
+        throttles = [UserRateThrottle(), EndpointRateThrottle()]
+        with override_settings(RATE_LIMIT_STORE=store):
+            start = time.perf_counter()
+            for _ in range(self.requests):
+                for throttle in throttles:
+                    throttle.allow_request(request, None)
+            return (time.perf_counter() - start) / self.requests * 1e6
+
+    def test_overhead(self):
+        cache.clear()
+        local = self.per_request("local")
+        shared = self.per_request("cache")
+        print(f"\n  throttles per request, local store:  {local:6.1f} µs")
+        print(f"  throttles per request, cache store:  {shared:6.1f} µs")
+        self.assertLess(local, 50)
+
+
+# ==========================
+# Middleware and API profile
+# ==========================
+
+def _ok(request):
+    return HttpResponse("ok")
+
+
+async def _aok(request):
+    return _ok(request)
+
+
+class BrowserOnlyMiddlewareTests(SimpleTestCase):
+    def call(self, middleware, path):
+        request = RequestFactory().get(path)
+        if middleware.async_mode:
+            response = async_to_sync(middleware)(request)
+        else:
+            response = middleware(request)
+        return request, response
+
+    def test_api_requests_skip_the_browser_chain(self):
+        for get_response in (_ok, _aok):
+            middleware = BrowserOnlyMiddleware(get_response)
+            request, response = self.call(middleware, "/api/boards/")
+            self.assertFalse(hasattr(request, "session"))
+            self.assertFalse(hasattr(request, "_messages"))
+            self.assertNotIn("X-Frame-Options", response)
+
+    def test_admin_requests_get_the_browser_chain(self):
+        for get_response in (_ok, _aok):
+            middleware = BrowserOnlyMiddleware(get_response)
+            request, response = self.call(middleware, "/admin/")
+            self.assertTrue(hasattr(request, "session"))
+            self.assertTrue(hasattr(request, "user"))
+            self.assertEqual(response["X-Frame-Options"], "DENY")
+
+
+class APIProfileTests(SimpleTestCase):
+    def settings_for(self, profile):
+        with mock.patch.dict(os.environ, {"KANMIND_PROFILE": profile}):
+            return runpy.run_path(os.path.join(settings.BASE_DIR, "core", "settings.py"))
+
+    def test_api_profile_drops_admin_and_messages(self):
+        config = self.settings_for("api")
+        self.assertNotIn("django.contrib.admin", config["INSTALLED_APPS"])
+        self.assertNotIn("django.contrib.messages", config["INSTALLED_APPS"])
+        self.assertNotIn("django.contrib.messages.middleware.MessageMiddleware", config["BROWSER_MIDDLEWARE"])
+        self.assertNotIn(
+            "django.contrib.messages.context_processors.messages",
+            config["TEMPLATES"][0]["OPTIONS"]["context_processors"],
+        )
+
+    def test_full_profile_keeps_them(self):
+        config = self.settings_for("full")
+        self.assertIn("django.contrib.admin", config["INSTALLED_APPS"])
+        self.assertIn("django.contrib.messages.middleware.MessageMiddleware", config["BROWSER_MIDDLEWARE"])
+
+
+# Run in a fresh interpreter: load the WSGI app and serve one API request
+_COLD_START = """
+import time
+from wsgiref.util import setup_testing_defaults
+started = time.perf_counter()
+from core.wsgi import application
+loaded = time.perf_counter()
+environ = {"PATH_INFO": "/api/boards/", "HTTP_HOST": "localhost"}
+setup_testing_defaults(environ)
+b"".join(application(environ, lambda status, headers, exc_info=None: None))
+print((loaded - started) * 1000, (time.perf_counter() - loaded) * 1000)
+"""
+
+
+@tag("benchmark")
+class MiddlewareBenchmark(SimpleTestCase):
+    """
+    Per-request cost of the browser middleware that /api/ requests skip,
+    and the cold start of a worker per profile, with and without preload.
+    """
+    requests = 5_000
+
+    def per_request(self, handler):
+        factory = RequestFactory()
+        start   = time.perf_counter()
+        for _ in range(self.requests):
+            handler(factory.get("/api/boards/"))
+        return (time.perf_counter() - start) / self.requests * 1e6
+
+    def cold_start(self, profile, preload, runs=2):
+        with tempfile.TemporaryDirectory() as directory:
+            env = {
+                **os.environ, "KANMIND_PROFILE": profile, "KANMIND_PRELOAD": preload,
+                "DB_NAME": os.path.join(directory, "db.sqlite3"),
+            }
+            times = [
+                [float(value) for value in subprocess.run(
+                    [sys.executable, "-c", _COLD_START], cwd=settings.BASE_DIR, env=env,
+                    capture_output=True, text=True, check=True,
+                ).stdout.split()]
+                for _ in range(runs)
+            ]
+        return min(times)
+
+    def test_per_request_overhead(self):
+        middleware = BrowserOnlyMiddleware(_ok)
+        skipped = self.per_request(middleware)
+        chained = self.per_request(middleware.browser_chain)
+        print(f"\n  /api/ request, browser middleware skipped: {skipped:6.1f} µs")
+        print(f"  /api/ request, browser middleware run:     {chained:6.1f} µs")
+        self.assertLess(skipped, chained)
+
+    def test_cold_start(self):
+        print()
+        for profile in ("full", "api"):
+            for preload in ("0", "1"):
+                load, first = self.cold_start(profile, preload)
+                print(f"  KANMIND_PROFILE={profile:4} PRELOAD={preload}: load {load:6.1f} ms, first request {first:6.1f} ms")
+
+
+# ==========================
+# Profiling
+# ==========================
+
+def _spin(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+class ProfilingTests(SimpleTestCase):
+    def test_stopped_counts_do_not_change(self):
+        sampler = profiling.Sampler(0.001)
+        sampler.start(sys._getframe())
+        _spin(0.05)
+        stacks = sampler.stop()
+        counts = dict(stacks)
+        time.sleep(0.05)
+        self.assertTrue(counts)
+        self.assertEqual(dict(stacks), counts)
+        self.assertTrue(any("_spin" in stack for stack in counts))
+
+    def test_record_appends(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(PROFILE_DIR=directory):
+            profiling.record("boards", {"a;b": 2, "a;c": 1})
+            profiling.record("boards", {"a;b": 3})
+            self.assertEqual(len(os.listdir(directory)), 1)
+            self.assertEqual(profiling.load()["boards"], {"a;b": 5, "a;c": 1})
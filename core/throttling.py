@@ -0,0 +1,120 @@
+"""
+API throttles based on token buckets (core.ratelimit).
+
+* `UserRateThrottle`: one budget per user across the whole API
+  (``API_THROTTLE_RATES["user"]``, anonymous clients by IP with ``"anon"``).
+* `EndpointRateThrottle`: a budget per user and URL name for the endpoints
+  listed in ``ENDPOINT_THROTTLE_RATES``, e.g. the task list clients poll.
+
+Users in ``THROTTLE_BYPASS_USERS`` (emails of service accounts) are never
+throttled. Both throttles record the tightest budget on the request, and
+`core.middleware.RateLimitHeadersMiddleware` reports it in
+``X-RateLimit-*`` headers. Throttled requests get a 429 with ``Retry-After``
+(added by DRF from `wait()`).
+"""
+from django.conf import settings
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from core.ratelimit import TokenBucket
+
+
+def _django_request(request):
+    """The HttpRequest behind a DRF request (or the request itself)."""
+    return getattr(request, "_request", request)
+
+
+def client_ip(request):
+    """
+    The address per-IP buckets are keyed on. Clients can send any
+    ``X-Forwarded-For``, so DRF's reading of it is only used when
+    ``NUM_PROXIES`` says how many proxies in front of the app to trust.
+    """
+    if api_settings.NUM_PROXIES is None:
+        return request.META.get("REMOTE_ADDR")
+    return BaseThrottle().get_ident(request)
+
+
+def _bypassed(user):
+    return (
+        user is not None
+        and user.is_authenticated
+        and user.email in settings.THROTTLE_BYPASS_USERS
+    )
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Base class: subclasses pick the bucket and key for a request."""
+
+    def __init__(self):
+        self.retry_after = None
+
+    def get_bucket(self, request, view):
+        """Return ``(bucket, key)`` or None to skip throttling."""
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        user = getattr(request, "user", None)
+        if _bypassed(user):
+            return True
+
+        target = self.get_bucket(request, view)
+        if target is None:
+            return True
+        bucket, key = target
+
+        allowed, remaining, self.retry_after = bucket.consume(key)
+        self._record(request, bucket, remaining)
+        return allowed
+
+    def _record(self, request, bucket, remaining):
+        # Keep the budget closest to running out for the response headers
+        django_request = _django_request(request)
+        current = getattr(django_request, "rate_limit", None)
+        if current is None or remaining < current[1]:
+            reset = (bucket.capacity - remaining) / bucket.refill
+            django_request.rate_limit = (bucket.capacity, remaining, int(reset) + 1)
+
+    def client_key(self, request):
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            return f"user:{user.pk}"
+        return f"ip:{client_ip(request)}"
+
+    def wait(self):
+        return self.retry_after
+
+
+class UserRateThrottle(TokenBucketThrottle):
+    """Overall request budget per user (or per IP for anonymous clients)."""
+    _buckets = {}
+
+    def get_bucket(self, request, view):
+        user  = getattr(request, "user", None)
+        scope = "user" if user is not None and user.is_authenticated else "anon"
+        rate  = settings.API_THROTTLE_RATES.get(scope)
+        if rate is None:
+            return None
+        return _bucket(self._buckets, f"api-{scope}", rate), self.client_key(request)
+
+
+class EndpointRateThrottle(TokenBucketThrottle):
+    """Budget per user and endpoint, for endpoints with a configured rate."""
+    _buckets = {}
+
+    def get_bucket(self, request, view):
+        match = getattr(_django_request(request), "resolver_match", None)
+        name  = match.url_name if match is not None else None
+        rate  = settings.ENDPOINT_THROTTLE_RATES.get(name)
+        if rate is None:
+            return None
+        bucket = _bucket(self._buckets, f"api-endpoint:{name}", rate)
+        return bucket, self.client_key(request)
+
+
+def _bucket(registry, prefix, rate):
+    """Reuse bucket objects; rebuilt only when the rate setting changes."""
+    bucket = registry.get(prefix)
+    if bucket is None or bucket.rate != rate:
+        bucket = registry[prefix] = TokenBucket(prefix, rate)
+    return bucket
@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_wsgi_application()
+
+# Import views, build URL patterns and serializers now instead of on the
+# first request (before fork with a preloading server, see core/preload.py).
+if os.environ.get('KANMIND_PRELOAD', '1') == '1':
+    from core.preload import warm
+
+    warm()
@@ -0,0 +1,63 @@
+"""
+Activity feed recording.
+
+`record` does not write immediately. Inside a request, events are buffered
+by `kanban_app.middleware.ActivityMiddleware` and written with a single
+``bulk_create`` once the response is ready and the transaction has
+committed. A PATCH therefore costs at most one extra INSERT, however many
+fields it changes. Outside a request (shell, jobs) every call is written on
+commit by itself. Events go to the shard their board is pinned to
+(kanban_app.sharding).
+"""
+from collections import defaultdict
+from contextvars import ContextVar
+
+from django.db import transaction
+
+from kanban_app import sharding
+from kanban_app.models import Activity
+
+
+# [(shard, event), ...] of the current request
+_buffer: ContextVar[list | None] = ContextVar("activity_buffer", default=None)
+
+
+def record(board, verb, actor=None, task=None, **data):
+    """Add an event to the activity feed of ``board``."""
+    event = Activity(
+        board_id = board.pk,
+        task_id  = task.pk if task is not None else None,
+        actor_id = actor.pk if actor is not None else None,
+        verb     = verb,
+        data     = data,
+    )
+    buffer = _buffer.get()
+    if buffer is None:
+        flush([(sharding.current(), event)])
+    else:
+        buffer.append((sharding.current(), event))
+
+
+def flush(events):
+    """Write ``events`` with one INSERT per shard after the current transaction commits."""
+    by_shard = defaultdict(list)
+    for alias, event in events or ():
+        by_shard[alias].append(event)
+    for alias, batch in by_shard.items():
+        transaction.on_commit(lambda alias=alias, batch=batch: _write(alias, batch), using=alias)
+
+
+def _write(alias, batch):
+    Activity.objects.using(alias).bulk_create(sharding.assign_ids(batch, alias))
+
+
+def start_buffer():
+    """Start collecting events for the current request."""
+    return _buffer.set([])
+
+
+def end_buffer(token):
+    """Stop collecting and return the events the request recorded."""
+    events = _buffer.get()
+    _buffer.reset(token)
+    return events
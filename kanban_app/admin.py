@@ -1,30 +1,63 @@
 from django.contrib import admin
-from .models import Board, Task, Comment
+
+from core import lookups  # noqa: F401  (registers __iprefix)
+from core.pagination import EstimatedCountPaginator
+from .models import Board, Task, Comment, Job
+
+# All changelists below: joined selects for the FK columns, no exact
+# COUNT(*) over the whole table (EstimatedCountPaginator and
+# show_full_result_count off), autocomplete widgets for foreign keys and
+# anchored searches ("__iprefix" = starts with, on an Upper() index, see
+# core.lookups; "=" = exact) instead of leading-wildcard scans.
 
 # Admin configuration for the Board model
 @admin.register(Board)
 class BoardAdmin(admin.ModelAdmin):
     # Display these fields in the admin list view
-    list_display = ("title", "owner")
-    # Enable search by board title and owner's email
-    search_fields = ("title", "owner__email")
+    list_display        = ("title", "owner")
+    list_select_related = ("owner",)
+    # Search by board title or owner's email (prefix)
+    search_fields       = ("title__iprefix", "owner__email__iprefix")
+    autocomplete_fields = ("owner", "members")
+    ordering            = ("-id",)
+    paginator              = EstimatedCountPaginator
+    show_full_result_count = False
 
 # Admin configuration for the Task model
 @admin.register(Task)
 class TaskAdmin(admin.ModelAdmin):
     # Display these fields in the admin list view
-    list_display  = ("title", "board", "assignee", "reviewer", "status")
+    list_display        = ("title", "board", "assignee", "reviewer", "status")
+    list_select_related = ("board", "assignee", "reviewer")
     # Enable filtering by status and priority in the admin sidebar
-    list_filter   = ("status", "priority")
-    # Enable search by task title and description
-    search_fields = ("title", "description")
+    list_filter         = ("status", "priority")
+    # Search by id or task title (prefix)
+    search_fields       = ("=id", "title__iprefix")
+    autocomplete_fields = ("board", "created_by", "assignee", "reviewer")
+    ordering            = ("-id",)
+    paginator              = EstimatedCountPaginator
+    show_full_result_count = False
 
 # Admin configuration for the Comment model
 @admin.register(Comment)
 class CommentAdmin(admin.ModelAdmin):
     # Display these fields in the admin list view
-    list_display  = ("id", "task", "author", "created_at")
+    list_display        = ("id", "task", "author", "created_at")
+    list_select_related = ("task", "author")
     # Enable filtering by creation date
-    list_filter   = ("created_at",)
-    # Enable search by author's name and comment content
-    search_fields = ("author__fullname", "content")
+    list_filter         = ("created_at",)
+    # Search by task id or author's email (prefix)
+    search_fields       = ("=task__id", "author__email__iprefix")
+    autocomplete_fields = ("task", "author")
+    paginator              = EstimatedCountPaginator
+    show_full_result_count = False
+
+# Admin configuration for the Job model
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    # Display these fields in the admin list view
+    list_display  = ("id", "name", "status", "attempts", "run_at", "finished_at")
+    # Enable filtering by job state and handler
+    list_filter   = ("status", "name")
+    paginator              = EstimatedCountPaginator
+    show_full_result_count = False
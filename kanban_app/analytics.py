@@ -0,0 +1,167 @@
+"""
+Board analytics: cumulative flow, throughput and cycle time.
+
+Every change of a task's column writes a `StatusTransition` (creation,
+status change, move, deletion). The ``rollup_analytics`` job folds pending
+transitions into `BoardDailyStats`, one row per board, day and status, and
+marks them as rolled up; each transition is read once. The analytics
+endpoint only reads the daily rows of the requested range plus one sum over
+the days before it, so its cost depends on the number of days, not on how
+many tasks or transitions a board has had. The numbers trail the writes by
+as long as the worker takes to pick up the job.
+
+Cycle time is measured from the first time a task entered ``in_progress``
+(or its creation, if it never did) until it entered ``done``.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F, Min, Sum
+from django.utils import timezone
+
+from kanban_app import sharding
+from kanban_app.jobs import enqueue, job
+from kanban_app.models import BoardDailyStats, Job, StatusTransition, Task
+
+
+STATUSES = [value for value, _ in Task.STATUS_CHOICES]
+
+
+def _batch_size():
+    return getattr(settings, "ANALYTICS_ROLLUP_BATCH_SIZE", 1000)
+
+
+# ==========================
+# Recording
+# ==========================
+
+def record_transition(task, old_status, new_status):
+    """Record ``task`` moving from ``old_status`` to ``new_status`` ("" = none)."""
+    if old_status == new_status:
+        return
+    StatusTransition.objects.create(
+        board_id=task.board_id, task_id=task.pk, from_status=old_status, to_status=new_status,
+    )
+    transaction.on_commit(_schedule_rollup, using=sharding.current())
+
+
+def _schedule_rollup():
+    # One queued rollup covers every pending transition
+    if not Job.objects.filter(name="rollup_analytics", status="queued").exists():
+        enqueue("rollup_analytics")
+
+
+# ==========================
+# Rollup
+# ==========================
+
+def _cycle_starts(task_ids):
+    """First in-progress (else creation) time per task."""
+    starts = dict(
+        StatusTransition.objects.filter(task_id__in=task_ids, from_status="")
+        .values_list("task_id").annotate(Min("created_at"))
+    )
+    starts.update(
+        StatusTransition.objects.filter(task_id__in=task_ids, to_status="in_progress")
+        .values_list("task_id").annotate(Min("created_at"))
+    )
+    return starts
+
+
+def _rollup_batch(batch_size):
+    with transaction.atomic(using=sharding.current()):
+        pending = StatusTransition.objects.filter(rolled_up=False).order_by("pk")
+        if connections[pending.db].features.has_select_for_update_skip_locked:
+            pending = pending.select_for_update(skip_locked=True)
+        transitions = list(pending[:batch_size])
+        if not transitions:
+            return 0
+
+        finished = [t.task_id for t in transitions if t.to_status == "done" and t.task_id]
+        starts   = _cycle_starts(finished) if finished else {}
+
+        # (board, day, status) -> [net, entered, cycle seconds, cycle count]
+        totals = defaultdict(lambda: [0, 0, 0.0, 0])
+        for t in transitions:
+            day = timezone.localdate(t.created_at)
+            if t.from_status:
+                totals[t.board_id, day, t.from_status][0] -= 1
+            if t.to_status:
+                row = totals[t.board_id, day, t.to_status]
+                row[0] += 1
+                row[1] += 1
+                started = starts.get(t.task_id)
+                if t.to_status == "done" and started is not None:
+                    row[2] += (t.created_at - started).total_seconds()
+                    row[3] += 1
+
+        BoardDailyStats.objects.bulk_create(
+            sharding.assign_ids([
+                BoardDailyStats(board_id=board_id, day=day, status=status) for board_id, day, status in totals
+            ]),
+            ignore_conflicts=True,
+        )
+        for (board_id, day, status), (net, entered, seconds, count) in totals.items():
+            BoardDailyStats.objects.filter(board_id=board_id, day=day, status=status).update(
+                net                = F("net") + net,
+                entered            = F("entered") + entered,
+                cycle_time_seconds = F("cycle_time_seconds") + seconds,
+                cycle_time_count   = F("cycle_time_count") + count,
+            )
+        StatusTransition.objects.filter(pk__in=[t.pk for t in transitions]).update(rolled_up=True)
+    return len(transitions)
+
+
+def rollup(batch_size=None):
+    """Fold all pending transitions into the daily stats; return how many."""
+    batch_size = batch_size or _batch_size()
+    total = 0
+    while done := _rollup_batch(batch_size):
+        total += done
+    return total
+
+
+@job("rollup_analytics", each_shard=True)
+def rollup_analytics():
+    rollup()
+
+
+# ==========================
+# Reading
+# ==========================
+
+def board_series(board_id, start, end):
+    """
+    Daily series of a board from ``start`` to ``end`` (inclusive): tasks per
+    status at the end of each day, tasks finished, and their average cycle
+    time in hours.
+    """
+    counts = dict.fromkeys(STATUSES, 0)
+    counts.update(
+        BoardDailyStats.objects.filter(board_id=board_id, day__lt=start)
+        .values_list("status").annotate(Sum("net"))
+    )
+
+    rows = defaultdict(dict)
+    for stats in BoardDailyStats.objects.filter(board_id=board_id, day__range=(start, end)):
+        rows[stats.day][stats.status] = stats
+
+    days = []
+    day  = start
+    while day <= end:
+        for status, stats in rows[day].items():
+            counts[status] = counts.get(status, 0) + stats.net
+        done = rows[day].get("done")
+        days.append({
+            "date":     day,
+            "tasks":    {status: counts.get(status, 0) for status in STATUSES},
+            "finished": done.entered if done else 0,
+            "cycle_time_hours": (
+                round(done.cycle_time_seconds / done.cycle_time_count / 3600, 2)
+                if done and done.cycle_time_count else None
+            ),
+        })
+        day += timedelta(days=1)
+    return days
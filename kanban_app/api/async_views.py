@@ -0,0 +1,279 @@
+"""
+ASGI-native variants of the hot read endpoints.
+
+Under ASGI (``core/asgi.py``) these views serve GET requests with Django's
+async ORM, so a slow client waits on the event loop instead of occupying a
+worker thread. Every other method is handed to the regular DRF view, which
+keeps writes, validation and error handling in one place.
+
+The payloads are produced by the same serializers as the sync views. All
+data they read is loaded up front (`for_listing`, `with_stats`,
+`with_details`), so serializing never touches the database. Responses are
+JSON unless the client asks for one of the binary encodings
+(core.renderers). Authentication and throttling use DRF's own classes in a
+worker thread, since both may wait on the database or the cache. With
+board shards, reads are pinned to the shard of the board in the URL like
+the sync views, and per-user lists read every shard.
+"""
+import math
+
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+from django.http import Http404, HttpResponse, HttpResponseBase
+from django.shortcuts import aget_object_or_404
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import (
+    APIException, NotAcceptable, NotAuthenticated, PermissionDenied, ValidationError,
+)
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from kanban_app import generations, sharding
+from kanban_app.concurrency import etag
+from kanban_app.models import Board
+from kanban_app.api.serializers import (
+    BoardSerializer,
+    BoardDetailSerializer,
+    TaskSerializer,
+    CommentSerializer,
+)
+from kanban_app.api.views import (
+    BoardListCreateView,
+    BoardDetailView,
+    MyAssignedTasksView,
+    MyReviewingTasksView,
+    TaskListCreateView,
+    TaskCommentsView,
+    ShardRoutingMixin,
+    board_detail_flight,
+    board_detail_key,
+    board_list_flight,
+    board_list_key,
+    comment_thread,
+    include_archived,
+    list_stamps,
+    render_bytes,
+    rendered_response,
+    shaped,
+    visible_tasks,
+)
+
+
+# ==========================
+# Helpers
+# ==========================
+
+_negotiation = api_settings.DEFAULT_CONTENT_NEGOTIATION_CLASS()
+_renderers   = [cls() for cls in api_settings.DEFAULT_RENDERER_CLASSES]
+
+
+def _renderer(request):
+    """
+    The binary renderer the client negotiated (as DRF would), else JSON;
+    None if the client accepts none of the formats.
+    """
+    try:
+        renderer, _ = _negotiation.select_renderer(Request(request), _renderers)
+    except NotAcceptable:
+        return None
+    return renderer if renderer.render_style == "binary" else JSONRenderer()
+
+
+def _render(data, status=200, renderer=None):
+    renderer = renderer or JSONRenderer()
+    response = HttpResponse(
+        render_bytes(renderer, data),
+        status=status,
+        content_type=renderer.media_type,
+    )
+    if status == 401:
+        response["WWW-Authenticate"] = "Token"
+    return response
+
+
+def _admit(request, user=None):
+    """
+    Authenticate ``request`` with DRF's authentication classes, unless
+    ``user`` is given, and apply the throttles. Returns the user, or the
+    401/429 response the sync views would send. Called in a worker thread:
+    both steps may wait on the database or the cache.
+    """
+    if user is None:
+        authenticators = [cls() for cls in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+        try:
+            user = Request(request, authenticators=authenticators).user
+        except APIException as exc:
+            return _render({"detail": exc.detail}, exc.status_code, request.accepted_renderer)
+        if not user.is_authenticated:
+            return _render({"detail": NotAuthenticated.default_detail}, 401, request.accepted_renderer)
+    request.user = user
+    return _throttled(request) or user
+
+
+def _throttled(request):
+    """Apply the DRF throttles; return a 429 response or None."""
+    for throttle in (cls() for cls in api_settings.DEFAULT_THROTTLE_CLASSES):
+        if not throttle.allow_request(request, None):
+            wait     = throttle.wait()
+            response = _render({"detail": "Request was throttled."}, 429, request.accepted_renderer)
+            if wait is not None:
+                response["Retry-After"] = str(math.ceil(wait))
+            return response
+    return None
+
+
+def _board_shard(sync_view, kwargs):
+    """The shard of the board named in the URL, for views that have one."""
+    if not issubclass(sync_view, ShardRoutingMixin):
+        return None
+    board_id = sync_view.board_id_from_url(kwargs)
+    return sharding.locate(board_id) if board_id is not None else None
+
+
+async def _rows(queryset):
+    """The rows of ``queryset``; from every shard when boards are sharded."""
+    if sharding.enabled():
+        return await sync_to_async(sharding.fan_out)(queryset)
+    return [row async for row in queryset]
+
+
+def async_read_view(sync_view):
+    """
+    Turn an async read function into a view for one URL.
+
+    GET/HEAD run ``read(request, user, **kwargs)`` on the event loop; any
+    other method is delegated to ``sync_view`` in a worker thread. ``read``
+    returns the data to render with ``request.accepted_renderer``, or a
+    finished response.
+    """
+    fallback = sync_to_async(sync_view.as_view())
+
+    def decorator(read):
+        @csrf_exempt
+        async def view(request, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return await fallback(request, **kwargs)
+
+            renderer = request.accepted_renderer = _renderer(request)
+            if renderer is None:
+                return _render({"detail": NotAcceptable.default_detail}, 406)
+            # Batched sub-requests (core.batch) arrive already authenticated
+            user = await sync_to_async(_admit)(request, getattr(request, "_force_auth_user", None))
+            if isinstance(user, HttpResponseBase):
+                return user
+            token = sharding.pin(None)
+            try:
+                if sharding.enabled():
+                    sharding.pin(await sync_to_async(_board_shard)(sync_view, kwargs))
+                data = await read(request, user, **kwargs)
+            except Http404:
+                return _render({"detail": "Not found."}, 404, renderer)
+            except PermissionDenied as exc:
+                return _render({"detail": exc.detail}, 403, renderer)
+            except ValidationError as exc:
+                return _render(exc.detail, 400, renderer)
+            finally:
+                sharding.unpin(token)
+            if isinstance(data, HttpResponseBase):
+                return data
+            response = _render(data, renderer=renderer)
+            if isinstance(data, dict) and "version" in data:
+                # Same validator as the sync detail views (kanban_app.concurrency)
+                response["ETag"] = f'"{data["version"]}"'
+            return response
+
+        view.__name__ = read.__name__
+        return view
+
+    return decorator
+
+
+# ==========================
+# BOARDS
+# ==========================
+
+@async_read_view(BoardListCreateView)
+async def board_list(request, user):
+    renderer = request.accepted_renderer
+
+    async def render():
+        boards = Board.objects.accessible_to(user).with_stats()
+        return render_bytes(renderer, BoardSerializer(await _rows(boards), many=True).data)
+
+    if sharding.enabled():
+        parts  = await sync_to_async(sharding.gather)(lambda: list(list_stamps(user)))
+        stamps = [stamp for part in parts for stamp in part]
+    else:
+        stamps = [stamp async for stamp in list_stamps(user)]
+    key = board_list_key(renderer, user, stamps, await generations.aget([pk for pk, _ in stamps]))
+    return rendered_response(renderer, await board_list_flight.ado(key, render))
+
+
+@async_read_view(BoardDetailView)
+async def board_detail(request, user, id):
+    board = await aget_object_or_404(Board.objects.only("id", "owner_id", "version"), id=id)
+    if user.pk == board.owner_id:
+        role = "owner"
+    elif await board.members.filter(pk=user.pk).aexists():
+        role = "member"
+    else:
+        raise PermissionDenied("Access denied – not a board member.")
+    archived = include_archived(request)
+    renderer = request.accepted_renderer
+
+    async def render():
+        detail = await Board.objects.with_details(archived).aget(pk=board.pk)
+        return render_bytes(renderer, BoardDetailSerializer(detail).data)
+
+    generation, = await generations.aget([board.pk])
+    key      = board_detail_key(renderer, board, generation, role, archived)
+    response = rendered_response(renderer, await board_detail_flight.ado(key, render))
+    response["ETag"] = etag(board)
+    return response
+
+
+# ==========================
+# TASK LISTS
+# ==========================
+
+@async_read_view(TaskListCreateView)
+async def task_list(request, user):
+    tasks = visible_tasks(request).accessible_to(user).for_listing()
+    return shaped(request, TaskSerializer(await _rows(tasks), many=True))
+
+
+@async_read_view(MyAssignedTasksView)
+async def tasks_assigned(request, user):
+    tasks = visible_tasks(request).filter(Q(assignee=user) | Q(reviewer=user)).for_listing()
+    return shaped(request, TaskSerializer(await _rows(tasks), many=True))
+
+
+@async_read_view(MyReviewingTasksView)
+async def tasks_reviewing(request, user):
+    tasks = visible_tasks(request).filter(reviewer=user).exclude(assignee=user).for_listing()
+    return shaped(request, TaskSerializer(await _rows(tasks), many=True))
+
+
+# ==========================
+# TASK – Comments
+# ==========================
+
+@async_read_view(TaskCommentsView)
+async def task_comments(request, user, task_id):
+    if "limit" in request.GET or "cursor" in request.GET:
+        # Keyset pages are built by DRF's CursorPagination in the sync view
+        return await _paginated_comments(request, task_id=task_id)
+
+    task = await aget_object_or_404(visible_tasks(request).select_related("board"), pk=task_id)
+    board = task.board
+    if user.pk != board.owner_id and not await board.members.filter(pk=user.pk).aexists():
+        raise PermissionDenied("Only board members may view or create comments.")
+    comments = comment_thread(request, task)
+    data     = CommentSerializer([c async for c in comments], many=True).data
+    response = _render(data, renderer=request.accepted_renderer)
+    response["X-Total-Count"] = str(await task.comments.acount())
+    return response
+
+
+_paginated_comments = sync_to_async(TaskCommentsView.as_view())
@@ -0,0 +1,38 @@
+from rest_framework.pagination import CursorPagination
+
+
+class ActivityPagination(CursorPagination):
+    """
+    Keyset pagination of the activity feed, newest first.
+
+    The cursor encodes the last id seen, so every page is an index range
+    scan regardless of how deep the client pages.
+    """
+    ordering              = "-id"
+    page_size             = 50
+    page_size_query_param = "limit"
+    max_page_size         = 200
+
+
+class CommentPagination(CursorPagination):
+    """
+    Keyset pagination of a comment thread, opt-in: only requests with
+    ``?limit=`` or ``?cursor=`` are paginated, others get the whole thread
+    as before. ``?order=newest`` pages from the newest comment backwards,
+    the default is oldest first.
+    """
+    page_size             = 50
+    page_size_query_param = "limit"
+    max_page_size         = 200
+
+    @staticmethod
+    def ordering_for(request):
+        return "-id" if request.GET.get("order") == "newest" else "id"
+
+    def get_ordering(self, request, queryset, view):
+        return (self.ordering_for(request),)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if "limit" not in request.query_params and "cursor" not in request.query_params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
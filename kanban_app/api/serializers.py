@@ -1,5 +1,9 @@
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
-from kanban_app.models import Board, Task, Comment
+from kanban_app import activity, analytics, concurrency, ranking, sharding
+from kanban_app.jobs import enqueue_on_commit
+from kanban_app.models import Activity, Board, BoardDeletion, Task, Comment
 from auth_app.models import CustomUser
 
 
@@ -30,11 +34,51 @@ class TaskSerializer(serializers.ModelSerializer):
             "status", "priority",
             "assignee", "reviewer",
             "due_date", "comments_count",
-            "board",
+            "board", "position", "version",
+            "completed_at", "archived_at",
         ]
+        # Maintained by moves, concurrency control and archiving
+        read_only_fields = ["position", "version", "completed_at", "archived_at"]
 
     def get_comments_count(self, obj):
-        return obj.comments.count()
+        # Annotated by Task.objects.for_listing(); fall back to a query
+        count = getattr(obj, "comments_count", None)
+        return count if count is not None else obj.comments.count()
+
+
+# ------------------------- #
+# Lists as a table (?shape=table)
+# ------------------------- #
+def _column_paths(serializer):
+    paths = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if isinstance(field, serializers.Serializer):
+            paths += [(name, *path) for path in _column_paths(field)]
+        else:
+            paths.append((name,))
+    return paths
+
+
+def as_table(serializer):
+    """
+    The data of a ``many=True`` serializer as ``{"columns": [...], "rows":
+    [[...], ...]}``, sending each key once instead of once per item. Nested
+    objects are spread over dotted columns (``assignee.email``); a missing
+    one, e.g. no assignee, is null in all of its columns.
+    """
+    paths = _column_paths(serializer.child)
+    rows  = []
+    for item in serializer.data:
+        row = []
+        for path in paths:
+            value = item
+            for key in path:
+                value = value[key] if value is not None else None
+            row.append(value)
+        rows.append(row)
+    return {"columns": [".".join(path) for path in paths], "rows": rows}
 
 
 # ------------------------- #
@@ -64,9 +108,9 @@ class TaskCreateSerializer(serializers.ModelSerializer):
             "status", "priority",
             "assignee_id", "reviewer_id",
             "due_date",
-            "id", "assignee", "reviewer", "comments_count",
+            "id", "assignee", "reviewer", "comments_count", "position",
         ]
-        read_only_fields = ["id", "assignee", "reviewer", "comments_count"]
+        read_only_fields = ["id", "assignee", "reviewer", "comments_count", "position"]
 
     # ---------- helpers ----------
     def get_comments_count(self, obj):
@@ -98,18 +142,27 @@ class TaskCreateSerializer(serializers.ModelSerializer):
         assignee_id  = validated_data.pop("assignee_id", None)
         reviewer_id  = validated_data.pop("reviewer_id", None)
 
-        return Task.objects.create(
-            board      = board,
-            created_by = self.context["request"].user,
-            assignee   = CustomUser.objects.filter(pk=assignee_id).first(),
-            reviewer   = CustomUser.objects.filter(pk=reviewer_id).first(),
+        status = validated_data.get("status", "todo")
+        task = Task.objects.create(
+            board        = board,
+            created_by   = self.context["request"].user,
+            assignee     = CustomUser.objects.filter(pk=assignee_id).first(),
+            reviewer     = CustomUser.objects.filter(pk=reviewer_id).first(),
+            position     = ranking.position_at_end(board.pk, status),
+            completed_at = timezone.now() if status == "done" else None,
             **validated_data,
         )
+        ranking.check_length(task)
+        analytics.record_transition(task, "", task.status)
+        if task.due_date is not None:
+            # The reminder sweep may already have passed this due date
+            enqueue_on_commit("remind_task", {"task_id": task.pk})
+        return task
 
 
 
 # ------------------------- #
-# Task – update serializer for PATCH requests
+# Task – update serializer for PATCH and PUT requests
 # ------------------------- #
 class TaskUpdateSerializer(serializers.ModelSerializer):
     """Handles partial task updates with board membership validation."""
@@ -123,9 +176,9 @@ class TaskUpdateSerializer(serializers.ModelSerializer):
             "status", "priority",
             "assignee_id", "reviewer_id",
             "due_date",
-            "id", "board", "assignee", "reviewer",
+            "id", "board", "assignee", "reviewer", "version",
         ]
-        read_only_fields = ["id", "board", "assignee", "reviewer"]
+        read_only_fields = ["id", "board", "assignee", "reviewer", "version"]
 
     def validate(self, attrs):
         task  = self.instance
@@ -142,20 +195,105 @@ class TaskUpdateSerializer(serializers.ModelSerializer):
         return attrs
 
     def update(self, instance, validated_data):
-        # Update simple fields
-        for field in ("title", "description", "status", "priority", "due_date"):
-            if field in validated_data:
+        version = concurrency.expected_version(self.context.get("request"), instance)
+        due_date_changed = (
+            validated_data.get("due_date") is not None
+            and validated_data["due_date"] != instance.due_date
+        )
+        old = {
+            "status":   instance.status,
+            "assignee": instance.assignee_id,
+            "reviewer": instance.reviewer_id,
+        }
+
+        # Update simple fields, remembering which ones actually change
+        changed = []
+        for field in ("title", "description", "priority", "due_date"):
+            if field in validated_data and validated_data[field] != getattr(instance, field):
                 setattr(instance, field, validated_data[field])
+                changed.append(field)
 
-        # Update relations if new IDs were provided
-        if "assignee_id" in validated_data:
-            instance.assignee = CustomUser.objects.filter(pk=validated_data["assignee_id"]).first()
-        if "reviewer_id" in validated_data:
-            instance.reviewer = CustomUser.objects.filter(pk=validated_data["reviewer_id"]).first()
+        # A card changing column goes to the end of the new one
+        instance.set_status(validated_data.get("status", instance.status))
+        if instance.status != old["status"]:
+            instance.position = ranking.position_at_end(instance.board_id, instance.status)
+            changed += ["status", "completed_at", "position"]
 
-        instance.save()
+        # Update relations if new IDs were provided
+        for role in ("assignee", "reviewer"):
+            key = f"{role}_id"
+            if key in validated_data:
+                user = CustomUser.objects.filter(pk=validated_data[key]).first()
+                if getattr(user, "pk", None) != old[role]:
+                    setattr(instance, role, user)
+                    changed.append(role)
+
+        if not changed:
+            return instance
+
+        concurrency.save_changed(instance, changed, version)
+        ranking.check_length(instance)
+        analytics.record_transition(instance, old["status"], instance.status)
+        if due_date_changed:
+            # The reminder sweep may already have passed the new due date
+            enqueue_on_commit("remind_task", {"task_id": instance.pk})
+        self._record_activity(instance, old)
         return instance
 
+    def _record_activity(self, task, old):
+        actor = self.context["request"].user
+        if task.status != old["status"]:
+            activity.record(task.board, "task_status_changed", actor, task,
+                            old=old["status"], new=task.status)
+        for role in ("assignee", "reviewer"):
+            new_id = getattr(task, f"{role}_id")
+            if new_id != old[role]:
+                activity.record(task.board, "task_reassigned", actor, task,
+                                role=role, old=old[role], new=new_id)
+
+
+# ------------------------- #
+# Task – move (drag & drop) serializer
+# ------------------------- #
+class TaskMoveSerializer(serializers.Serializer):
+    """
+    Target of a card move: the column (`status`) and the neighbours the card
+    should end up between. `after_id` is the card directly above, `before_id`
+    the card directly below; either may be omitted.
+    """
+    status    = serializers.ChoiceField(choices=Task.STATUS_CHOICES, required=False)
+    after_id  = serializers.IntegerField(required=False, allow_null=True)
+    before_id = serializers.IntegerField(required=False, allow_null=True)
+
+    def validate(self, attrs):
+        task   = self.context["task"]
+        status = attrs.get("status", task.status)
+
+        for key in ("after_id", "before_id"):
+            pk = attrs.get(key)
+            if pk is None:
+                attrs[key.removesuffix("_id")] = None
+                continue
+            neighbour = Task.objects.filter(
+                pk=pk, board_id=task.board_id, status=status,
+            ).exclude(pk=task.pk).only("pk", "position").first()
+            if neighbour is None:
+                raise serializers.ValidationError(
+                    {key: "Task is not in the target column of this board."}
+                )
+            attrs[key.removesuffix("_id")] = neighbour
+
+        after, before = attrs["after"], attrs["before"]
+        if after is not None and before is not None and (
+            after.pk == before.pk or after.position > before.position
+        ):
+            raise serializers.ValidationError(
+                {"before_id": "Must be a different card, below the one in after_id."}
+            )
+
+        attrs["status"] = status
+        return attrs
+
 
 # ------------------------- #
 # Comment – read-only serializer
@@ -209,17 +347,23 @@ class BoardSerializer(serializers.ModelSerializer):
             "owner_id",
         ]
 
+    # The counters are annotated by Board.objects.with_stats(); boards
+    # loaded without it fall back to one query per counter.
     def get_member_count(self, obj):
-        return obj.members.count()
+        count = getattr(obj, "member_count", None)
+        return count if count is not None else obj.members.count()
 
     def get_ticket_count(self, obj):
-        return obj.tasks.count()
+        count = getattr(obj, "ticket_count", None)
+        return count if count is not None else obj.tasks.count()
 
     def get_tasks_to_do_count(self, obj):
-        return obj.tasks.filter(status="todo").count()
+        count = getattr(obj, "tasks_to_do_count", None)
+        return count if count is not None else obj.tasks.filter(status="todo").count()
 
     def get_tasks_high_prio_count(self, obj):
-        return obj.tasks.filter(priority="high").count()
+        count = getattr(obj, "tasks_high_prio_count", None)
+        return count if count is not None else obj.tasks.filter(priority="high").count()
 
 
 # ------------------------- #
@@ -232,7 +376,7 @@ class BoardDetailSerializer(serializers.ModelSerializer):
 
     class Meta:
         model  = Board
-        fields = ["id", "title", "owner_id", "members", "tasks"]
+        fields = ["id", "title", "owner_id", "members", "tasks", "version"]
 
 
 # ------------------------- #
@@ -246,11 +390,65 @@ class BoardUpdateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model  = Board
-        fields = ["id", "title", "members", "owner_data", "members_data"]
+        fields = ["id", "title", "members", "owner_data", "members_data", "version"]
+        read_only_fields = ["version"]
 
     def update(self, instance, validated_data):
-        instance.title = validated_data.get("title", instance.title)
-        members        = validated_data.pop("members", [])
-        instance.save()
-        instance.members.set(members)
+        version     = concurrency.expected_version(self.context.get("request"), instance)
+        old_members = {m.pk for m in instance.members.all()}
+        members     = validated_data.pop("members", [])
+        new_members = {m.pk for m in members}
+        changed     = []
+        if "title" in validated_data and validated_data["title"] != instance.title:
+            instance.title = validated_data["title"]
+            changed.append("title")
+
+        if not changed and new_members == old_members:
+            return instance
+
+        # The member list lives in its own table; the version bump still
+        # guards it, so the row update and the set() commit together
+        with transaction.atomic(using=sharding.current()):
+            concurrency.save_changed(instance, changed, version)
+            if new_members != old_members:
+                instance.members.set(members)
+
+        actor = self.context["request"].user
+        if new_members - old_members:
+            activity.record(instance, "members_added", actor,
+                            user_ids=sorted(new_members - old_members))
+        if old_members - new_members:
+            activity.record(instance, "members_removed", actor,
+                            user_ids=sorted(old_members - new_members))
         return instance
+
+
+# ------------------------- #
+# Board – deletion progress
+# ------------------------- #
+class BoardDeletionSerializer(serializers.ModelSerializer):
+    """Progress of a background board deletion."""
+    status = serializers.SerializerMethodField()
+
+    class Meta:
+        model  = BoardDeletion
+        fields = [
+            "board_id", "status", "requested_at", "finished_at",
+            "deleted_comments", "deleted_tasks", "deleted_members",
+        ]
+
+    def get_status(self, obj):
+        return "done" if obj.finished_at else "pending"
+
+
+# ------------------------- #
+# Activity – read-only serializer
+# ------------------------- #
+class ActivitySerializer(serializers.ModelSerializer):
+    """One entry of a board's activity feed."""
+    actor = UserMiniSerializer(read_only=True, allow_null=True)
+    task  = serializers.PrimaryKeyRelatedField(read_only=True)
+
+    class Meta:
+        model  = Activity
+        fields = ["id", "verb", "actor", "task", "data", "created_at"]
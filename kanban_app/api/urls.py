@@ -1,11 +1,18 @@
+from django.conf import settings
 from django.urls import path
 from kanban_app.api.views import (
     BoardListCreateView,
     BoardDetailView,
+    BoardDeletionView,
+    BoardActivityView,
+    BoardAnalyticsView,
+    SummaryView,
     MyAssignedTasksView,
     MyReviewingTasksView,
     TaskListCreateView,
     TaskDetailView,
+    TaskMoveView,
+    TaskRestoreView,
     TaskCommentsView,
     CommentDeleteView,
 )
@@ -14,6 +21,12 @@ urlpatterns = [
     # BOARDS
     path("boards/",           BoardListCreateView.as_view(), name="board-list-create"),
     path("boards/<int:id>/",  BoardDetailView.as_view(),     name="board-detail"),
+    path("boards/<int:id>/deletion/", BoardDeletionView.as_view(), name="board-deletion"),
+    path("boards/<int:id>/activity/", BoardActivityView.as_view(), name="board-activity"),
+    path("boards/<int:id>/analytics/", BoardAnalyticsView.as_view(), name="board-analytics"),
+
+    # DASHBOARD
+    path("summary/", SummaryView.as_view(), name="summary"),
 
     # TASK-LISTEN
     path("tasks/assigned-to-me/", MyAssignedTasksView.as_view(),  name="tasks-assigned"),
@@ -24,8 +37,28 @@ urlpatterns = [
 
     # TASK DETAIL → GET, PATCH & DELETE
     path("tasks/<int:id>/",   TaskDetailView.as_view(),       name="task-detail"),
+    path("tasks/<int:id>/move/", TaskMoveView.as_view(),      name="task-move"),
+    path("tasks/<int:id>/restore/", TaskRestoreView.as_view(), name="task-restore"),
     
     # TASK COMMENTS → GET + POST
     path("tasks/<int:task_id>/comments/", TaskCommentsView.as_view(), name="task-comments"),
     path("tasks/<int:task_id>/comments/<int:comment_id>/",CommentDeleteView.as_view(),name="comment-delete"),
 ]
+
+# Under ASGI the hot read endpoints are served by async views; other methods
+# on the same URLs still reach the DRF views above.
+if settings.ASYNC_READ_VIEWS:
+    from kanban_app.api import async_views
+
+    _async = {
+        "board-list-create": async_views.board_list,
+        "board-detail":      async_views.board_detail,
+        "tasks-assigned":    async_views.tasks_assigned,
+        "tasks-reviewing":   async_views.tasks_reviewing,
+        "task-list-create":  async_views.task_list,
+        "task-comments":     async_views.task_comments,
+    }
+    urlpatterns = [
+        path(str(p.pattern), _async[p.name], name=p.name) if p.name in _async else p
+        for p in urlpatterns
+    ]
@@ -1,43 +1,242 @@
+import hashlib
+from datetime import timedelta
+
 from django.shortcuts import get_object_or_404
 from django.db.models import Q
+from django.http import HttpResponse
+from django.utils import timezone
 
 from rest_framework.generics import (
     ListCreateAPIView,
     RetrieveUpdateDestroyAPIView,
     ListAPIView,
     RetrieveUpdateAPIView,
+    RetrieveAPIView,
     DestroyAPIView,
 )
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.views import APIView
+
+from rest_framework.exceptions import PermissionDenied, ValidationError
 
-from kanban_app.models import Board, Task, Comment
+from core.singleflight import SingleFlight
+from kanban_app import activity, analytics, archive, concurrency, generations, ranking, sharding, summary
+from kanban_app.deletion import request_board_deletion
+from kanban_app.jobs import enqueue_on_commit
+from kanban_app.models import Board, BoardDeletion, Task, Comment
+from kanban_app.api.pagination import ActivityPagination, CommentPagination
 from kanban_app.api.serializers import (
+    ActivitySerializer,
     BoardSerializer,
+    BoardDeletionSerializer,
     BoardDetailSerializer,
     BoardUpdateSerializer,
     TaskSerializer,
     TaskCreateSerializer,
     TaskUpdateSerializer,
+    TaskMoveSerializer,
     CommentSerializer,
     CommentCreateSerializer,
+    as_table,
 )
 from auth_app.models import CustomUser
 
 
+def include_archived(request):
+    """True if the client asked for archived tasks (``?include_archived=1``)."""
+    return request.GET.get("include_archived", "").lower() in ("1", "true", "yes")
+
+
+def visible_tasks(request):
+    """`Task.objects`, or `Task.with_archived` for ``?include_archived=1``."""
+    return Task.with_archived if include_archived(request) else Task.objects
+
+
+def comment_thread(request, task):
+    """Comments of ``task`` with their authors, in the requested order and range."""
+    comments = task.comments.select_related("author").order_by(CommentPagination.ordering_for(request))
+    after_id = request.GET.get("after_id")
+    if after_id:
+        try:
+            comments = comments.filter(id__gt=int(after_id))
+        except ValueError:
+            raise ValidationError({"after_id": "Must be a number."})
+    return comments
+
+
+# ==========================
+# SHARDING
+# ==========================
+
+class ShardRoutingMixin:
+    """
+    Pin the request to the shard of its board (kanban_app.sharding). The
+    board id is the URL kwarg ``board_url_kwarg``, or the board of the task
+    in ``task_url_kwarg``; unsafe methods fail with 503 while the board is
+    being moved.
+    """
+    board_url_kwarg = None
+    task_url_kwarg  = None
+
+    @classmethod
+    def board_id_from_url(cls, kwargs):
+        if cls.board_url_kwarg:
+            return kwargs.get(cls.board_url_kwarg)
+        if cls.task_url_kwarg and kwargs.get(cls.task_url_kwarg) is not None:
+            return sharding.board_of_task(kwargs[cls.task_url_kwarg])
+        return None
+
+    def get_shard(self, request):
+        """The shard holding this request's board; None for 'default'."""
+        board_id = self.board_id_from_url(self.kwargs)
+        if board_id is None:
+            return None
+        return sharding.locate(board_id, write=request.method not in SAFE_METHODS)
+
+    def dispatch(self, request, *args, **kwargs):
+        # Nested requests (api/batch/) start unpinned, whatever their caller uses
+        token = sharding.pin(None)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            sharding.unpin(token)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if sharding.enabled():
+            sharding.pin(self.get_shard(request))
+
+
+class FanOutMixin:
+    """List views over many boards: run the query on every shard and merge the rows."""
+
+    def filter_queryset(self, queryset):
+        return sharding.fan_out(super().filter_queryset(queryset))
+
+
+# ==========================
+# COALESCED READS
+# ==========================
+
+# Concurrent identical board reads build the payload once (core.singleflight)
+board_list_flight   = SingleFlight("board-list")
+board_detail_flight = SingleFlight("board-detail")
+
+
+def board_role(user, board):
+    """``"owner"`` or ``"member"``; PermissionDenied for anyone else."""
+    if user.pk == board.owner_id:
+        return "owner"
+    if not board.members.filter(pk=user.pk).exists():
+        raise PermissionDenied("Access denied – not a board member.")
+    return "member"
+
+
+def board_detail_key(renderer, board, generation, role, archived):
+    # The role is part of the key so that a payload is never shared between
+    # viewers with different permissions on the board; the generation
+    # changes with its tasks (kanban_app.generations)
+    return f"{renderer.format}:{board.pk}:{board.version}:{generation}:{role}:{int(archived)}"
+
+
+def list_stamps(user):
+    """``(pk, version)`` of the boards in ``user``'s list (one shard), by pk."""
+    return Board.objects.accessible_to(user).order_by("pk").values_list("pk", "version")
+
+
+def board_list_key(renderer, user, stamps, generations):
+    """
+    Key of a user's board list, from the `list_stamps` of all shards and
+    the generations of those boards, in the same order.
+    """
+    digest = hashlib.sha256(repr((stamps, generations)).encode()).hexdigest()
+    return f"{renderer.format}:{user.pk}:{digest}"
+
+
+def render_bytes(renderer, data):
+    return renderer.render(data, renderer.media_type)
+
+
+def rendered_response(renderer, body):
+    return HttpResponse(body, content_type=renderer.media_type)
+
+
+# ==========================
+# TABLE SHAPE
+# ==========================
+
+def shaped(request, serializer):
+    """List data, as columns and rows (`as_table`) with ``?shape=table``."""
+    if request.GET.get("shape") == "table":
+        return as_table(serializer)
+    return serializer.data
+
+
+class TableShapeMixin:
+    """Lets list endpoints answer ``?shape=table`` (see `shaped`)."""
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get("shape") != "table":
+            return super().list(request, *args, **kwargs)
+        serializer = self.get_serializer(self.filter_queryset(self.get_queryset()), many=True)
+        return Response(shaped(request, serializer))
+
+
+# ==========================
+# VERSIONING
+# ==========================
+
+class ETagMixin:
+    """
+    Send the object's version as ``ETag`` on detail reads and updates, for
+    clients to return as ``If-Match`` on their next PATCH.
+    """
+    def get_object(self):
+        self.object = super().get_object()
+        return self.object
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        obj = getattr(self, "object", None)
+        if obj is not None and request.method in ("GET", "HEAD", "PATCH", "PUT", "POST") \
+                and 200 <= response.status_code < 300:
+            response["ETag"] = concurrency.etag(obj)
+        return response
+
+
 # ==========================
 # BOARDS
 # ==========================
 
-class BoardListCreateView(ListCreateAPIView):
+class BoardListCreateView(ShardRoutingMixin, FanOutMixin, ListCreateAPIView):
     """List all boards where user is owner or member; create new board."""
     serializer_class   = BoardSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         u = self.request.user
-        return Board.objects.filter(owner=u) | Board.objects.filter(members=u)
+        return Board.objects.accessible_to(u).with_stats()
+
+    def get_shard(self, request):
+        # New boards go to their owner's shard
+        if request.method == "POST":
+            return sharding.placement(request.user.pk)
+        return None
+
+    def list(self, request, *args, **kwargs):
+        renderer = request.accepted_renderer
+        if renderer.format == "api":
+            return super().list(request, *args, **kwargs)
+        user   = request.user
+        stamps = [stamp for part in sharding.gather(lambda: list(list_stamps(user))) for stamp in part]
+        body   = board_list_flight.do(
+            board_list_key(renderer, user, stamps, generations.get([pk for pk, _ in stamps])),
+            lambda: render_bytes(
+                renderer, self.get_serializer(self.filter_queryset(self.get_queryset()), many=True).data,
+            ),
+        )
+        return rendered_response(renderer, body)
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -55,14 +254,18 @@ class BoardListCreateView(ListCreateAPIView):
         return Response(payload, status=201)
 
 
-class BoardDetailView(RetrieveUpdateDestroyAPIView):
+class BoardDetailView(ShardRoutingMixin, ETagMixin, RetrieveUpdateDestroyAPIView):
     """View, update or delete a specific board."""
-    queryset           = Board.objects.all()
     permission_classes = [IsAuthenticated]
     lookup_field       = "id"
+    board_url_kwarg    = "id"
+
+    def get_queryset(self):
+        return Board.objects.with_details(include_archived(self.request))
 
     def get_serializer_class(self):
-        if self.request.method.upper() == "PATCH":
+        # PUT is versioned like PATCH, only with all fields required
+        if self.request.method.upper() in ("PATCH", "PUT"):
             return BoardUpdateSerializer
         return BoardDetailSerializer
 
@@ -73,46 +276,151 @@ class BoardDetailView(RetrieveUpdateDestroyAPIView):
             raise PermissionDenied("Access denied – not a board member.")
         return board
 
+    def retrieve(self, request, *args, **kwargs):
+        renderer = request.accepted_renderer
+        if renderer.format == "api":
+            return super().retrieve(request, *args, **kwargs)
+        # Only the access check runs per request; members asking for the
+        # same board version at once share one payload
+        board = get_object_or_404(Board.objects.only("id", "owner_id", "version"), id=kwargs["id"])
+        role        = board_role(request.user, board)
+        self.object = board
+        archived    = include_archived(request)
+
+        def render():
+            detail = Board.objects.with_details(archived).get(pk=board.pk)
+            return render_bytes(renderer, BoardDetailSerializer(detail).data)
+
+        key = board_detail_key(renderer, board, generations.get([board.pk])[0], role, archived)
+        return rendered_response(renderer, board_detail_flight.do(key, render))
+
     def delete(self, request, *args, **kwargs):
         board = self.get_object()
         if request.user != board.owner:
             raise PermissionDenied("Only the owner can delete the board.")
-        board.delete()
+        # Hide the board now; its tasks and comments are removed in batches
+        # in the background (progress: boards/<id>/deletion/).
+        request_board_deletion(board)
         return Response(status=204)
 
 
+class BoardDeletionView(RetrieveAPIView):
+    """Progress of a board deletion (only visible to the owner)."""
+    serializer_class   = BoardDeletionSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_object(self):
+        return get_object_or_404(
+            BoardDeletion,
+            board_id=self.kwargs["id"],
+            owner=self.request.user,
+        )
+
+
+class BoardActivityView(ShardRoutingMixin, ListAPIView):
+    """Activity feed of a board, newest first, keyset-paginated."""
+    serializer_class   = ActivitySerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class   = ActivityPagination
+    board_url_kwarg    = "id"
+
+    def get_queryset(self):
+        board = get_object_or_404(Board, id=self.kwargs["id"])
+        user  = self.request.user
+        if user != board.owner and user not in board.members.all():
+            raise PermissionDenied("Access denied – not a board member.")
+        return board.activities.select_related("actor")
+
+
+class BoardAnalyticsView(ShardRoutingMixin, APIView):
+    """
+    Cumulative flow, throughput and cycle time of a board per day.
+    GET /api/boards/<id>/analytics/?days=<n>   (default 30, max 365)
+
+    Served from the daily rollups (kanban_app.analytics); the latest changes
+    appear once the background worker has rolled them up.
+    """
+    permission_classes = [IsAuthenticated]
+    board_url_kwarg    = "id"
+    max_days = 365
+
+    def get(self, request, id):
+        board = get_object_or_404(Board, id=id)
+        user  = request.user
+        if user != board.owner and user not in board.members.all():
+            raise PermissionDenied("Access denied – not a board member.")
+        try:
+            days = min(max(int(request.query_params.get("days", 30)), 1), self.max_days)
+        except ValueError:
+            return Response({"detail": "days must be a number."}, status=400)
+
+        end   = timezone.localdate()
+        start = end - timedelta(days=days - 1)
+        return Response({
+            "statuses": analytics.STATUSES,
+            "days":     analytics.board_series(board.pk, start, end),
+        })
+
+
+# ==========================
+# DASHBOARD
+# ==========================
+
+class SummaryView(APIView):
+    """
+    Dashboard counters of the current user.
+    GET /api/summary/
+
+    Board count, tasks assigned / to review, open high-priority, in-progress,
+    overdue and due-soon tasks and the next open due date.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response(summary.get(request.user))
+
+
 # ==========================
 # TASK LISTS
 # ==========================
 
-class MyAssignedTasksView(ListAPIView):
+class MyAssignedTasksView(TableShapeMixin, FanOutMixin, ListAPIView):
     """List tasks where the user is assignee or reviewer."""
     serializer_class   = TaskSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         u = self.request.user
-        return Task.objects.filter(Q(assignee=u) | Q(reviewer=u))
+        return visible_tasks(self.request).filter(Q(assignee=u) | Q(reviewer=u)).for_listing()
 
 
-class MyReviewingTasksView(ListAPIView):
+class MyReviewingTasksView(TableShapeMixin, FanOutMixin, ListAPIView):
     """List tasks where the user is reviewer but not assignee."""
     serializer_class   = TaskSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         u = self.request.user
-        return Task.objects.filter(reviewer=u).exclude(assignee=u)
+        return visible_tasks(self.request).filter(reviewer=u).exclude(assignee=u).for_listing()
 
 
 # ==========================
 # TASK – Create and List
 # ==========================
 
-class TaskListCreateView(ListCreateAPIView):
+class TaskListCreateView(ShardRoutingMixin, TableShapeMixin, FanOutMixin, ListCreateAPIView):
     """List tasks across all accessible boards; create new task."""
     permission_classes = [IsAuthenticated]
 
+    def get_shard(self, request):
+        # A new task goes to the shard of the board named in the body
+        if request.method == "POST":
+            try:
+                return sharding.locate(request.data.get("board"), write=True)
+            except (AttributeError, TypeError, ValueError):
+                return None  # left to the serializer to reject
+        return None
+
     def get_serializer_class(self):
         if self.request.method.upper() == "POST":
             return TaskCreateSerializer
@@ -120,7 +428,7 @@ class TaskListCreateView(ListCreateAPIView):
 
     def get_queryset(self):
         u = self.request.user
-        return Task.objects.filter(Q(board__owner=u) | Q(board__members=u)).distinct()
+        return visible_tasks(self.request).accessible_to(u).for_listing()
 
 def create(self, request, *args, **kwargs):
     ser = self.get_serializer(data=request.data, context={"request": request})
@@ -132,14 +440,17 @@ def create(self, request, *args, **kwargs):
 # TASK – Detail / Update / Delete
 # ==========================
 
-class TaskDetailView(RetrieveUpdateDestroyAPIView):
+class TaskDetailView(ShardRoutingMixin, ETagMixin, RetrieveUpdateDestroyAPIView):
     """View, update or delete a specific task."""
     permission_classes = [IsAuthenticated]
     lookup_field       = "id"
-    queryset           = Task.objects.select_related("board", "assignee", "reviewer")
+    task_url_kwarg     = "id"
+
+    def get_queryset(self):
+        return visible_tasks(self.request).select_related("board", "assignee", "reviewer")
 
     def get_serializer_class(self):
-        if self.request.method.upper() == "PATCH":
+        if self.request.method.upper() in ("PATCH", "PUT"):
             return TaskUpdateSerializer
         return TaskSerializer
 
@@ -155,16 +466,83 @@ class TaskDetailView(RetrieveUpdateDestroyAPIView):
         user = self.request.user
         if user != instance.created_by and user != instance.board.owner:
             raise PermissionDenied("Only the creator or board owner may delete this task.")
+        analytics.record_transition(instance, instance.status, "")
         instance.delete()
 
 
+class TaskMoveView(TaskDetailView):
+    """
+    Move a card to another column and/or position.
+    POST /api/tasks/<id>/move/  {"status", "after_id", "before_id"}
+
+    Status and position change with a single UPDATE of this card's row,
+    guarded by the task version like PATCH (If-Match is honoured).
+    """
+    http_method_names = ["post", "options"]
+
+    def post(self, request, *args, **kwargs):
+        task = self.get_object()
+        version = concurrency.expected_version(request, task)
+        serializer = TaskMoveSerializer(data=request.data, context={"task": task})
+        serializer.is_valid(raise_exception=True)
+        target = serializer.validated_data
+
+        try:
+            position = ranking.position_for_move(
+                task, target["status"], target["after"], target["before"],
+            )
+        except ValueError:
+            # Neighbours share a key (concurrent inserts); re-space the column.
+            # Neighbours in the wrong order were rejected by the serializer.
+            enqueue_on_commit("rebalance_column", {"board_id": task.board_id, "status": target["status"]})
+            return Response({"detail": "Positions are being rebalanced, please retry."}, status=409)
+
+        old_status = task.status
+        task.set_status(target["status"])
+        task.position = position
+        concurrency.save_changed(task, ["status", "completed_at", "position"], version)
+
+        ranking.check_length(task)
+        analytics.record_transition(task, old_status, task.status)
+        if task.status != old_status:
+            activity.record(task.board, "task_status_changed", request.user, task,
+                            old=old_status, new=task.status)
+        return Response(TaskSerializer(task).data)
+
+
+class TaskRestoreView(TaskDetailView):
+    """
+    Bring an archived task back onto its board.
+    POST /api/tasks/<id>/restore/   (If-Match is honoured)
+    """
+    http_method_names = ["post", "options"]
+
+    def get_queryset(self):
+        return Task.with_archived.select_related("board", "assignee", "reviewer")
+
+    def post(self, request, *args, **kwargs):
+        task = self.get_object()
+        if task.archived_at is None:
+            return Response({"detail": "Task is not archived."}, status=400)
+        archive.restore(task, concurrency.expected_version(request, task))
+        return Response(TaskSerializer(task).data)
+
+
 # ==========================
 # TASK – Comments List / Create
 # ==========================
 
-class TaskCommentsView(ListCreateAPIView):
-    """List or create comments for a task."""
+class TaskCommentsView(ShardRoutingMixin, ListCreateAPIView):
+    """
+    List or create comments for a task.
+
+    GET takes ``?order=newest``, ``?after_id=<id>`` (only newer comments, for
+    refreshing a thread) and ``?limit=`` / ``?cursor=`` for keyset pages
+    (see CommentPagination). ``X-Total-Count`` is the size of the thread.
+    """
     permission_classes = [IsAuthenticated]
+    pagination_class   = CommentPagination
+    task_url_kwarg     = "task_id"
 
     def get_serializer_class(self):
         if self.request.method.upper() == "POST":
@@ -173,14 +551,20 @@ class TaskCommentsView(ListCreateAPIView):
 
     def get_queryset(self):
         task_id = self.kwargs["task_id"]
-        task = get_object_or_404(Task.objects.select_related("board"), pk=task_id)
+        task = get_object_or_404(visible_tasks(self.request).select_related("board"), pk=task_id)
 
         user = self.request.user
         board = task.board
         if user != board.owner and user not in board.members.all():
             raise PermissionDenied("Only board members may view or create comments.")
 
-        return task.comments.all()
+        self.task = task
+        return comment_thread(self.request, task)
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        response["X-Total-Count"] = str(self.task.comments.count())
+        return response
 
     def create(self, request, *args, **kwargs):
         task = get_object_or_404(Task.objects.select_related("board"), pk=self.kwargs["task_id"])
@@ -193,6 +577,7 @@ class TaskCommentsView(ListCreateAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         comment = serializer.save(author=user, task=task)
+        activity.record(board, "comment_added", user, task, comment_id=comment.pk)
 
         return Response(CommentSerializer(comment).data, status=201)
 
@@ -204,9 +589,10 @@ class TaskCommentsView(ListCreateAPIView):
 # COMMENT – Delete
 # ==========================
 
-class CommentDeleteView(DestroyAPIView):
+class CommentDeleteView(ShardRoutingMixin, DestroyAPIView):
     """Delete a specific comment (only allowed for author)."""
     permission_classes = [IsAuthenticated]
+    task_url_kwarg     = "task_id"
 
     def get_object(self):
         task_id    = self.kwargs["task_id"]
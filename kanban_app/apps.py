@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class KanbanAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'kanban_app'
+
+    def ready(self):
+        # Register background job handlers
+        from kanban_app import analytics, archive, deletion, idempotency, ranking, reminders  # noqa: F401
+        # Connect the signal receivers
+        from kanban_app import generations, sharding, summary  # noqa: F401
@@ -0,0 +1,80 @@
+"""
+Archival of long-finished tasks.
+
+Tasks that have been ``done`` for more than ``TASK_ARCHIVE_AFTER_DAYS`` get
+`Task.archived_at` set by the ``archive_done_tasks`` job (or ``python
+manage.py archive_done_tasks``). Archived tasks, and with them their
+comments, disappear from `Task.objects` and therefore from all listings,
+board counters and the board detail, and the column index only covers
+unarchived rows, so the hot data stays the same size however much history
+a board collects. They are still reachable with ``?include_archived=1``
+(`Task.with_archived`) and can be restored.
+
+Batches are picked through the partial ``task_archivable_idx`` index and
+updated in short transactions of ``TASK_ARCHIVE_BATCH_SIZE`` rows.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from kanban_app import concurrency, generations, ranking, sharding, summary
+from kanban_app.jobs import job
+from kanban_app.models import Task
+
+
+def _batch_size():
+    return getattr(settings, "TASK_ARCHIVE_BATCH_SIZE", 1000)
+
+
+def archivable(now=None):
+    cutoff = (now or timezone.now()) - timedelta(days=settings.TASK_ARCHIVE_AFTER_DAYS)
+    return Task.objects.filter(status="done", completed_at__lt=cutoff)
+
+
+def archive_batch(batch_size=None, now=None):
+    """Archive up to ``batch_size`` tasks; return how many."""
+    now = now or timezone.now()
+    with transaction.atomic(using=sharding.current()):
+        rows = list(
+            archivable(now).order_by("completed_at")
+            .values_list("pk", "board_id", "assignee_id", "reviewer_id")[:batch_size or _batch_size()]
+        )
+        if not rows:
+            return 0
+        archived = Task.all_objects.filter(
+            pk__in=[pk for pk, *_ in rows], archived_at__isnull=True,
+        ).update(archived_at=now)
+        # Archived tasks drop out of the boards and the dashboard counters
+        generations.touch([board_id for _, board_id, _, _ in rows])
+        summary.invalidate([uid for _, _, *users in rows for uid in users])
+    return archived
+
+
+def archive_done_tasks(batch_size=None):
+    """Archive every task done for long enough; return how many."""
+    total = 0
+    while archived := archive_batch(batch_size):
+        total += archived
+    return total
+
+
+@job("archive_done_tasks", each_shard=True)
+def archive_done_tasks_job():
+    archive_done_tasks()
+
+
+def restore(task, version):
+    """
+    Bring an archived task back to the end of its column. Its completion
+    time restarts, so the next archive run does not take it again at once.
+    """
+    task.archived_at = None
+    task.position    = ranking.position_at_end(task.board_id, task.status)
+    changed = ["archived_at", "position"]
+    if task.status == "done":
+        task.completed_at = timezone.now()
+        changed.append("completed_at")
+    concurrency.save_changed(task, changed, version)
+    ranking.check_length(task)
@@ -0,0 +1,65 @@
+"""
+Optimistic concurrency control for boards and tasks.
+
+Every update writes only the changed columns with
+``UPDATE ... SET ..., version = version + 1 WHERE id = ? AND version = ?``.
+If another request updated the row in the meantime, no row matches and the
+client gets ``412 Precondition Failed`` instead of silently overwriting the
+other change. Clients send the version they last saw as ``If-Match`` (the
+``ETag`` of the detail endpoints); without the header, the version that was
+just loaded is used.
+"""
+from django.db.models import F
+from django.db.models.signals import post_save
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class PreconditionFailed(APIException):
+    status_code    = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = "The resource was modified by someone else. Reload and try again."
+    default_code   = "precondition_failed"
+
+
+def etag(instance):
+    return f'"{instance.version}"'
+
+
+def expected_version(request, instance):
+    """
+    The version the client wants to update: taken from ``If-Match`` when
+    present (412 if it is already outdated), else the loaded version.
+    """
+    header = request.headers.get("If-Match") if request is not None else None
+    if not header or header.strip() == "*":
+        return instance.version
+
+    for tag in header.split(","):
+        tag = tag.strip().removeprefix("W/").strip('"')
+        if tag.isdigit() and int(tag) == instance.version:
+            return instance.version
+    raise PreconditionFailed()
+
+
+def save_changed(instance, fields, version):
+    """
+    Write ``fields`` of ``instance`` if the row still has ``version`` and
+    bump the version; raise `PreconditionFailed` otherwise.
+
+    Sends ``post_save`` like ``instance.save(update_fields=fields)`` would.
+    """
+    model  = type(instance)
+    values = {
+        model._meta.get_field(name).attname: getattr(instance, model._meta.get_field(name).attname)
+        for name in fields
+    }
+    updated = model._base_manager.filter(pk=instance.pk, version=version).update(
+        version=F("version") + 1, **values,
+    )
+    if not updated:
+        raise PreconditionFailed()
+    instance.version = version + 1
+    post_save.send(
+        sender=model, instance=instance, created=False,
+        update_fields=frozenset([*fields, "version"]), raw=False, using=instance._state.db,
+    )
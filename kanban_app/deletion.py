@@ -0,0 +1,109 @@
+"""
+Chunked background deletion of boards.
+
+Deleting a board through the API only sets `Board.deleted_at`, which hides it
+(and its tasks) immediately, and records a `BoardDeletion`. The rows are then
+removed by `purge_batch` in bounded batches of raw DELETEs: no cascade
+collector loads the tasks and comments into memory, and every batch is its
+own short transaction, so memory use and lock time do not grow with the
+board size. The purge runs as a ``purge_board`` job (see kanban_app.jobs).
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from kanban_app import sharding, summary
+from kanban_app.jobs import enqueue_on_commit, job
+from kanban_app.models import (
+    Activity, Board, BoardDailyStats, BoardDeletion, Comment, Reminder, StatusTransition, Task,
+)
+
+
+def _batch_size():
+    return getattr(settings, "BOARD_PURGE_BATCH_SIZE", 1000)
+
+
+def _purge_steps(board_id):
+    """
+    Rows belonging to a board, children before parents.
+
+    Raw deletes skip Django's cascades, so every model pointing at a task or
+    a board must be listed here. Each entry is
+    ``(BoardDeletion counter or None, queryset)``.
+    """
+    return [
+        (None,               Activity.objects.filter(board_id=board_id)),
+        ("deleted_comments", Comment.objects.filter(task__board_id=board_id)),
+        (None,               Reminder.objects.filter(task__board_id=board_id)),
+        (None,               StatusTransition.objects.filter(board_id=board_id)),
+        (None,               BoardDailyStats.objects.filter(board_id=board_id)),
+        ("deleted_tasks",    Task.all_objects.filter(board_id=board_id)),
+        ("deleted_members",  Board.members.through.objects.filter(board_id=board_id)),
+    ]
+
+
+def request_board_deletion(board):
+    """Hide the board at once and queue its rows for purging."""
+    with transaction.atomic(using=sharding.current()):
+        Board.all_objects.filter(pk=board.pk).update(deleted_at=timezone.now())
+        deletion, _ = BoardDeletion.objects.get_or_create(
+            board_id=board.pk,
+            defaults={"owner_id": board.owner_id},
+        )
+        enqueue_on_commit("purge_board", {"board_id": board.pk})
+        # The soft delete sends no signals; drop the dashboard summaries here
+        summary.invalidate([board.owner_id, *board.members.values_list("pk", flat=True)])
+    return deletion
+
+
+def _delete_batch(queryset, batch_size):
+    """Raw-delete up to ``batch_size`` rows of ``queryset``; return the count."""
+    pks = list(queryset.order_by().values_list("pk", flat=True)[:batch_size])
+    if pks:
+        queryset.model._base_manager.filter(pk__in=pks)._raw_delete(queryset.db)
+    return len(pks)
+
+
+def purge_batch(deletion, batch_size=None):
+    """
+    Remove one batch of rows for ``deletion``.
+
+    Returns True once everything, including the board row, is gone.
+    """
+    batch_size = batch_size or _batch_size()
+
+    for counter, queryset in _purge_steps(deletion.board_id):
+        with transaction.atomic(using=sharding.current()):
+            deleted = _delete_batch(queryset, batch_size)
+            if deleted and counter:
+                BoardDeletion.objects.filter(pk=deletion.pk).update(
+                    **{counter: F(counter) + deleted}
+                )
+        if deleted:
+            return False
+
+    with transaction.atomic(using=sharding.current()):
+        board = Board.all_objects.filter(pk=deletion.board_id)
+        board._raw_delete(board.db)
+        BoardDeletion.objects.filter(pk=deletion.pk).update(finished_at=timezone.now())
+    if sharding.enabled():
+        sharding.forget(deletion.board_id)
+    return True
+
+
+def purge_board(deletion, batch_size=None):
+    """Purge all rows of ``deletion`` batch by batch."""
+    while not purge_batch(deletion, batch_size):
+        pass
+
+
+@job("purge_board")
+def purge_board_job(board_id):
+    deletion = BoardDeletion.objects.filter(board_id=board_id, finished_at__isnull=True).first()
+    if deletion is not None:
+        purge_board(deletion)
+
+
+def pending_deletions():
+    return BoardDeletion.objects.filter(finished_at__isnull=True).order_by("requested_at")
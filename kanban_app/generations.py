@@ -0,0 +1,72 @@
+"""
+Content generations of boards, for the keys of the coalesced board reads.
+
+A board's `version` only changes with the board itself, but its detail also
+shows the tasks, and the board list their counts. A generation is a
+timestamp in the cache, renewed once a transaction commits that changed
+what the board shows of its tasks: a task saved or deleted, a comment added
+or deleted, tasks archived or a column rebalanced. `kanban_app.api.views`
+puts the generations into the singleflight keys, so a shared result is
+never reused after such a write, while task writes still touch only their
+own rows.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from kanban_app import sharding
+from kanban_app.models import Comment, Task
+
+
+def _key(board_id):
+    return f"board-gen:{board_id}"
+
+
+def touch(board_ids):
+    """Renew the generations of ``board_ids`` once the transaction commits."""
+    keys = {_key(pk) for pk in board_ids if pk is not None}
+    if keys:
+        transaction.on_commit(
+            lambda: cache.set_many(dict.fromkeys(keys, time.time_ns()), None),
+            using=sharding.current(),
+        )
+
+
+def get(board_ids):
+    """The generation of each of ``board_ids`` (0 if never touched)."""
+    found = cache.get_many([_key(pk) for pk in board_ids])
+    return [found.get(_key(pk), 0) for pk in board_ids]
+
+
+async def aget(board_ids):
+    found = await cache.aget_many([_key(pk) for pk in board_ids])
+    return [found.get(_key(pk), 0) for pk in board_ids]
+
+
+# ==========================
+# Invalidation
+# ==========================
+
+@receiver(post_save, sender=Task, dispatch_uid="generation_task_saved")
+@receiver(post_delete, sender=Task, dispatch_uid="generation_task_deleted")
+def _task_changed(sender, instance, origin=None, **kwargs):
+    # Queryset deletes only happen when a deleted board is purged
+    if not isinstance(origin, QuerySet):
+        touch([instance.board_id])
+
+
+@receiver(post_save, sender=Comment, dispatch_uid="generation_comment_saved")
+@receiver(post_delete, sender=Comment, dispatch_uid="generation_comment_deleted")
+def _comment_changed(sender, instance, created=True, origin=None, **kwargs):
+    # Boards only show how many comments a task has
+    if created and not isinstance(origin, QuerySet):
+        # The comment views load the task anyway; otherwise the board of a
+        # task is looked up once per process
+        if Comment.task.is_cached(instance):
+            touch([instance.task.board_id])
+        else:
+            touch([sharding.board_of_task(instance.task_id)])
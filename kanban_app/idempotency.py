@@ -0,0 +1,148 @@
+"""
+Idempotency keys for the create endpoints.
+
+A client that may retry ``POST /api/boards/``, ``POST /api/tasks/`` or
+``POST /api/tasks/<id>/comments/`` sends an ``Idempotency-Key`` header. The
+first request with a key inserts an `IdempotencyKey` row before it runs and
+stores its response afterwards; a retry with the same key replays that
+response without running the view again. A duplicate that arrives while the
+first request is still running polls the row until the response is stored.
+
+Keys are scoped to the ``Authorization`` header and expire after
+``IDEMPOTENCY_KEY_TTL`` seconds (``python manage.py purge_idempotency_keys``
+removes old rows). Only successes and client errors that a retry would
+repeat are stored; server errors and refusals that may pass later
+(`RETRYABLE`, e.g. 429 or 409) release the key, so the client can retry.
+"""
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import JsonResponse, HttpResponse
+from django.utils import timezone
+
+from kanban_app.jobs import job
+from kanban_app.models import IdempotencyKey
+
+
+# URL names of the endpoints that accept Idempotency-Key
+URL_NAMES = {"board-list-create", "task-list-create", "task-comments"}
+
+POLL_INTERVAL = 0.05
+
+# Client errors that depend on state or timing rather than on the request:
+# authentication, permissions, throttling, conflicts
+RETRYABLE = {401, 403, 408, 409, 423, 425, 429}
+
+
+def _ttl():
+    return timedelta(seconds=getattr(settings, "IDEMPOTENCY_KEY_TTL", 86400))
+
+
+def _lock_timeout():
+    return timedelta(seconds=getattr(settings, "IDEMPOTENCY_LOCK_TIMEOUT", 60))
+
+
+def wait_timeout():
+    return getattr(settings, "IDEMPOTENCY_WAIT_TIMEOUT", 10)
+
+
+def fingerprint(request):
+    """Hash of what makes two requests "the same": method, path and body."""
+    digest = hashlib.sha256()
+    for part in (request.method, request.get_full_path()):
+        digest.update(part.encode() + b"\0")
+    digest.update(request.body)
+    return digest.hexdigest()
+
+
+def scope(request):
+    auth = request.META.get("HTTP_AUTHORIZATION")
+    return hashlib.sha256(auth.encode()).hexdigest() if auth else None
+
+
+def claim(scope, key, fingerprint):
+    """
+    Insert the row for ``key`` unless it exists.
+    Return ``(record, created)``; expired or abandoned rows are replaced.
+    ``record`` is None if the row vanished in between (try again).
+    """
+    now    = timezone.now()
+    record = None
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(
+                    scope=scope, key=key, fingerprint=fingerprint, created_at=now,
+                ), True
+        except IntegrityError:
+            pass
+        record = IdempotencyKey.objects.filter(scope=scope, key=key).first()
+        if record is None:
+            continue
+        abandoned = record.status_code is None and record.created_at < now - _lock_timeout()
+        if record.created_at >= now - _ttl() and not abandoned:
+            return record, False
+        # Conditional on created_at so only one request takes the key over
+        IdempotencyKey.objects.filter(pk=record.pk, created_at=record.created_at).delete()
+    return record, False
+
+
+def outcome(record, fingerprint):
+    """
+    The response for a duplicate of ``record``, or None while the first
+    request is still running.
+    """
+    if record.fingerprint != fingerprint:
+        return JsonResponse(
+            {"detail": "This Idempotency-Key was used for a different request."}, status=422,
+        )
+    if record.status_code is None:
+        return None
+    response = HttpResponse(bytes(record.body), status=record.status_code,
+                            content_type=record.content_type or None)
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+def in_progress():
+    response = JsonResponse(
+        {"detail": "A request with this Idempotency-Key is still being processed."}, status=409,
+    )
+    response["Retry-After"] = "1"
+    return response
+
+
+def storable(response):
+    status = response.status_code
+    if response.streaming:
+        return False
+    return 200 <= status < 300 or (400 <= status < 500 and status not in RETRYABLE)
+
+
+def store(record, response):
+    """Save the response for replays, or release the key if it may differ on retry."""
+    if not storable(response):
+        release(record)
+        return
+    IdempotencyKey.objects.filter(pk=record.pk).update(
+        status_code=response.status_code,
+        content_type=response.get("Content-Type", ""),
+        body=response.content,
+    )
+
+
+def release(record):
+    IdempotencyKey.objects.filter(pk=record.pk, status_code__isnull=True).delete()
+
+
+def purge_expired():
+    """Delete expired keys; return how many."""
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=timezone.now() - _ttl()).delete()
+    return deleted
+
+
+@job("purge_idempotency_keys")
+def purge_idempotency_keys():
+    purge_expired()
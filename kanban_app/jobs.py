@@ -0,0 +1,188 @@
+"""
+Database-backed background jobs.
+
+Register a handler with `@job("name")`, enqueue work with `enqueue` (or
+`enqueue_on_commit` inside a request, so the job only exists once the data
+it needs is committed) and run ``python manage.py run_worker``. Workers also
+enqueue the maintenance jobs of ``PERIODIC_JOBS`` when they are due
+(`enqueue_periodic`).
+
+Workers claim jobs with ``SELECT ... FOR UPDATE SKIP LOCKED`` where the
+database supports it. On SQLite a job is claimed by a conditional
+``UPDATE ... WHERE status='queued'``; only the worker whose update matched
+a row owns the job. A claim older than ``JOB_LOCK_TIMEOUT`` can be taken
+over; the worker that lost it records nothing more. Failed jobs are
+retried with exponential backoff.
+
+With board shards (kanban_app.sharding) a job runs on the shard of the
+``board_id`` or ``task_id`` in its payload; handlers registered with
+``each_shard=True`` run once on every shard.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from kanban_app import sharding
+from kanban_app.models import Job
+
+
+logger = logging.getLogger(__name__)
+
+_handlers   = {}
+_each_shard = set()
+
+
+def job(name, each_shard=False):
+    """Register the decorated function as handler for jobs called ``name``."""
+    def decorator(func):
+        _handlers[name] = func
+        if each_shard:
+            _each_shard.add(name)
+        return func
+    return decorator
+
+
+def get_handler(name):
+    return _handlers[name]
+
+
+# ==========================
+# Enqueueing
+# ==========================
+
+def enqueue(name, payload=None, run_at=None, max_attempts=None):
+    """Create a queued job. ``payload`` is passed to the handler as kwargs."""
+    if name not in _handlers:
+        raise KeyError(f"No job handler registered for '{name}'.")
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+
+
+def enqueue_on_commit(name, payload=None, **kwargs):
+    """Enqueue once the current transaction commits (at once outside one)."""
+    transaction.on_commit(lambda: enqueue(name, payload, **kwargs), using=sharding.current())
+
+
+def enqueue_periodic(now=None):
+    """
+    Enqueue every job of ``PERIODIC_JOBS`` (name -> seconds) that is not
+    queued or running and was not scheduled within its interval; return
+    the names. Workers racing here may enqueue a job twice, which the
+    periodic jobs tolerate.
+    """
+    now     = now or timezone.now()
+    created = []
+    for name, every in getattr(settings, "PERIODIC_JOBS", {}).items():
+        recent = Job.objects.filter(name=name).filter(
+            Q(status__in=("queued", "running")) | Q(run_at__gt=now - timedelta(seconds=every))
+        )
+        if not recent.exists():
+            enqueue(name, run_at=now)
+            created.append(name)
+    return created
+
+
+# ==========================
+# Claiming
+# ==========================
+
+def _claimable():
+    now   = timezone.now()
+    stale = now - timedelta(seconds=settings.JOB_LOCK_TIMEOUT)
+    return Job.objects.filter(
+        Q(status="queued", run_at__lte=now) | Q(status="running", locked_at__lt=stale)
+    ).order_by("run_at", "pk")
+
+
+def claim(worker_id, limit=1):
+    """Claim up to ``limit`` due jobs for ``worker_id`` and return them."""
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            pks = list(
+                _claimable().select_for_update(skip_locked=True).values_list("pk", flat=True)[:limit]
+            )
+            Job.objects.filter(pk__in=pks).update(
+                status="running", locked_by=worker_id, locked_at=timezone.now(),
+            )
+        return list(Job.objects.filter(pk__in=pks))
+
+    # SQLite: no row locks. Race on a conditional update instead; the
+    # status/locked_at check makes sure only one worker wins each job.
+    claimed = []
+    for candidate in _claimable().only("pk", "status", "locked_at")[:limit * 2]:
+        won = Job.objects.filter(
+            pk=candidate.pk, status=candidate.status, locked_at=candidate.locked_at,
+        ).update(status="running", locked_by=worker_id, locked_at=timezone.now())
+        if won:
+            claimed.append(candidate.pk)
+        if len(claimed) == limit:
+            break
+    return list(Job.objects.filter(pk__in=claimed))
+
+
+# ==========================
+# Running
+# ==========================
+
+def _backoff(attempts):
+    """Seconds to wait before the next attempt: base * 2^(attempts - 1)."""
+    delay = settings.JOB_RETRY_BACKOFF * 2 ** (attempts - 1)
+    return min(delay, settings.JOB_RETRY_BACKOFF_MAX)
+
+
+def run(job):
+    """
+    Run a claimed job and record the outcome; return True on success.
+
+    Every update is conditional on the claim still being ours: a worker
+    that took longer than ``JOB_LOCK_TIMEOUT`` may have lost the job to
+    another one, and then leaves attempts and outcome to that worker.
+    """
+    owned = Job.objects.filter(pk=job.pk, status="running", locked_by=job.locked_by)
+    if not owned.update(attempts=F("attempts") + 1):
+        logger.warning("Job %s was claimed by another worker before it started", job)
+        return False
+    job.attempts += 1
+
+    try:
+        handler = get_handler(job.name)
+        with sharding.writes():
+            for alias in sharding.job_shards(job.payload, job.name in _each_shard):
+                with sharding.pinned(alias):
+                    handler(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception("Job %s failed (attempt %s/%s)", job, job.attempts, job.max_attempts)
+
+        if job.attempts < job.max_attempts:
+            changes = {
+                "status": "queued",
+                "run_at": timezone.now() + timedelta(seconds=_backoff(job.attempts)),
+            }
+        else:
+            changes = {"status": "failed", "finished_at": timezone.now()}
+        if not owned.update(last_error=error, locked_by="", locked_at=None, **changes):
+            logger.warning("Job %s was claimed by another worker; failure not recorded", job)
+        return False
+
+    if not owned.update(status="done", finished_at=timezone.now()):
+        logger.warning("Job %s was claimed by another worker; completion not recorded", job)
+        return False
+    return True
+
+
+def run_pending(worker_id, limit=1):
+    """Claim and run due jobs; return how many were run."""
+    jobs = claim(worker_id, limit)
+    for claimed in jobs:
+        run(claimed)
+    return len(jobs)
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from kanban_app import sharding
+from kanban_app.archive import archive_done_tasks
+
+
+class Command(BaseCommand):
+    help = "Archive tasks that have been done for longer than TASK_ARCHIVE_AFTER_DAYS."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None,
+                            help="Tasks per batch (default: TASK_ARCHIVE_BATCH_SIZE).")
+
+    def handle(self, *args, **options):
+        archived = 0
+        for alias in settings.SHARDS:
+            with sharding.pinned(alias):
+                archived += archive_done_tasks(options["batch_size"])
+        self.stdout.write(f"Archived {archived} tasks")
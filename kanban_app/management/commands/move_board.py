@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from kanban_app.sharding import move_board
+
+
+class Command(BaseCommand):
+    help = "Move a board with all its tasks, comments and history to another shard."
+
+    def add_arguments(self, parser):
+        parser.add_argument("board_id", type=int)
+        parser.add_argument("shard", help="Target database alias (see DB_SHARDS).")
+        parser.add_argument("--batch-size", type=int, default=1000,
+                            help="Rows copied per INSERT (default: 1000).")
+
+    def handle(self, *args, **options):
+        try:
+            copied = move_board(options["board_id"], options["shard"], options["batch_size"])
+        except (ValueError, RuntimeError) as exc:
+            raise CommandError(exc)
+        for model, count in copied.items():
+            self.stdout.write(f"{model}: {count}")
+        self.stdout.write(f"Moved board {options['board_id']} to '{options['shard']}'")
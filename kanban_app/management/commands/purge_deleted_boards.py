@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from kanban_app import sharding
+from kanban_app.deletion import pending_deletions, purge_board
+
+
+class Command(BaseCommand):
+    help = "Remove the rows of soft-deleted boards in small batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None,
+                            help="Rows per DELETE (default: BOARD_PURGE_BATCH_SIZE).")
+        parser.add_argument("--loop", action="store_true",
+                            help="Keep running and pick up new deletions.")
+        parser.add_argument("--interval", type=float, default=5.0,
+                            help="Seconds to wait between polls with --loop.")
+
+    def handle(self, *args, **options):
+        while True:
+            for deletion in pending_deletions():
+                shard = sharding.locate(deletion.board_id) if sharding.enabled() else None
+                with sharding.pinned(shard):
+                    purge_board(deletion, options["batch_size"])
+                self.stdout.write(f"Purged board {deletion.board_id}")
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from kanban_app.idempotency import purge_expired
+
+
+class Command(BaseCommand):
+    help = "Delete expired Idempotency-Key records."
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Deleted {purge_expired()} expired idempotency keys")
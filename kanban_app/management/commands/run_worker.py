@@ -0,0 +1,90 @@
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection, connections
+
+from kanban_app import jobs
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds between a worker's checks for due periodic jobs
+PERIODIC_CHECK_INTERVAL = 60
+
+
+def work(worker_id, poll_interval, burst, stop=None):
+    """Claim and run jobs until stopped (or, with ``burst``, until idle)."""
+    next_check = 0
+    try:
+        while stop is None or not stop.is_set():
+            close_old_connections()
+            try:
+                if time.monotonic() >= next_check:
+                    jobs.enqueue_periodic()
+                    next_check = time.monotonic() + PERIODIC_CHECK_INTERVAL
+                if jobs.run_pending(worker_id):
+                    continue
+            except Exception:
+                # e.g. the database went away; keep the worker alive
+                logger.exception("Worker %s could not fetch jobs", worker_id)
+            if burst:
+                break
+            time.sleep(poll_interval)
+    finally:
+        connection.close()
+
+
+def _process_main(worker_id, poll_interval, burst):
+    import django
+    django.setup()
+    work(worker_id, poll_interval, burst)
+
+
+class Command(BaseCommand):
+    help = "Run background jobs from the Job table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=1,
+                            help="Number of concurrent workers.")
+        parser.add_argument("--mode", choices=("thread", "process"), default="thread",
+                            help="Run workers as threads or as processes.")
+        parser.add_argument("--poll-interval", type=float, default=1.0,
+                            help="Seconds to wait when no job is due.")
+        parser.add_argument("--burst", action="store_true",
+                            help="Exit once no job is due.")
+
+    def handle(self, *args, **options):
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        args   = (options["poll_interval"], options["burst"])
+
+        if options["mode"] == "process":
+            # Children must not inherit open database connections.
+            connections.close_all()
+            workers = [
+                multiprocessing.Process(target=_process_main, args=(f"{prefix}:{i}", *args))
+                for i in range(options["workers"])
+            ]
+        else:
+            stop = threading.Event()
+            workers = [
+                threading.Thread(target=work, args=(f"{prefix}:{i}", *args, stop))
+                for i in range(options["workers"])
+            ]
+
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f"Started {len(workers)} {options['mode']} worker(s).")
+
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            if options["mode"] == "thread":
+                stop.set()
+            for worker in workers:
+                worker.join()
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from kanban_app import sharding
+from kanban_app.reminders import send_pending, sweep
+
+
+class Command(BaseCommand):
+    help = "Create reminders for tasks that are due soon or overdue and mail them."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None,
+                            help="Rows per batch (default: REMINDER_BATCH_SIZE).")
+        parser.add_argument("--no-mail", action="store_true",
+                            help="Only create the reminders, do not send them.")
+
+    def handle(self, *args, **options):
+        for alias in settings.SHARDS:
+            with sharding.pinned(alias):
+                self.send(options)
+
+    def send(self, options):
+        created = sweep(batch_size=options["batch_size"])
+        self.stdout.write(f"Created {created} reminder(s).")
+        if not options["no_mail"]:
+            sent = send_pending(batch_size=options["batch_size"])
+            self.stdout.write(f"Sent {sent} message(s).")
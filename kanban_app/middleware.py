@@ -0,0 +1,161 @@
+"""
+Middleware of the kanban app.
+"""
+import asyncio
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.http import JsonResponse
+from django.urls import Resolver404, resolve
+
+from kanban_app import activity, idempotency, sharding
+
+
+class ActivityMiddleware:
+    """
+    Buffer the activity events recorded while handling a request and write
+    them with one INSERT at the end (see kanban_app.activity).
+    """
+    sync_capable  = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode   = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = activity.start_buffer()
+        try:
+            return self.get_response(request)
+        finally:
+            activity.flush(activity.end_buffer(token))
+
+    async def __acall__(self, request):
+        token = activity.start_buffer()
+        try:
+            return await self.get_response(request)
+        finally:
+            await sync_to_async(activity.flush)(activity.end_buffer(token))
+
+
+class ShardWritesMiddleware:
+    """
+    Register the boards a request writes to until it is done, including the
+    activity written after the view (see kanban_app.sharding.start_writes).
+    """
+    sync_capable  = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode   = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token = sharding.start_writes()
+        try:
+            return self.get_response(request)
+        finally:
+            sharding.release(sharding.end_writes(token))
+
+    async def __acall__(self, request):
+        token = sharding.start_writes()
+        try:
+            return await self.get_response(request)
+        finally:
+            boards = sharding.end_writes(token)
+            if boards:
+                await sync_to_async(sharding.release)(boards)
+
+
+class IdempotencyMiddleware:
+    """
+    Honour ``Idempotency-Key`` on the create endpoints: run the first
+    request, replay its stored response for retries and let concurrent
+    duplicates wait for it (see kanban_app.idempotency).
+    """
+    sync_capable  = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode   = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def _params(self, request):
+        """``(scope, key, fingerprint)`` if the request takes part, else None."""
+        key = request.headers.get("Idempotency-Key")
+        if not key or request.method != "POST":
+            return None
+        try:
+            url_name = resolve(request.path_info).url_name
+        except Resolver404:
+            return None
+        scope = idempotency.scope(request)
+        if url_name not in idempotency.URL_NAMES or scope is None:
+            return None
+        return scope, key, idempotency.fingerprint(request)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        params = self._params(request)
+        if params is None:
+            return self.get_response(request)
+        if len(params[1]) > 255:
+            return JsonResponse({"detail": "Idempotency-Key is too long."}, status=400)
+
+        deadline = time.monotonic() + idempotency.wait_timeout()
+        while True:
+            record, created = idempotency.claim(*params)
+            if created:
+                break
+            response = record and idempotency.outcome(record, params[2])
+            if response is not None:
+                return response
+            if time.monotonic() >= deadline:
+                return idempotency.in_progress()
+            time.sleep(idempotency.POLL_INTERVAL)
+
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            idempotency.release(record)
+            raise
+        idempotency.store(record, response)
+        return response
+
+    async def __acall__(self, request):
+        params = self._params(request)
+        if params is None:
+            return await self.get_response(request)
+        if len(params[1]) > 255:
+            return JsonResponse({"detail": "Idempotency-Key is too long."}, status=400)
+
+        deadline = time.monotonic() + idempotency.wait_timeout()
+        while True:
+            record, created = await sync_to_async(idempotency.claim)(*params)
+            if created:
+                break
+            response = record and idempotency.outcome(record, params[2])
+            if response is not None:
+                return response
+            if time.monotonic() >= deadline:
+                return idempotency.in_progress()
+            await asyncio.sleep(idempotency.POLL_INTERVAL)
+
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            await sync_to_async(idempotency.release)(record)
+            raise
+        await sync_to_async(idempotency.store)(record, response)
+        return response
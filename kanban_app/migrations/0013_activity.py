@@ -0,0 +1,31 @@
+# Generated by Django 5.2.2 on 2026-10-19 07:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kanban_app', '0012_due_date_reminders'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Activity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('verb', models.CharField(choices=[('task_status_changed', 'Task status changed'), ('task_reassigned', 'Task reassigned'), ('comment_added', 'Comment added'), ('members_added', 'Members added'), ('members_removed', 'Members removed')], max_length=30)),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('actor', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='activities', to=settings.AUTH_USER_MODEL)),
+                ('board', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activities', to='kanban_app.board')),
+                ('task', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='activities', to='kanban_app.task')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['board', '-id'], name='activity_board_id_idx')],
+            },
+        ),
+    ]
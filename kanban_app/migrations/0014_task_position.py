@@ -0,0 +1,56 @@
+# Generated by Django 5.2.2 on 2026-10-19 07:47
+
+from django.conf import settings
+import math
+from itertools import groupby
+
+from django.db import migrations, models
+
+
+DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+def evenly_spaced(count):
+    # Frozen copy of kanban_app.ranking.evenly_spaced
+    width = max(1, math.ceil(math.log(2 * (count + 1), len(DIGITS))))
+    span  = len(DIGITS) ** width
+    keys  = []
+    for i in range(1, count + 1):
+        value  = i * span // (count + 1)
+        digits = []
+        for _ in range(width):
+            value, digit = divmod(value, len(DIGITS))
+            digits.append(DIGITS[digit])
+        keys.append("".join(reversed(digits)).rstrip("0"))
+    return keys
+
+
+def assign_positions(apps, schema_editor):
+    """Existing cards keep their creation order within each column."""
+    Task = apps.get_model("kanban_app", "Task")
+    rows = Task.objects.order_by("board_id", "status", "pk").values_list("board_id", "status", "pk")
+    for _, column in groupby(list(rows), key=lambda row: row[:2]):
+        pks = [pk for _, _, pk in column]
+        tasks = [Task(pk=pk, position=key) for pk, key in zip(pks, evenly_spaced(len(pks)))]
+        Task.objects.bulk_update(tasks, ["position"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kanban_app', '0013_activity'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='position',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.RunPython(assign_positions, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['board', 'status', 'position'], name='task_column_position_idx'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.2 on 2026-10-19 08:14
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def record_existing_tasks(apps, schema_editor):
+    """Existing tasks enter their current column today (no history yet)."""
+    Task             = apps.get_model("kanban_app", "Task")
+    StatusTransition = apps.get_model("kanban_app", "StatusTransition")
+    rows = Task.objects.filter(board__deleted_at__isnull=True).values_list("pk", "board_id", "status")
+    StatusTransition.objects.bulk_create(
+        (StatusTransition(task_id=pk, board_id=board_id, to_status=status) for pk, board_id, status in rows.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kanban_app', '0016_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BoardDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(max_length=20)),
+                ('net', models.IntegerField(default=0)),
+                ('entered', models.PositiveIntegerField(default=0)),
+                ('cycle_time_seconds', models.FloatField(default=0)),
+                ('cycle_time_count', models.PositiveIntegerField(default=0)),
+                ('board', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='kanban_app.board')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('board', 'day', 'status'), name='unique_board_daily_stats')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StatusTransition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(blank=True, max_length=20)),
+                ('to_status', models.CharField(blank=True, max_length=20)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('rolled_up', models.BooleanField(default=False)),
+                ('board', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_transitions', to='kanban_app.board')),
+                ('task', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='status_transitions', to='kanban_app.task')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('rolled_up', False)), fields=['id'], name='transition_pending_idx'), models.Index(fields=['task', 'to_status'], name='transition_task_status_idx')],
+            },
+        ),
+        migrations.RunPython(record_existing_tasks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.2 on 2026-10-19 08:23
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def start_completion_clock(apps, schema_editor):
+    """When existing cards were finished is unknown; count from now."""
+    Task = apps.get_model("kanban_app", "Task")
+    Task.objects.filter(status="done").update(completed_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kanban_app', '0017_analytics'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_column_position_idx',
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('archived_at__isnull', True)), fields=['board', 'status', 'position'], name='task_column_position_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('archived_at__isnull', True), ('status', 'done')), fields=['completed_at'], name='task_archivable_idx'),
+        ),
+        migrations.RunPython(start_completion_clock, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.2 on 2026-10-19 08:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kanban_app', '0018_task_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BoardShard',
+            fields=[
+                ('board_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('shard', models.CharField(db_index=True, max_length=100)),
+                ('moving', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
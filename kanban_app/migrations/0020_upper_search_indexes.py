@@ -0,0 +1,24 @@
+# Generated by Django 5.2.2 on 2026-10-19 10:37
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kanban_app', '0019_board_shard'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='board',
+            index=models.Index(django.db.models.functions.text.Upper('title'), name='board_title_upper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(django.db.models.functions.text.Upper('title'), name='task_title_upper_idx'),
+        ),
+    ]
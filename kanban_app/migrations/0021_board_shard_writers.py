@@ -0,0 +1,18 @@
+# Generated by Django 5.2.2 on 2026-10-19 11:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kanban_app', '0020_upper_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='boardshard',
+            name='writers',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -1,7 +1,71 @@
 from django.db import models
+from django.db.models.functions import Coalesce, Upper
+from django.utils import timezone
 from auth_app.models import CustomUser
 
 
+class BoardQuerySet(models.QuerySet):
+    """
+    Board queries shared by all views.
+    """
+
+    def accessible_to(self, user):
+        """
+        Boards the user owns or is a member of.
+
+        Membership is checked with an IN-subquery on the m2m table instead of
+        a join, so each board appears once and no DISTINCT is needed. The
+        result can be composed freely (e.g. ``Task.objects.filter(board__in=...)``).
+        """
+        member_of = Board.members.through.objects.filter(
+            customuser=user,
+        ).values("board_id")
+        return self.filter(models.Q(owner=user) | models.Q(pk__in=member_of))
+
+    def with_stats(self):
+        """
+        Annotate the counters shown by `BoardSerializer`.
+
+        Each counter is a correlated subquery, so the member and task joins
+        do not multiply each other and the list needs a single query.
+        """
+        def count(model, fk, **filters):
+            return models.Subquery(
+                model.objects.filter(**{fk: models.OuterRef("pk")}, **filters)
+                .order_by()
+                .values(fk)
+                .annotate(n=models.Count("*"))
+                .values("n"),
+                output_field=models.IntegerField(),
+            )
+
+        members = Board.members.through
+        return self.annotate(
+            member_count          = Coalesce(count(members, "board"), 0),
+            ticket_count          = Coalesce(count(Task, "board"), 0),
+            tasks_to_do_count     = Coalesce(count(Task, "board", status="todo"), 0),
+            tasks_high_prio_count = Coalesce(count(Task, "board", priority="high"), 0),
+        )
+
+    def with_details(self, include_archived=False):
+        """Prefetch the members and tasks rendered by `BoardDetailSerializer`."""
+        tasks = Task.with_archived if include_archived else Task.objects
+        return self.prefetch_related(
+            "members",
+            models.Prefetch(
+                "tasks",
+                queryset=tasks.for_listing().order_by("status", "position", "pk"),
+            ),
+        )
+
+
+class BoardManager(models.Manager.from_queryset(BoardQuerySet)):
+    """Default board manager: soft-deleted boards are invisible."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Board(models.Model):
     """
     A Kanban board. 'owner' creates the board, 'members' can access it.
@@ -21,10 +85,63 @@ class Board(models.Model):
         blank=True,
     )
 
+    # Set when the owner deletes the board; the rows are then removed in
+    # batches by kanban_app.deletion (see BoardDeletion).
+    deleted_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    # Bumped by every update; clients send it back in If-Match
+    # (kanban_app.concurrency)
+    version = models.PositiveIntegerField(default=1)
+
+    objects     = BoardManager()
+    all_objects = BoardQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Admin search (core.lookups.UpperPrefix)
+            models.Index(Upper("title"), name="board_title_upper_idx"),
+        ]
+
     def __str__(self) -> str:
         return self.title
 
 
+class TaskQuerySet(models.QuerySet):
+    """
+    Task queries shared by all views.
+    """
+
+    def accessible_to(self, user):
+        """Tasks on any board the user owns or is a member of."""
+        boards = Board.objects.accessible_to(user).values("pk")
+        return self.filter(board__in=boards)
+
+    def for_listing(self):
+        """
+        Load everything `TaskSerializer` reads in the same query: nested
+        assignee/reviewer and the comment count.
+        """
+        return self.select_related("assignee", "reviewer").annotate(
+            comments_count=models.Count("comments"),
+        )
+
+
+class TaskManager(models.Manager.from_queryset(TaskQuerySet)):
+    """Default task manager: tasks on soft-deleted boards are invisible."""
+    include_archived = False
+
+    def get_queryset(self):
+        queryset = super().get_queryset().filter(board__deleted_at__isnull=True)
+        if not self.include_archived:
+            queryset = queryset.filter(archived_at__isnull=True)
+        return queryset
+
+
+class ArchiveTaskManager(TaskManager):
+    """Tasks on live boards including archived ones (``?include_archived=1``)."""
+    include_archived = True
+
+
 class Task(models.Model):
     """
     A task card within a board.
@@ -94,9 +211,52 @@ class Task(models.Model):
 
     due_date = models.DateField(null=True, blank=True)
 
+    # Rank key within (board, status); cards sort by it (kanban_app.ranking)
+    position = models.CharField(max_length=255, blank=True, default="")
+
+    # Bumped by every update; clients send it back in If-Match
+    # (kanban_app.concurrency)
+    version = models.PositiveIntegerField(default=1)
+
+    # When the task last entered "done", and when it was archived for having
+    # been done longer than TASK_ARCHIVE_AFTER_DAYS (kanban_app.archive).
+    # Archived tasks are left out of `objects` and the hot indexes.
+    completed_at = models.DateTimeField(null=True, blank=True)
+    archived_at  = models.DateTimeField(null=True, blank=True)
+
+    objects       = TaskManager()
+    with_archived = ArchiveTaskManager()
+    all_objects   = TaskQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Range scans of the due-date reminder sweep
+            models.Index(fields=["due_date", "status"], name="task_due_date_status_idx"),
+            # Ordered reads of a column; archived cards are not indexed
+            models.Index(
+                fields=["board", "status", "position"],
+                condition=models.Q(archived_at__isnull=True),
+                name="task_column_position_idx",
+            ),
+            # Done cards waiting for the archive job
+            models.Index(
+                fields=["completed_at"],
+                condition=models.Q(status="done", archived_at__isnull=True),
+                name="task_archivable_idx",
+            ),
+            # Admin search (core.lookups.UpperPrefix)
+            models.Index(Upper("title"), name="task_title_upper_idx"),
+        ]
+
     def __str__(self) -> str:
         return self.title
 
+    def set_status(self, status):
+        """Change the column, keeping ``completed_at`` in step."""
+        if status != self.status:
+            self.status       = status
+            self.completed_at = timezone.now() if status == "done" else None
+
 
 class Comment(models.Model):
     """
@@ -120,3 +280,285 @@ class Comment(models.Model):
 
     def __str__(self) -> str:
         return f"Comment {self.id} on Task {self.task_id}"
+
+
+class BoardDeletion(models.Model):
+    """
+    Progress of a board deletion.
+
+    Deleting a board only flags it (`Board.deleted_at`); the rows are removed
+    later in bounded batches. This record outlives the board, so the owner
+    can still follow the progress once the board row itself is gone.
+    """
+    board_id = models.BigIntegerField(unique=True)
+    owner    = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name="board_deletions",
+    )
+    requested_at = models.DateTimeField(auto_now_add=True)
+    finished_at  = models.DateTimeField(null=True, blank=True)
+
+    # Rows removed so far
+    deleted_comments = models.PositiveIntegerField(default=0)
+    deleted_tasks    = models.PositiveIntegerField(default=0)
+    deleted_members  = models.PositiveIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f"Deletion of board {self.board_id}"
+
+
+class Job(models.Model):
+    """
+    A unit of background work, run by ``manage.py run_worker``.
+
+    Jobs are enqueued through `kanban_app.jobs` and executed by the handler
+    registered under ``name`` with ``payload`` as keyword arguments.
+    """
+    STATUS_CHOICES = (
+        ("queued",  "Queued"),
+        ("running", "Running"),
+        ("done",    "Done"),
+        ("failed",  "Failed"),
+    )
+
+    name    = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status  = models.CharField(max_length=10, choices=STATUS_CHOICES, default="queued")
+
+    # Earliest time the job may run (moved forward on retries)
+    run_at = models.DateTimeField()
+
+    attempts     = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    last_error   = models.TextField(blank=True)
+
+    # Worker that claimed the job and when; stale claims are taken over
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+
+    created_at  = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_at"], name="job_status_run_at_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.name} #{self.pk} ({self.status})"
+
+
+class Reminder(models.Model):
+    """
+    A due-date reminder for one user about one task.
+
+    Created by the reminder sweep (kanban_app.reminders) and marked as sent
+    once it went out by email.
+    """
+    KIND_CHOICES = (
+        ("due_soon", "Due soon"),
+        ("overdue",  "Overdue"),
+    )
+    ROLE_CHOICES = (
+        ("assignee", "Assignee"),
+        ("reviewer", "Reviewer"),
+    )
+
+    task = models.ForeignKey(
+        Task,
+        on_delete=models.CASCADE,
+        related_name="reminders",
+    )
+    recipient = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name="reminders",
+    )
+    kind     = models.CharField(max_length=10, choices=KIND_CHOICES)
+    role     = models.CharField(max_length=10, choices=ROLE_CHOICES)
+    due_date = models.DateField()
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at    = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # One reminder per due date, so re-sweeps never duplicate
+            models.UniqueConstraint(
+                fields=["task", "recipient", "kind", "due_date"],
+                name="unique_reminder",
+            ),
+        ]
+        indexes = [
+            # Unsent reminders, grouped per recipient when mailing
+            models.Index(fields=["sent_at", "recipient"], name="reminder_unsent_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.get_kind_display()}: {self.task_id} for {self.recipient_id}"
+
+
+class ReminderSweep(models.Model):
+    """
+    High-water mark of the reminder sweep per kind: all due dates up to
+    ``covered_until`` have been handled, so the next sweep starts after it.
+    """
+    kind          = models.CharField(max_length=10, unique=True, choices=Reminder.KIND_CHOICES)
+    covered_until = models.DateField()
+
+    def __str__(self) -> str:
+        return f"{self.kind} covered until {self.covered_until}"
+
+
+class Activity(models.Model):
+    """
+    One entry of a board's append-only activity feed.
+
+    Written in batches by kanban_app.activity; ``data`` holds the details of
+    the change (old/new values, affected user ids, ...).
+    """
+    VERB_CHOICES = (
+        ("task_status_changed", "Task status changed"),
+        ("task_reassigned",     "Task reassigned"),
+        ("comment_added",       "Comment added"),
+        ("members_added",       "Members added"),
+        ("members_removed",     "Members removed"),
+    )
+
+    board = models.ForeignKey(
+        Board,
+        on_delete=models.CASCADE,
+        related_name="activities",
+    )
+    # Kept when the task is deleted, so the history stays readable
+    task = models.ForeignKey(
+        Task,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="activities",
+    )
+    actor = models.ForeignKey(
+        CustomUser,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="activities",
+    )
+    verb       = models.CharField(max_length=30, choices=VERB_CHOICES)
+    data       = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of a board's feed (newest first)
+            models.Index(fields=["board", "-id"], name="activity_board_id_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.verb} on board {self.board_id}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    A client-chosen ``Idempotency-Key`` of a create request and the response
+    it produced (see kanban_app.idempotency).
+
+    ``status_code`` is empty while the first request is still running.
+    """
+    # sha256 of the Authorization header: keys are per client credential
+    scope       = models.CharField(max_length=64)
+    key         = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+
+    status_code  = models.PositiveSmallIntegerField(null=True, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    body         = models.BinaryField(blank=True, default=b"")
+
+    created_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["scope", "key"], name="unique_idempotency_key"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.key} ({self.status_code or 'pending'})"
+
+
+class StatusTransition(models.Model):
+    """
+    A task entering a column: created (``from_status`` empty), moved, or
+    removed (``to_status`` empty). Rolled up into `BoardDailyStats` by the
+    ``rollup_analytics`` job (kanban_app.analytics).
+    """
+    board = models.ForeignKey(Board, on_delete=models.CASCADE, related_name="status_transitions")
+    # Kept when the task is deleted: its removal still has to be rolled up
+    task  = models.ForeignKey(
+        Task,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="status_transitions",
+    )
+
+    from_status = models.CharField(max_length=20, blank=True)
+    to_status   = models.CharField(max_length=20, blank=True)
+    created_at  = models.DateTimeField(default=timezone.now)
+
+    rolled_up = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # Only the transitions still waiting for the rollup are indexed
+            models.Index(fields=["id"], condition=models.Q(rolled_up=False), name="transition_pending_idx"),
+            # Cycle time: when did a task first start?
+            models.Index(fields=["task", "to_status"], name="transition_task_status_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"task #{self.task_id}: {self.from_status or '-'} -> {self.to_status or '-'}"
+
+
+class BoardDailyStats(models.Model):
+    """
+    Per board, day and status: the change in the number of tasks in the
+    status (``net``; summed up over the days it gives the cumulative flow),
+    how many tasks entered it, and for ``done`` the cycle times of the tasks
+    finished that day.
+    """
+    board  = models.ForeignKey(Board, on_delete=models.CASCADE, related_name="daily_stats")
+    day    = models.DateField()
+    status = models.CharField(max_length=20)
+
+    net     = models.IntegerField(default=0)
+    entered = models.PositiveIntegerField(default=0)
+
+    cycle_time_seconds = models.FloatField(default=0)
+    cycle_time_count   = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["board", "day", "status"], name="unique_board_daily_stats"),
+        ]
+
+    def __str__(self) -> str:
+        return f"board #{self.board_id} {self.day} {self.status}: {self.net:+d}"
+
+
+class BoardShard(models.Model):
+    """
+    Directory entry: the shard a board's rows are stored on
+    (kanban_app.sharding). Kept on the default database.
+    """
+    board_id = models.BigIntegerField(primary_key=True)
+    shard    = models.CharField(max_length=100, db_index=True)
+    # Set while move_board copies the board; writes to it are refused
+    moving     = models.BooleanField(default=False)
+    # Requests and jobs writing to the board right now; move_board waits
+    # for them to finish before it copies
+    writers    = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"board #{self.board_id} on {self.shard}{' (moving)' if self.moving else ''}"
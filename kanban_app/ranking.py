@@ -0,0 +1,137 @@
+"""
+Lexicographic rank keys for card ordering.
+
+A card's `Task.position` is a string of base-36 digits. Cards sort by
+comparing these strings, and `rank_between` can always produce a key
+strictly between two neighbours. Moving a card therefore rewrites only that
+card's row.
+
+Keys use only ``0-9a-z`` so that byte order and the usual database
+collations agree. Keys never end in ``0``, so there is always room below a
+key. Keys grow when cards are inserted repeatedly at the same spot;
+`rebalance_column` (run as a background job) then gives a whole column
+short, evenly spaced keys again.
+"""
+import math
+
+from django.conf import settings
+from django.db import transaction
+
+from kanban_app import generations, sharding
+from kanban_app.jobs import enqueue_on_commit, job
+from kanban_app.models import Task
+
+
+DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+BASE   = len(DIGITS)
+
+
+def _midpoint(low, high):
+    """Key strictly between ``low`` ("" = start) and ``high`` (None = end)."""
+    if high is not None:
+        # Skip the common prefix ("" behaves like trailing zeros)
+        n = 0
+        while n < len(high) and (low[n] if n < len(low) else "0") == high[n]:
+            n += 1
+        if n:
+            return high[:n] + _midpoint(low[n:], high[n:])
+
+    digit_low  = DIGITS.index(low[0]) if low else 0
+    digit_high = DIGITS.index(high[0]) if high is not None else BASE
+    if digit_high - digit_low > 1:
+        return DIGITS[(digit_low + digit_high) // 2]
+
+    # Neighbouring digits: a longer key is needed
+    if high is not None and len(high) > 1:
+        return high[0]
+    return DIGITS[digit_low] + _midpoint(low[1:], None)
+
+
+def rank_between(before=None, after=None):
+    """
+    Return a key that sorts after ``before`` and before ``after``; either
+    may be None for the start/end of the column.
+    """
+    if before is not None and after is not None and before >= after:
+        raise ValueError(f"No key between {before!r} and {after!r}.")
+    return _midpoint(before or "", after)
+
+
+def evenly_spaced(count):
+    """``count`` short, increasing keys with equal gaps between them."""
+    width = max(1, math.ceil(math.log(2 * (count + 1), BASE)))
+    span  = BASE ** width
+    keys  = []
+    for i in range(1, count + 1):
+        value  = i * span // (count + 1)
+        digits = []
+        for _ in range(width):
+            value, digit = divmod(value, BASE)
+            digits.append(DIGITS[digit])
+        keys.append("".join(reversed(digits)).rstrip("0"))
+    return keys
+
+
+def last_position(board_id, status):
+    return (
+        Task.all_objects.filter(board_id=board_id, status=status, archived_at__isnull=True)
+        .order_by("-position")
+        .values_list("position", flat=True)
+        .first()
+    )
+
+
+def position_at_end(board_id, status):
+    """Key for a card appended to the end of a column."""
+    return rank_between(last_position(board_id, status), None)
+
+
+def position_for_move(task, status, after=None, before=None):
+    """
+    Key for moving ``task`` into column ``status`` right behind ``after``
+    and/or right in front of ``before`` (other cards of that column). With
+    neither, the card goes to the end of the column.
+    """
+    column = (
+        Task.all_objects.filter(board_id=task.board_id, status=status, archived_at__isnull=True)
+        .exclude(pk=task.pk)
+    )
+    low  = after.position if after is not None else None
+    high = before.position if before is not None else None
+
+    if after is not None and before is None:
+        high = (
+            column.filter(position__gt=low).order_by("position")
+            .values_list("position", flat=True).first()
+        )
+    elif before is not None and after is None:
+        low = (
+            column.filter(position__lt=high).order_by("-position")
+            .values_list("position", flat=True).first()
+        )
+    elif after is None and before is None:
+        low = column.order_by("-position").values_list("position", flat=True).first()
+
+    return rank_between(low, high)
+
+
+def check_length(task):
+    """Schedule a rebalance when a key has grown too long."""
+    if len(task.position) > settings.TASK_POSITION_MAX_LENGTH:
+        enqueue_on_commit("rebalance_column", {"board_id": task.board_id, "status": task.status})
+
+
+@job("rebalance_column")
+def rebalance_column(board_id, status, batch_size=1000):
+    """Give every card of a column a new, short key, keeping their order."""
+    with transaction.atomic(using=sharding.current()):
+        tasks = list(
+            Task.all_objects.select_for_update()
+            .filter(board_id=board_id, status=status, archived_at__isnull=True)
+            .order_by("position", "pk")
+            .only("pk", "position")
+        )
+        for task, key in zip(tasks, evenly_spaced(len(tasks))):
+            task.position = key
+        Task.all_objects.bulk_update(tasks, ["position"], batch_size=batch_size)
+        generations.touch([board_id])
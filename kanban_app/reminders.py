@@ -0,0 +1,181 @@
+"""
+Due-date reminders.
+
+`sweep` turns tasks that are due soon or overdue into `Reminder` rows for
+their assignee and reviewer; `send_pending` mails them, one message per
+recipient. ``python manage.py send_due_reminders`` (or the
+``send_due_reminders`` job) runs both.
+
+The sweep is incremental. `ReminderSweep` stores per kind the last due date
+already handled, and each run scans only the range after it on the
+``(due_date, status)`` index. Normally that is one new day. Tasks are
+streamed in chunks and reminders written with ``bulk_create``, so memory
+stays bounded however many tasks are due. A task whose due date is moved
+into an already swept range is reminded through `remind_task` at edit time.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+from django.utils import timezone
+
+from kanban_app import sharding
+from kanban_app.jobs import job
+from kanban_app.models import Reminder, ReminderSweep, Task
+
+
+def _batch_size():
+    return getattr(settings, "REMINDER_BATCH_SIZE", 1000)
+
+
+def _targets(today):
+    """Last due date each kind should cover after a sweep on ``today``."""
+    return {
+        "due_soon": today + timedelta(days=settings.REMINDER_LEAD_DAYS),
+        "overdue":  today - timedelta(days=1),
+    }
+
+
+def _reminders_for(kind, pk, assignee_id, reviewer_id, due_date):
+    for role, user_id in (("assignee", assignee_id), ("reviewer", reviewer_id)):
+        if user_id is not None:
+            yield Reminder(
+                task_id=pk, recipient_id=user_id,
+                kind=kind, role=role, due_date=due_date,
+            )
+
+
+def _insert(kind, reminders):
+    """
+    Bulk-create ``reminders`` of ``kind``, skipping those that exist; return
+    how many were inserted (``ignore_conflicts`` does not report it).
+    """
+    written = Reminder.objects.filter(kind=kind, task_id__in={r.task_id for r in reminders})
+    with transaction.atomic(using=sharding.current()):
+        before = written.count()
+        Reminder.objects.bulk_create(sharding.assign_ids(reminders), ignore_conflicts=True)
+        return written.count() - before
+
+
+def _create_reminders(kind, tasks, batch_size):
+    """Stream ``tasks`` and bulk-create their reminders batch by batch."""
+    rows = (
+        tasks.order_by()
+        .values_list("pk", "assignee_id", "reviewer_id", "due_date")
+        .iterator(chunk_size=batch_size)
+    )
+    created, buffer = 0, []
+    for row in rows:
+        buffer.extend(_reminders_for(kind, *row))
+        if len(buffer) >= batch_size:
+            created += _insert(kind, buffer)
+            buffer = []
+    if buffer:
+        created += _insert(kind, buffer)
+    return created
+
+
+def sweep(today=None, batch_size=None):
+    """Create reminders for newly eligible tasks; return how many were new."""
+    today      = today or timezone.localdate()
+    batch_size = batch_size or _batch_size()
+    created    = 0
+
+    for kind, until in _targets(today).items():
+        state = ReminderSweep.objects.filter(kind=kind).first()
+        if state is not None:
+            start = state.covered_until
+        elif kind == "due_soon":
+            start = today - timedelta(days=1)
+        else:
+            start = None  # first run: pick up everything already overdue
+
+        if start is not None and start >= until:
+            continue
+
+        tasks = Task.objects.filter(due_date__lte=until).exclude(status="done")
+        if start is not None:
+            tasks = tasks.filter(due_date__gt=start)
+        created += _create_reminders(kind, tasks, batch_size)
+
+        ReminderSweep.objects.update_or_create(kind=kind, defaults={"covered_until": until})
+    return created
+
+
+@job("remind_task")
+def remind_task(task_id, today=None):
+    """
+    Remind about a single task whose due date was set or changed.
+
+    The sweep never looks back, so a due date moved into an already covered
+    range would otherwise be missed.
+    """
+    today = today or timezone.localdate()
+    task  = Task.objects.filter(pk=task_id, due_date__isnull=False).exclude(status="done").first()
+    if task is None:
+        return
+
+    covered = dict(ReminderSweep.objects.values_list("kind", "covered_until"))
+    if task.due_date < today:
+        kind = "overdue"
+    else:
+        kind = "due_soon"
+    if kind in covered and task.due_date <= covered[kind]:
+        reminders = list(_reminders_for(kind, task.pk, task.assignee_id, task.reviewer_id, task.due_date))
+        Reminder.objects.bulk_create(sharding.assign_ids(reminders), ignore_conflicts=True)
+
+
+def _message(reminders):
+    lines = ["Hello,", "", "the following tasks need your attention:", ""]
+    for reminder in reminders:
+        state = "overdue since" if reminder.kind == "overdue" else "due on"
+        lines.append(
+            f"- {reminder.task.title} ({reminder.role}), {state} {reminder.due_date:%Y-%m-%d}"
+        )
+    lines += ["", "– KanMind"]
+    return "\n".join(lines)
+
+
+def send_pending(batch_size=None):
+    """
+    Mail all unsent reminders, one message per recipient; return how many
+    messages were sent. Only one recipient's reminders are held in memory.
+    """
+    batch_size = batch_size or _batch_size()
+    sent = 0
+
+    while True:
+        recipients = list(
+            Reminder.objects.filter(sent_at__isnull=True)
+            .order_by("recipient_id")
+            .values_list("recipient_id", flat=True)
+            .distinct()[:batch_size]
+        )
+        if not recipients:
+            return sent
+
+        for recipient_id in recipients:
+            reminders = list(
+                Reminder.objects.filter(sent_at__isnull=True, recipient_id=recipient_id)
+                .select_related("task", "recipient")
+                .order_by("due_date", "pk")
+            )
+            if not reminders:
+                continue
+            email = reminders[0].recipient.email
+            if email:
+                send_mail(
+                    subject=f"KanMind: {len(reminders)} task(s) due",
+                    message=_message(reminders),
+                    from_email=None,
+                    recipient_list=[email],
+                )
+                sent += 1
+            Reminder.objects.filter(pk__in=[r.pk for r in reminders]).update(sent_at=timezone.now())
+
+
+@job("send_due_reminders", each_shard=True)
+def send_due_reminders():
+    sweep()
+    send_pending()
@@ -0,0 +1,592 @@
+"""
+Board sharding.
+
+With ``DB_SHARDS`` set, every board is stored together with its tasks,
+comments, reminders, activity and analytics on one database out of
+``settings.SHARDS`` ('default' plus the named shards; the models are listed
+in `core.routers.SHARDED_MODELS`). Users stay on 'default' and are copied to
+every shard when saved, so assignees, authors and members can still be
+joined on each shard.
+
+Placement and lookup
+    A new board goes to its owner's shard (owner id modulo the number of
+    shards), which keeps a tenant's boards together. Each shard hands out
+    ids from its own range of ``ID_STRIDE`` (set up by `prepare_shard` after
+    ``migrate``; on SQLite `allocate_ids` advances the counters), so ids are
+    unique across shards and an id names the shard it was created on. The
+    `BoardShard` directory on 'default' records where each board is now;
+    boards without an entry, created before sharding was switched on, are
+    on the shard of their id. Lookups are cached per process for
+    ``SHARD_DIRECTORY_TTL`` seconds; writes always check the directory
+    itself, and requests and jobs register their writes with it until they
+    are done (`start_writes`).
+
+Requests and jobs
+    Views pin the shard of their board for the request (`pin`); per-user
+    lists run their query on every shard at once and merge the rows by id
+    (`fan_out`). Jobs are pinned by the ``board_id`` or ``task_id`` of their
+    payload; jobs registered with ``each_shard=True`` run once per shard.
+
+Moving a board
+    ``python manage.py move_board <board id> <shard>`` (`move_board`) flags
+    the board as moving, which fails writes to it with 503 while reads go
+    on, waits for the writes already registered to finish, copies its rows
+    in batches, switches the directory and deletes the old copy once no
+    process can still have the old location cached. Other boards are not
+    affected.
+
+Shards must be SQLite or PostgreSQL databases.
+"""
+import contextvars
+import heapq
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from operator import attrgetter
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections, router, transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
+from django.dispatch import receiver
+from rest_framework.exceptions import APIException
+
+from auth_app.models import CustomUser
+from core import routers
+from kanban_app.models import (
+    Activity, Board, BoardDailyStats, BoardShard, Comment, Reminder, StatusTransition, Task,
+)
+
+
+# Ids per shard: shard i (its position in settings.SHARDS) uses
+# i * ID_STRIDE + 1 ... (i + 1) * ID_STRIDE. Must never change.
+ID_STRIDE = 10 ** 12
+
+# Entries per process-local lookup cache before it is emptied
+CACHE_LIMIT = 100_000
+
+
+class BoardMoving(APIException):
+    status_code    = 503
+    default_detail = "This board is being moved to another database. Try again shortly."
+    default_code   = "board_moving"
+    wait           = 5  # Retry-After
+
+
+# ==========================
+# Pinning
+# ==========================
+
+def enabled():
+    return routers.sharding_enabled()
+
+
+def current():
+    """The database board data of the current context goes to."""
+    return routers.pinned_shard() or DEFAULT_DB_ALIAS
+
+
+def pin(alias):
+    """Pin board data of the current context to ``alias``; returns a token for `unpin`."""
+    return routers.pin_shard(alias)
+
+
+def unpin(token):
+    routers.unpin_shard(token)
+
+
+@contextmanager
+def pinned(alias):
+    token = pin(alias)
+    try:
+        yield alias
+    finally:
+        unpin(token)
+
+
+# ==========================
+# Placement and lookup
+# ==========================
+
+_lock        = threading.Lock()
+_boards      = {}   # board id -> (shard, moving, expires)
+_task_boards = {}   # task id -> board id; a task never changes boards
+
+
+def _remember(cache, key, value):
+    with _lock:
+        if len(cache) >= CACHE_LIMIT:
+            cache.clear()
+        cache[key] = value
+
+
+def home_shard(pk):
+    """The shard whose id range ``pk`` falls into."""
+    index = int(pk) // ID_STRIDE
+    return settings.SHARDS[index] if index < len(settings.SHARDS) else DEFAULT_DB_ALIAS
+
+
+def placement(owner_id):
+    """The shard for a new board of ``owner_id``."""
+    return settings.SHARDS[owner_id % len(settings.SHARDS)]
+
+
+def locate(board_id, write=False):
+    """
+    The shard of board ``board_id``. With ``write`` the directory is read
+    rather than the cache, `BoardMoving` raised while the board moves, and
+    the write registered with the current write scope, if any.
+    """
+    board_id = int(board_id)
+    if write:
+        _register_write(board_id)
+    now      = time.monotonic()
+    entry    = _boards.get(board_id)
+    if entry is None or write or entry[2] < now:
+        row = (
+            BoardShard.objects.using(DEFAULT_DB_ALIAS).filter(board_id=board_id)
+            .values_list("shard", "moving").first()
+        )
+        shard, moving = row or (home_shard(board_id), False)
+        entry = (shard, moving, now + settings.SHARD_DIRECTORY_TTL)
+        _remember(_boards, board_id, entry)
+    if write and entry[1]:
+        raise BoardMoving()
+    return entry[0]
+
+
+def board_of_task(task_id):
+    """The board id of task ``task_id``, or None if there is no such task."""
+    task_id  = int(task_id)
+    board_id = _task_boards.get(task_id)
+    if board_id is None:
+        # Usually on the shard it was created on, unless its board moved
+        home = home_shard(task_id)
+        for alias in [home, *(alias for alias in settings.SHARDS if alias != home)]:
+            board_id = (
+                Task.all_objects.using(alias).filter(pk=task_id)
+                .values_list("board_id", flat=True).first()
+            )
+            if board_id is not None:
+                _remember(_task_boards, task_id, board_id)
+                break
+    return board_id
+
+
+def forget(board_id):
+    """Drop the directory entry of a board that no longer exists."""
+    BoardShard.objects.using(DEFAULT_DB_ALIAS).filter(board_id=board_id).delete()
+    _boards.pop(board_id, None)
+
+
+@receiver(post_save, sender=Board, dispatch_uid="kanban_app.sharding.register_board")
+def register_board(sender, instance, created, using, raw=False, **kwargs):
+    if created and enabled() and not raw:
+        BoardShard.objects.using(DEFAULT_DB_ALIAS).get_or_create(
+            board_id=instance.pk, defaults={"shard": using},
+        )
+
+
+# ==========================
+# Write scopes
+# ==========================
+
+# Boards the current request or job writes to (None = outside a write scope)
+_writing: contextvars.ContextVar[set | None] = contextvars.ContextVar("shard_writing", default=None)
+
+
+def start_writes():
+    """
+    Open the write scope of a request or job: every board looked up for
+    writing inside it (``locate(..., write=True)``) counts as being written
+    to until `release`, so `move_board` waits for it. Returns a token for
+    `end_writes`; None if sharding is off or a scope is already open.
+    """
+    if not enabled() or _writing.get() is not None:
+        return None
+    return _writing.set(set())
+
+
+def end_writes(token):
+    """Close the scope opened by `start_writes`; return the boards to `release`."""
+    if token is None:
+        return set()
+    boards = _writing.get()
+    _writing.reset(token)
+    return boards
+
+
+def release(boards):
+    """Unregister the writes to ``boards``."""
+    if boards:
+        BoardShard.objects.using(DEFAULT_DB_ALIAS).filter(board_id__in=boards).update(
+            writers=F("writers") - 1,
+        )
+
+
+@contextmanager
+def writes():
+    """A write scope around a block (`start_writes`, `end_writes`, `release`)."""
+    token = start_writes()
+    try:
+        yield
+    finally:
+        release(end_writes(token))
+
+
+def _register_write(board_id):
+    """Count a write to ``board_id`` in the current scope; BoardMoving while it moves."""
+    boards = _writing.get()
+    if boards is None or board_id in boards:
+        return
+    directory = BoardShard.objects.using(DEFAULT_DB_ALIAS)
+    while not directory.filter(board_id=board_id, moving=False).update(writers=F("writers") + 1):
+        if directory.filter(board_id=board_id).exists():
+            raise BoardMoving()
+        # A board from before sharding gets its entry now; an id of no board none
+        if not Board.all_objects.using(home_shard(board_id)).filter(pk=board_id).exists():
+            return
+        directory.get_or_create(board_id=board_id, defaults={"shard": home_shard(board_id)})
+    boards.add(board_id)
+
+
+# ==========================
+# Fan-out
+# ==========================
+
+_executor = None
+
+
+def _pool():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.SHARD_FANOUT_WORKERS, thread_name_prefix="shard-fanout",
+            )
+    return _executor
+
+
+def _call_pinned(alias, func):
+    with pinned(alias):
+        return func()
+
+
+def _call_in_pool(alias, func):
+    # Pool threads keep their connections; drop expired or broken ones
+    # first, as the request cycle does for request threads
+    close_old_connections()
+    return _call_pinned(alias, func)
+
+
+def gather(func):
+    """Call ``func()`` pinned to each shard; return the results in shard order."""
+    if not enabled():
+        return [func()]
+    in_transaction = any(connections[alias].in_atomic_block for alias in settings.SHARDS)
+    if settings.SHARD_FANOUT_WORKERS <= 1 or in_transaction:
+        # In this thread, the only one that sees its open transactions
+        return [_call_pinned(alias, func) for alias in settings.SHARDS]
+    futures = [
+        _pool().submit(contextvars.copy_context().run, _call_in_pool, alias, func)
+        for alias in settings.SHARDS
+    ]
+    return [future.result() for future in futures]
+
+
+def fan_out(queryset, order_by="pk"):
+    """
+    The rows of ``queryset`` from all shards, merged by ``order_by`` (a
+    single field, ``-`` for descending). Without shards the queryset is
+    returned as it is.
+    """
+    if not enabled():
+        return queryset
+    parts = gather(lambda: list(queryset.using(current()).order_by(order_by)))
+    return list(heapq.merge(
+        *parts, key=attrgetter(order_by.lstrip("-")), reverse=order_by.startswith("-"),
+    ))
+
+
+def job_shards(payload, each_shard=False):
+    """The shards to run a job with ``payload`` on (None = unpinned)."""
+    if not enabled():
+        return [None]
+    if "board_id" in payload:
+        return [locate(payload["board_id"], write=True)]
+    if "task_id" in payload:
+        board_id = board_of_task(payload["task_id"])
+        return [locate(board_id, write=True) if board_id is not None else None]
+    return list(settings.SHARDS) if each_shard else [None]
+
+
+# ==========================
+# Users on every shard
+# ==========================
+
+def _user_values(user):
+    return {
+        field.attname: getattr(user, field.attname)
+        for field in CustomUser._meta.concrete_fields if not field.primary_key
+    }
+
+
+@receiver(post_save, sender=CustomUser, dispatch_uid="kanban_app.sharding.copy_user")
+def copy_user(sender, instance, using, **kwargs):
+    if not enabled() or using != DEFAULT_DB_ALIAS:
+        return
+    # Queryset writes: the copies send no signals of their own
+    values = _user_values(instance)
+    for alias in settings.SHARDS[1:]:
+        users = CustomUser._base_manager.using(alias)
+        if not users.filter(pk=instance.pk).update(**values):
+            users.bulk_create([CustomUser(pk=instance.pk, **values)])
+
+
+@receiver(post_delete, sender=CustomUser, dispatch_uid="kanban_app.sharding.delete_user")
+def delete_user(sender, instance, using, **kwargs):
+    if not enabled() or using != DEFAULT_DB_ALIAS:
+        return
+    for alias in settings.SHARDS[1:]:
+        CustomUser._base_manager.using(alias).filter(pk=instance.pk).delete()
+
+
+def sync_users(alias, batch_size=1000):
+    """Copy the users missing on shard ``alias``; return how many."""
+    present = set(CustomUser._base_manager.using(alias).values_list("pk", flat=True))
+    missing = (
+        user for user in CustomUser._base_manager.using(DEFAULT_DB_ALIAS).order_by("pk").iterator(batch_size)
+        if user.pk not in present
+    )
+    copied = 0
+    while batch := [user for _, user in zip(range(batch_size), missing)]:
+        CustomUser._base_manager.using(alias).bulk_create(batch)
+        copied += len(batch)
+    return copied
+
+
+# ==========================
+# Id ranges
+# ==========================
+
+def _sharded_models():
+    return [apps.get_model(label) for label in sorted(routers.SHARDED_MODELS)]
+
+
+def _id_floor(alias):
+    return settings.SHARDS.index(alias) * ID_STRIDE
+
+
+def _start_id_range(alias):
+    """Make every sharded table of ``alias`` count up from the shard's id floor."""
+    floor      = _id_floor(alias)
+    connection = connections[alias]
+    quote      = connection.ops.quote_name
+    if connection.vendor not in ("sqlite", "postgresql"):
+        raise ImproperlyConfigured("Shards must be SQLite or PostgreSQL databases.")
+    with connection.cursor() as cursor:
+        for model in _sharded_models():
+            table, column = model._meta.db_table, model._meta.pk.column
+            if connection.vendor == "sqlite":
+                cursor.execute(
+                    "UPDATE sqlite_sequence SET seq = %s WHERE name = %s AND seq < %s",
+                    [floor, table, floor],
+                )
+                cursor.execute(
+                    "INSERT INTO sqlite_sequence (name, seq) SELECT %s, %s "
+                    "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = %s)",
+                    [table, floor, table],
+                )
+            else:
+                cursor.execute(
+                    f"SELECT setval(pg_get_serial_sequence(%s, %s), "
+                    f"GREATEST(%s, (SELECT COALESCE(MAX({quote(column)}), 0) FROM {quote(table)})))",
+                    [quote(table), column, floor],
+                )
+
+
+def _counts_ids(alias, model):
+    """
+    Whether new rows of ``model`` on ``alias`` take their ids from
+    `allocate_ids`. SQLite numbers a row one above the larger of the
+    table's counter and its largest id, so the rows of a board moved in
+    from a shard further up would carry the numbering into that shard's
+    range; the counter is therefore advanced explicitly. (PostgreSQL
+    sequences ignore explicit ids.)
+    """
+    return (
+        enabled()
+        and model._meta.label_lower in routers.SHARDED_MODELS
+        and connections[alias].vendor == "sqlite"
+    )
+
+
+def allocate_ids(alias, model, count):
+    """Reserve ``count`` new ids of ``model`` on SQLite shard ``alias``; return them as a range."""
+    sql = "UPDATE sqlite_sequence SET seq = seq + %s WHERE name = %s RETURNING seq"
+    table = model._meta.db_table
+    with connections[alias].cursor() as cursor:
+        cursor.execute(sql, [count, table])
+        rows = cursor.fetchall()
+        if not rows:
+            # Nothing written to the table yet
+            _start_id_range(alias)
+            cursor.execute(sql, [count, table])
+            rows = cursor.fetchall()
+    last = rows[0][0]
+    return range(last - count + 1, last + 1)
+
+
+def assign_ids(objs, using=None):
+    """
+    Give the new rows among ``objs`` (of one sharded model) their ids before
+    ``bulk_create``, which sends no ``pre_save``; returns ``objs``.
+    """
+    new = [obj for obj in objs if obj.pk is None]
+    if new:
+        model = type(new[0])
+        using = using or router.db_for_write(model)
+        if _counts_ids(using, model):
+            for obj, pk in zip(new, allocate_ids(using, model, len(new))):
+                obj.pk = pk
+    return objs
+
+
+@receiver(pre_save, dispatch_uid="kanban_app.sharding.assign_id")
+def assign_id(sender, instance, raw=False, using=None, **kwargs):
+    if instance.pk is None and not raw and _counts_ids(using, sender):
+        instance.pk = allocate_ids(using, sender, 1)[0]
+
+
+@contextmanager
+def _id_counter_kept(alias, model):
+    """
+    Copied rows keep their ids, and SQLite moves a table's counter past the
+    largest id inserted; put it back afterwards, so the shard goes on
+    numbering in its own range.
+    """
+    connection = connections[alias]
+    if connection.vendor != "sqlite":
+        yield
+        return
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = %s", [table])
+        row = cursor.fetchone()
+    yield
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "UPDATE sqlite_sequence SET seq = %s WHERE name = %s",
+            [row[0] if row else _id_floor(alias), table],
+        )
+
+
+def prepare_shard(alias):
+    """Set up the id ranges of shard ``alias`` and copy the users to it."""
+    _start_id_range(alias)
+    sync_users(alias)
+
+
+@receiver(post_migrate, dispatch_uid="kanban_app.sharding.prepare_after_migrate")
+def prepare_after_migrate(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    if sender.name == "kanban_app" and using in settings.SHARDS[1:]:
+        prepare_shard(using)
+
+
+# ==========================
+# Moving boards
+# ==========================
+
+def _board_rows(board_id):
+    """Everything stored for a board, parents before children."""
+    return [
+        Board.all_objects.filter(pk=board_id),
+        Board.members.through.objects.filter(board_id=board_id),
+        Task.all_objects.filter(board_id=board_id),
+        Comment.objects.filter(task__board_id=board_id),
+        Reminder.objects.filter(task__board_id=board_id),
+        Activity.objects.filter(board_id=board_id),
+        StatusTransition.objects.filter(board_id=board_id),
+        BoardDailyStats.objects.filter(board_id=board_id),
+    ]
+
+
+def _delete_rows(alias, board_id, batch_size):
+    for queryset in reversed(_board_rows(board_id)):
+        queryset = queryset.using(alias)
+        while pks := list(queryset.order_by().values_list("pk", flat=True)[:batch_size]):
+            queryset.model._base_manager.using(alias).filter(pk__in=pks)._raw_delete(alias)
+
+
+def _copy_rows(queryset, source, target, batch_size):
+    model = queryset.model
+    rows  = queryset.using(source).order_by("pk").iterator(batch_size)
+    while batch := [row for _, row in zip(range(batch_size), rows)]:
+        if model._meta.auto_created:
+            # Member rows are found by board and user, not by id; the
+            # target numbers them itself
+            for row in batch:
+                row.pk = None
+        with transaction.atomic(using=target), _id_counter_kept(target, model):
+            model._base_manager.using(target).bulk_create(batch)
+
+
+def _drain(board_id, interval=0.05):
+    """
+    Wait until the writes registered for a moving board have finished; no
+    new ones are admitted. RuntimeError after ``SHARD_MOVE_DRAIN_SECONDS``
+    (a worker killed mid-write leaves its count behind; reset ``writers``
+    of the board's `BoardShard` entry once no process writes to it).
+    """
+    deadline = time.monotonic() + settings.SHARD_MOVE_DRAIN_SECONDS
+    while True:
+        writers = BoardShard.objects.using(DEFAULT_DB_ALIAS).get(board_id=board_id).writers
+        if not writers:
+            return
+        if time.monotonic() >= deadline:
+            raise RuntimeError(f"Board {board_id} still has {writers} write(s) in progress.")
+        time.sleep(interval)
+
+
+def move_board(board_id, target, batch_size=1000):
+    """
+    Move board ``board_id`` with all its rows to shard ``target``; return
+    ``{model name: rows copied}``. Writes to the board fail with
+    `BoardMoving` until the directory points to the new copy.
+    """
+    if target not in settings.SHARDS:
+        raise ValueError(f"Unknown shard '{target}'.")
+    source = locate(board_id, write=True)
+    if source == target:
+        raise ValueError(f"Board {board_id} is already on '{target}'.")
+    if not Board.all_objects.using(source).filter(pk=board_id).exists():
+        raise ValueError(f"Board {board_id} does not exist.")
+
+    directory = BoardShard.objects.using(DEFAULT_DB_ALIAS)
+    directory.update_or_create(board_id=board_id, defaults={"shard": source, "moving": True})
+    copied = {}
+    try:
+        _drain(board_id)
+        sync_users(target)
+        _delete_rows(target, board_id, batch_size)  # left over by an aborted move
+        for queryset in _board_rows(board_id):
+            _copy_rows(queryset, source, target, batch_size)
+            count = queryset.using(target).count()
+            if count != queryset.using(source).count():
+                raise RuntimeError(f"Copy of {queryset.model._meta.label} is incomplete.")
+            copied[queryset.model._meta.model_name] = count
+    except BaseException:
+        _delete_rows(target, board_id, batch_size)
+        directory.filter(board_id=board_id).update(moving=False)
+        raise
+
+    directory.filter(board_id=board_id).update(shard=target, moving=False)
+    _boards.pop(int(board_id), None)
+    # Processes that cached the old location keep reading the old copy
+    # until their entry expires; only then is it removed
+    time.sleep(settings.SHARD_DIRECTORY_TTL)
+    _delete_rows(source, board_id, batch_size)
+    return copied
@@ -0,0 +1,117 @@
+"""
+Personal dashboard summary (``GET /api/summary/``).
+
+Computed with two aggregate queries: one count of the user's boards and one
+pass over the tasks the user is assignee or reviewer of, with every counter
+as a filtered aggregate. The result is cached per user and day (the overdue
+and due-soon counters depend on the date) for ``SUMMARY_CACHE_SECONDS``.
+
+Signal receivers drop the cached summaries of everyone a change affects:
+the old and new assignee/reviewer of a saved or deleted task, the owner of
+a new board and the users added to or removed from a board. Boards deleted
+through `kanban_app.deletion` are invalidated there, since the soft delete
+is a queryset update without signals.
+
+With board shards the two queries run on every shard and the counters are
+added up.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Min, Q
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from kanban_app import sharding
+from kanban_app.models import Board, Task
+
+
+def _key(user_id, day):
+    return f"summary:{user_id}:{day.isoformat()}"
+
+
+def _compute_shard(user):
+    today = timezone.localdate()
+    soon  = today + timedelta(days=settings.REMINDER_LEAD_DAYS)
+    open_ = ~Q(status="done")
+
+    # Same sets as tasks/assigned-to-me/ and tasks/reviewing/
+    tasks = Task.objects.filter(Q(assignee=user) | Q(reviewer=user)).aggregate(
+        tasks_assigned  = Count("pk"),
+        tasks_reviewing = Count("pk", filter=Q(reviewer=user) & ~Q(assignee=user)),
+        high_priority   = Count("pk", filter=open_ & Q(priority="high")),
+        in_progress     = Count("pk", filter=Q(status="in_progress")),
+        overdue         = Count("pk", filter=open_ & Q(due_date__lt=today)),
+        due_soon        = Count("pk", filter=open_ & Q(due_date__gte=today, due_date__lte=soon)),
+        next_deadline   = Min("due_date", filter=open_ & Q(due_date__gte=today)),
+    )
+    return {"board_count": Board.objects.accessible_to(user).count(), **tasks}
+
+
+def compute(user):
+    parts   = sharding.gather(lambda: _compute_shard(user))
+    summary = {
+        key: sum(part[key] for part in parts)
+        for key in parts[0] if key != "next_deadline"
+    }
+    deadlines = [part["next_deadline"] for part in parts if part["next_deadline"] is not None]
+    summary["next_deadline"] = min(deadlines, default=None)
+    return summary
+
+
+def get(user):
+    """The summary of ``user``, from the cache when possible."""
+    key     = _key(user.pk, timezone.localdate())
+    summary = cache.get(key)
+    if summary is None:
+        summary = compute(user)
+        cache.set(key, summary, settings.SUMMARY_CACHE_SECONDS)
+    return summary
+
+
+def invalidate(user_ids):
+    """Drop the cached summaries of ``user_ids`` once the transaction commits."""
+    keys = [_key(pk, timezone.localdate()) for pk in set(user_ids) if pk is not None]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys), using=sharding.current())
+
+
+# ==========================
+# Invalidation
+# ==========================
+
+@receiver(post_init, sender=Task, dispatch_uid="summary_task_loaded")
+def _task_loaded(sender, instance, **kwargs):
+    # Remember who the task belonged to when it was loaded; read from
+    # __dict__ so deferred fields are not fetched
+    instance._summary_users = (
+        instance.__dict__.get("assignee_id"), instance.__dict__.get("reviewer_id"),
+    )
+
+
+@receiver(post_save, sender=Task, dispatch_uid="summary_task_saved")
+@receiver(post_delete, sender=Task, dispatch_uid="summary_task_deleted")
+def _task_changed(sender, instance, **kwargs):
+    invalidate([instance.assignee_id, instance.reviewer_id, *instance._summary_users])
+    instance._summary_users = (instance.assignee_id, instance.reviewer_id)
+
+
+@receiver(post_save, sender=Board, dispatch_uid="summary_board_saved")
+def _board_saved(sender, instance, created, **kwargs):
+    if created:
+        invalidate([instance.owner_id])
+
+
+@receiver(m2m_changed, sender=Board.members.through, dispatch_uid="summary_board_members")
+def _members_changed(sender, instance, action, pk_set, reverse, **kwargs):
+    if reverse:
+        # user.boards.add(...): the user's own summary changes
+        if action in ("post_add", "post_remove", "post_clear"):
+            invalidate([instance.pk])
+    elif action in ("post_add", "post_remove"):
+        invalidate(pk_set)
+    elif action == "pre_clear":
+        invalidate(instance.members.values_list("pk", flat=True))
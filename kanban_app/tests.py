@@ -1,3 +1,1162 @@
-from django.test import TestCase
+"""
+Tests of the kanban app. Run with ``python manage.py test``.
 
-# Create your tests here.
+Classes tagged ``benchmark`` time the hot queries on larger data sets and
+print the numbers; leave them out with ``--exclude-tag benchmark``.
+
+`ShardingTests` needs shards and is skipped without them; the whole suite
+also runs with two more SQLite files:
+
+    DB_SHARDS=shard1,shard2 python manage.py test
+"""
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time as dt_time, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.core.management import call_command
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.utils import timezone
+from django.db.models import Q
+from django.http import HttpResponse
+from django.conf import settings
+from django.test.utils import CaptureQueriesContext
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings, tag
+from django.urls import path
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from auth_app.models import CustomUser
+from kanban_app import activity, analytics, deletion as deletion_module, idempotency, jobs, reminders, sharding
+from kanban_app.api import async_views
+from kanban_app.api.views import BoardListCreateView
+from kanban_app.models import (
+    Activity, Board, BoardDailyStats, BoardDeletion, BoardShard, Comment, IdempotencyKey, Job, Reminder,
+    ReminderSweep, StatusTransition, Task,
+)
+
+
+FAST_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+
+# URLconf of the async view tests: the read endpoints as served under ASGI
+# (see kanban_app/api/urls.py), plus the sync board list for comparison
+urlpatterns = [
+    path("api/boards/",                     async_views.board_list),
+    path("api/boards/<int:id>/",            async_views.board_detail),
+    path("api/tasks/",                      async_views.task_list),
+    path("api/tasks/assigned-to-me/",       async_views.tasks_assigned),
+    path("api/tasks/reviewing/",            async_views.tasks_reviewing),
+    path("api/tasks/<int:task_id>/comments/", async_views.task_comments),
+    path("api/sync/boards/",                BoardListCreateView.as_view()),
+]
+
+
+def make_user(name):
+    return CustomUser.objects.create_user(
+        username=f"{name}@example.com", email=f"{name}@example.com",
+        password="pw12345!", fullname=name.title(),
+    )
+
+
+def make_board(owner, *members, title="Board"):
+    board = Board.objects.create(title=title, owner=owner)
+    board.members.add(*members)
+    return board
+
+
+def make_task(board, title="Task", **fields):
+    return Task.objects.create(board=board, title=title, created_by=board.owner, **fields)
+
+
+def benchmark(label, func, repeat=5):
+    """Run ``func`` ``repeat`` times; print and return the best time in ms."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    print(f"\n  {label}: {best * 1000:.2f} ms")
+    return best * 1000
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class APITestCase(TestCase):
+    """Two users, ``alice`` and ``bob``, with an API client each."""
+
+    # Every shard; not a replica, which mirrors the primary, and which reads
+    # inside the test's transaction do not use anyway (core.routers)
+    databases = set(settings.SHARDS)
+
+    def setUp(self):
+        cache.clear()
+        # Ids repeat between tests, so cached board locations would be stale
+        sharding._boards.clear()
+        sharding._task_boards.clear()
+        self.alice   = make_user("alice")
+        self.bob     = make_user("bob")
+        self.api     = self.client_for(self.alice)
+        self.bob_api = self.client_for(self.bob)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Token " + Token.objects.create(user=user).key)
+        return client
+
+
+# ==========================
+# Accessible boards
+# ==========================
+
+class AccessibleBoardsTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.carol = make_user("carol")
+        # alice owns and is a member of one board, is only a member of
+        # another and has nothing to do with the third
+        self.own    = make_board(self.alice, self.alice, self.bob, title="Own")
+        self.joined = make_board(self.bob, self.alice, self.carol, title="Joined")
+        self.other  = make_board(self.carol, self.bob, title="Other")
+
+    def test_each_board_once(self):
+        boards = list(Board.objects.accessible_to(self.alice))
+        self.assertCountEqual(boards, [self.own, self.joined])
+
+    def test_no_join_or_distinct(self):
+        sql = str(Board.objects.accessible_to(self.alice).query).upper()
+        self.assertNotIn("DISTINCT", sql)
+        self.assertNotIn("JOIN", sql)
+        sql = str(Task.objects.accessible_to(self.alice).query).upper()
+        self.assertNotIn("DISTINCT", sql)
+
+    def test_tasks_once(self):
+        tasks = [make_task(board) for board in (self.own, self.joined, self.other)]
+        self.assertCountEqual(Task.objects.accessible_to(self.alice), tasks[:2])
+        response = self.api.get("/api/tasks/")
+        self.assertEqual(response.status_code, 200)
+        self.assertCountEqual([task["id"] for task in response.json()], [t.pk for t in tasks[:2]])
+
+    def test_board_list(self):
+        response = self.api.get("/api/boards/")
+        self.assertEqual(response.status_code, 200)
+        self.assertCountEqual([board["id"] for board in response.json()], [self.own.pk, self.joined.pk])
+
+    def test_board_list_queries_do_not_grow(self):
+        # Token lookup, the versions of the boards (for the singleflight
+        # key) and one board query, however many boards there are
+        self.api.get("/api/boards/")
+        with self.assertNumQueries(3):
+            self.api.get("/api/boards/")
+        for i in range(20):
+            make_board(self.bob, self.alice, self.carol, title=f"More {i}")
+        cache.clear()
+        with self.assertNumQueries(3):
+            response = self.api.get("/api/boards/")
+        self.assertEqual(len(response.json()), 22)
+
+
+@tag("benchmark")
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS)
+class AccessibleBoardsBenchmark(TestCase):
+    """A user on 300 boards (owner of a third) with 10 members and 10 tasks each."""
+
+    databases = set(settings.SHARDS)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user   = make_user("busy")
+        members    = [make_user(f"member{i}") for i in range(10)]
+        boards     = [
+            Board(title=f"B{i}", owner=cls.user if i % 3 == 0 else members[i % 10])
+            for i in range(300)
+        ]
+        Board.objects.bulk_create(boards)
+        through = Board.members.through
+        through.objects.bulk_create([
+            through(board_id=board.pk, customuser_id=user.pk)
+            for board in boards for user in [cls.user, *members]
+        ])
+        Task.objects.bulk_create([
+            Task(board=board, title=f"T{i}", created_by=cls.user)
+            for board in boards for i in range(10)
+        ])
+
+    def test_boards(self):
+        union = Board.objects.filter(owner=self.user) | Board.objects.filter(members=self.user)
+        old   = benchmark("boards, OR over the m2m join", lambda: list(union.distinct()))
+        new   = benchmark("boards, accessible_to", lambda: list(Board.objects.accessible_to(self.user)))
+        print(f"  speed-up: {old / new:.1f}x")
+        self.assertEqual(
+            set(union.distinct().values_list("pk", flat=True)),
+            set(Board.objects.accessible_to(self.user).values_list("pk", flat=True)),
+        )
+
+    def test_tasks(self):
+        union = Task.objects.filter(Q(board__owner=self.user) | Q(board__members=self.user)).distinct()
+        old   = benchmark("tasks, OR over the m2m join + DISTINCT", lambda: list(union.all()))
+        new   = benchmark("tasks, accessible_to", lambda: list(Task.objects.accessible_to(self.user)))
+        print(f"  speed-up: {old / new:.1f}x")
+        self.assertEqual(Task.objects.accessible_to(self.user).count(), 3000)
+        self.assertEqual(union.count(), 3000)
+
+
+# ==========================
+# Async read views
+# ==========================
+
+class AsyncReadViewTests(APITestCase):
+    """The async views answer exactly like the sync DRF views."""
+
+    def setUp(self):
+        super().setUp()
+        self.board = make_board(self.alice, self.alice, self.bob)
+        self.task  = make_task(self.board, assignee=self.alice, reviewer=self.bob)
+        make_task(self.board, title="Review", assignee=self.bob, reviewer=self.alice)
+        Comment.objects.create(task=self.task, author=self.bob, content="Hi")
+        self.stranger = self.client_for(make_user("mallory"))
+
+    def both(self, client, url):
+        sync = client.get(url)
+        with override_settings(ROOT_URLCONF=__name__):
+            cache.clear()  # no coalesced result from the sync request
+            asynchronous = client.get(url)
+        return sync, asynchronous
+
+    def test_same_payloads(self):
+        for url in [
+            "/api/boards/", f"/api/boards/{self.board.pk}/", "/api/tasks/",
+            "/api/tasks/assigned-to-me/", "/api/tasks/reviewing/",
+            f"/api/tasks/{self.task.pk}/comments/", "/api/tasks/?shape=table",
+        ]:
+            with self.subTest(url=url):
+                sync, asynchronous = self.both(self.api, url)
+                self.assertEqual(sync.status_code, 200)
+                self.assertEqual(asynchronous.status_code, 200)
+                self.assertEqual(asynchronous.json(), sync.json())
+
+    def test_headers(self):
+        sync, asynchronous = self.both(self.api, f"/api/boards/{self.board.pk}/")
+        self.assertEqual(asynchronous["ETag"], sync["ETag"])
+        sync, asynchronous = self.both(self.api, f"/api/tasks/{self.task.pk}/comments/")
+        self.assertEqual(asynchronous["X-Total-Count"], sync["X-Total-Count"])
+
+    def test_errors(self):
+        for client, url, status in [
+            (APIClient(),   "/api/boards/", 401),
+            (self.stranger, f"/api/boards/{self.board.pk}/", 403),
+            (self.stranger, f"/api/tasks/{self.task.pk}/comments/", 403),
+            (self.api,      "/api/boards/999999/", 404),
+        ]:
+            with self.subTest(url=url, status=status):
+                sync, asynchronous = self.both(client, url)
+                self.assertEqual(sync.status_code, status)
+                self.assertEqual(asynchronous.status_code, status)
+
+    def test_authentication_errors(self):
+        inactive = make_user("inactive")
+        inactive_api = self.client_for(inactive)
+        CustomUser.objects.filter(pk=inactive.pk).update(is_active=False)
+        invalid_api = APIClient()
+        invalid_api.credentials(HTTP_AUTHORIZATION="Token nope")
+        for client, detail in [
+            (APIClient(),  "Authentication credentials were not provided."),
+            (invalid_api,  "Invalid token."),
+            (inactive_api, "User inactive or deleted."),
+        ]:
+            with self.subTest(detail=detail):
+                sync, asynchronous = self.both(client, "/api/boards/")
+                self.assertEqual(asynchronous.status_code, 401)
+                self.assertEqual(asynchronous.json(), sync.json())
+                self.assertEqual(asynchronous.json(), {"detail": detail})
+                self.assertEqual(asynchronous["WWW-Authenticate"], sync["WWW-Authenticate"])
+
+    def test_throttles_run_off_the_event_loop(self):
+        on_loop = []
+
+        def allow_request(throttle, request, view):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            return True
+
+        with mock.patch("core.throttling.UserRateThrottle.allow_request", allow_request):
+            self.both(self.api, "/api/boards/")
+        self.assertEqual(on_loop, [False, False])
+
+    def test_writes_reach_the_sync_views(self):
+        with override_settings(ROOT_URLCONF=__name__):
+            response = self.api.post("/api/boards/", {"title": "New"}, format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertIn("New", [board["title"] for board in self.api.get("/api/boards/").json()])
+
+
+@override_settings(ROOT_URLCONF=__name__, PASSWORD_HASHERS=FAST_HASHERS)
+class SlowClientTests(TransactionTestCase):
+    """
+    Many clients that download their responses slowly, served by one
+    process: under WSGI every response holds a worker thread until the
+    client has it (here a pool of ``WSGI_THREADS``, as with a threaded
+    server); under ASGI the async views wait for the client on the event
+    loop.
+    """
+    databases    = "__all__"
+    clients      = 100
+    client_delay = 0.2   # seconds a client takes to read a response
+    wsgi_threads = 8
+
+    def setUp(self):
+        cache.clear()
+        user  = make_user("alice")
+        board = make_board(user, user)
+        make_task(board)
+        self.auth = "Token " + Token.objects.create(user=user).key
+
+    def serve_wsgi(self, path):
+        handler = WSGIHandler()
+
+        def client(_):
+            environ = RequestFactory(HTTP_AUTHORIZATION=self.auth).get(path).environ
+            status  = []
+            body    = handler(environ, lambda line, headers, exc_info=None: status.append(line))
+            for _chunk in body:
+                time.sleep(self.client_delay)  # written to a slow client
+            body.close()
+            return int(status[0].split()[0])
+
+        with ThreadPoolExecutor(self.wsgi_threads) as pool:
+            return list(pool.map(client, range(self.clients)))
+
+    def serve_asgi(self, path):
+        handler = ASGIHandler()
+        scope   = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+            "query_string": b"", "root_path": "", "server": ("testserver", 80),
+            "client": ("127.0.0.1", 50000),
+            "headers": [(b"host", b"testserver"), (b"authorization", self.auth.encode())],
+        }
+
+        async def client():
+            status, received = [], False
+
+            async def receive():
+                nonlocal received
+                if not received:
+                    received = True
+                    return {"type": "http.request", "body": b"", "more_body": False}
+                await asyncio.Event().wait()  # the client never disconnects
+
+            async def send(message):
+                if message["type"] == "http.response.start":
+                    status.append(message["status"])
+                elif message["type"] == "http.response.body":
+                    await asyncio.sleep(self.client_delay)
+
+            await handler(scope, receive, send)
+            return status[0]
+
+        async def serve():
+            return await asyncio.gather(*(client() for _ in range(self.clients)))
+
+        return asyncio.run(serve())
+
+    @unittest.skipIf(sharding.enabled(), "measures one database; with shards every list reads all of them")
+    def test_async_serves_more_slow_clients(self):
+        timings = {}
+        for name, serve, path in [
+            ("WSGI, sync views", self.serve_wsgi, "/api/sync/boards/"),
+            ("ASGI, async views", self.serve_asgi, "/api/boards/"),
+        ]:
+            start    = time.perf_counter()
+            statuses = serve(path)
+            timings[name] = time.perf_counter() - start
+            self.assertEqual(statuses, [200] * self.clients, name)
+        print(f"\n  {self.clients} slow clients:")
+        for name, seconds in timings.items():
+            print(f"  {name}: {seconds:.2f} s, {self.clients / seconds:.0f} clients/s")
+        # 100 clients / 8 threads = 13 rounds of 0.2 s under WSGI; one round under ASGI
+        self.assertLess(timings["ASGI, async views"] * 3, timings["WSGI, sync views"])
+
+
+# ==========================
+# Reminders
+# ==========================
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, REMINDER_LEAD_DAYS=1)
+class ReminderSweepTests(TestCase):
+    databases = set(settings.SHARDS)
+
+    def setUp(self):
+        self.today = date(2026, 3, 10)
+        alice, bob = make_user("alice"), make_user("bob")
+        board      = make_board(alice, alice, bob)
+        self.soon  = make_task(board, due_date=self.today + timedelta(days=1), assignee=alice, reviewer=bob)
+        self.late  = make_task(board, due_date=self.today - timedelta(days=3), assignee=alice)
+        make_task(board, due_date=self.today - timedelta(days=3), assignee=alice, status="done")
+
+    def test_counts_new_reminders(self):
+        self.assertEqual(reminders.sweep(self.today, batch_size=2), 3)
+        self.assertEqual(Reminder.objects.count(), 3)
+
+    def test_reruns_count_nothing(self):
+        reminders.sweep(self.today)
+        # Forget the high-water marks: the same tasks are scanned again,
+        # but every reminder already exists
+        ReminderSweep.objects.all().delete()
+        self.assertEqual(reminders.sweep(self.today, batch_size=2), 0)
+        self.assertEqual(Reminder.objects.count(), 3)
+
+    def test_only_new_range_is_scanned(self):
+        reminders.sweep(self.today)
+        later = make_task(self.soon.board, due_date=self.today + timedelta(days=2), assignee=self.soon.assignee)
+        self.assertEqual(reminders.sweep(self.today + timedelta(days=1)), 1)
+        self.assertTrue(Reminder.objects.filter(task=later, kind="due_soon").exists())
+
+
+# ==========================
+# Moving cards
+# ==========================
+
+class TaskMoveTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        board     = make_board(self.alice, self.alice)
+        self.card = make_task(board, title="Card", position="8")
+        self.low  = make_task(board, title="Low", position="a")
+        self.high = make_task(board, title="High", position="m")
+
+    def move(self, **data):
+        return self.api.post(f"/api/tasks/{self.card.pk}/move/", data, format="json")
+
+    def test_between_neighbours(self):
+        response = self.move(after_id=self.low.pk, before_id=self.high.pk)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.card.refresh_from_db()
+        self.assertTrue(self.low.position < self.card.position < self.high.position)
+
+    def test_same_or_reversed_neighbours_are_rejected(self):
+        for after, before in ((self.low, self.low), (self.high, self.low)):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.move(after_id=after.pk, before_id=before.pk)
+            self.assertEqual(response.status_code, 400, response.content)
+            self.assertIn("before_id", response.json())
+        self.assertFalse(Job.objects.filter(name="rebalance_column").exists())
+
+    def test_shared_key_schedules_rebalance(self):
+        Task.objects.filter(pk=self.high.pk).update(position=self.low.position)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.move(after_id=self.low.pk, before_id=self.high.pk)
+        self.assertEqual(response.status_code, 409)
+        self.assertTrue(Job.objects.filter(name="rebalance_column").exists())
+
+
+# ==========================
+# Versioned updates
+# ==========================
+
+class PutUpdateTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.board = make_board(self.alice, self.alice, self.bob)
+        self.task  = make_task(self.board, position="m")
+
+    def test_task_put_is_versioned(self):
+        response = self.api.put(f"/api/tasks/{self.task.pk}/", {
+            "title": "Renamed", "status": "todo",
+            "position": "0", "version": 99, "archived_at": "2026-01-01T00:00:00Z",
+        }, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.title, "Renamed")
+        self.assertEqual((self.task.position, self.task.version), ("m", 2))
+        self.assertIsNone(self.task.archived_at)
+
+        response = self.api.put(f"/api/tasks/{self.task.pk}/", {"title": "Stale"},
+                                format="json", HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, 412)
+
+    def test_board_put_bumps_version(self):
+        response = self.api.put(f"/api/boards/{self.board.pk}/", {
+            "title": "Renamed", "members": [self.alice.pk, self.bob.pk],
+        }, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.board.refresh_from_db()
+        self.assertEqual((self.board.title, self.board.version), ("Renamed", 2))
+
+
+# ==========================
+# Idempotency keys
+# ==========================
+
+class IdempotencyTests(APITestCase):
+    def create(self, key, **data):
+        return self.api.post("/api/boards/", data, format="json", HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_success_is_replayed(self):
+        first = self.create("a", title="Once")
+        again = self.create("a", title="Once")
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(again["Idempotent-Replayed"], "true")
+        self.assertEqual(again.content, first.content)
+        self.assertEqual(len(self.api.get("/api/boards/").json()), 1)
+
+    def test_validation_error_is_replayed(self):
+        self.assertEqual(self.create("b").status_code, 400)
+        self.assertEqual(self.create("b")["Idempotent-Replayed"], "true")
+
+    def test_retryable_responses_release_the_key(self):
+        for status in (409, 429, 503):
+            record, created = idempotency.claim("scope", f"key-{status}", "fingerprint")
+            self.assertTrue(created)
+            idempotency.store(record, HttpResponse(status=status))
+            self.assertFalse(IdempotencyKey.objects.filter(pk=record.pk).exists())
+
+
+# ==========================
+# Dashboard summary
+# ==========================
+
+class SummaryTests(APITestCase):
+    def test_counts_match_task_lists(self):
+        board = make_board(self.bob, self.alice, self.bob)
+        make_task(board, assignee=self.alice)
+        make_task(board, reviewer=self.alice)
+        make_task(board, assignee=self.alice, reviewer=self.alice)
+        make_task(board, assignee=self.bob)
+
+        summary = self.api.get("/api/summary/").json()
+        assigned  = self.api.get("/api/tasks/assigned-to-me/").json()
+        reviewing = self.api.get("/api/tasks/reviewing/").json()
+        self.assertEqual((len(assigned), len(reviewing)), (3, 1))
+        self.assertEqual(summary["tasks_assigned"], len(assigned))
+        self.assertEqual(summary["tasks_reviewing"], len(reviewing))
+
+
+# ==========================
+# Comment threads
+# ==========================
+
+class CommentThreadTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.board = make_board(self.alice, self.alice, self.bob)
+        self.task  = make_task(self.board)
+        self.url   = f"/api/tasks/{self.task.pk}/comments/"
+        self.ids   = [self.comment(self.alice if i % 2 else self.bob, f"C{i}").pk for i in range(5)]
+
+    def comment(self, author, content):
+        return Comment.objects.create(task=self.task, author=author, content=content)
+
+    def walk(self, **params):
+        """Page through the thread; a new comment arrives after the first page."""
+        seen = []
+        page = self.api.get(self.url, {"limit": 2, **params}).json()
+        extra = self.comment(self.bob, "Late")
+        while True:
+            seen += [c["id"] for c in page["results"]]
+            if not page["next"]:
+                return seen, extra.pk
+            page = self.api.get(page["next"]).json()
+
+    @override_settings(SHARD_DIRECTORY_TTL=0)
+    def test_queries_do_not_grow_with_the_thread(self):
+        # Token, task with board, owner, comments with authors, count; with
+        # shards the directory lookup of the board
+        queries = 6 if sharding.enabled() else 5
+        self.api.get(self.url)  # caches the board of the task
+        with self.assertNumQueries(queries):
+            response = self.api.get(self.url)
+        self.assertEqual(response["X-Total-Count"], "5")
+        for i in range(20):
+            self.comment(make_user(f"user{i}"), "More")
+        with self.assertNumQueries(queries):
+            self.assertEqual(len(self.api.get(self.url).json()), 25)
+        with self.assertNumQueries(queries):
+            self.assertEqual(len(self.api.get(self.url, {"limit": 10}).json()["results"]), 10)
+
+    def test_keyset_pages_oldest_first(self):
+        seen, late = self.walk()
+        # The new comment shows up on the last page, nothing repeats or goes missing
+        self.assertEqual(seen, self.ids + [late])
+
+    def test_keyset_pages_newest_first(self):
+        seen, late = self.walk(order="newest")
+        self.assertEqual(seen, self.ids[::-1])
+        self.assertNotIn(late, seen)
+
+    def test_after_id(self):
+        response = self.api.get(self.url, {"after_id": self.ids[2]})
+        self.assertEqual([c["id"] for c in response.json()], self.ids[3:])
+        self.assertEqual(response["X-Total-Count"], "5")
+        self.assertEqual(self.api.get(self.url, {"after_id": self.ids[-1]}).json(), [])
+        self.assertEqual(self.api.get(self.url, {"after_id": "x"}).status_code, 400)
+
+
+# ==========================
+# Activity feed
+# ==========================
+
+class ActivityTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.board = make_board(self.alice, self.alice, self.bob)
+        self.task  = make_task(self.board)
+        self.url   = f"/api/boards/{self.board.pk}/activity/"
+
+    def test_request_writes_its_events_at_once(self):
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            response = self.api.patch(f"/api/tasks/{self.task.pk}/", {
+                "status": "in_progress", "assignee_id": self.bob.pk, "reviewer_id": self.alice.pk,
+            }, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        inserts = [q["sql"] for q in queries if q["sql"].startswith('INSERT INTO "kanban_app_activity"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(
+            sorted(Activity.objects.filter(board=self.board).values_list("verb", flat=True)),
+            ["task_reassigned", "task_reassigned", "task_status_changed"],
+        )
+
+    def test_outside_a_request_every_event_is_written(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            activity.record(self.board, "comment_added", self.alice, self.task)
+            activity.record(self.board, "comment_added", self.bob, self.task)
+        self.assertEqual(Activity.objects.filter(board=self.board).count(), 2)
+
+    def test_feed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.api.patch(f"/api/tasks/{self.task.pk}/", {"status": "review"}, format="json")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bob_api.post(f"/api/tasks/{self.task.pk}/comments/", {"content": "Looks good"}, format="json")
+
+        response = self.bob_api.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        first, second = response.json()["results"]
+        self.assertEqual((first["verb"], first["actor"]["id"], first["task"]), ("comment_added", self.bob.pk, self.task.pk))
+        self.assertEqual((second["verb"], second["data"]), ("task_status_changed", {"old": "todo", "new": "review"}))
+
+        page = self.api.get(self.url, {"limit": 1}).json()
+        self.assertEqual([e["verb"] for e in page["results"]], ["comment_added"])
+        self.assertEqual([e["verb"] for e in self.api.get(page["next"]).json()["results"]], ["task_status_changed"])
+
+        outsider = self.client_for(make_user("carol"))
+        self.assertEqual(outsider.get(self.url).status_code, 403)
+
+
+# ==========================
+# Board analytics
+# ==========================
+
+class AnalyticsTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.board = make_board(self.alice, self.alice, self.bob)
+        self.today = timezone.localdate()
+
+    def at(self, days_ago, hour):
+        day = self.today - timedelta(days=days_ago)
+        return timezone.make_aware(datetime.combine(day, dt_time(hour)))
+
+    def transitions(self):
+        return list(
+            StatusTransition.objects.filter(board=self.board).order_by("pk").values_list("from_status", "to_status")
+        )
+
+    def test_status_changes_are_recorded(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            task_id = self.api.post("/api/tasks/", {"board": self.board.pk, "title": "A"}, format="json").json()["id"]
+        url = f"/api/tasks/{task_id}/"
+        for method, path, data in [
+            ("patch",  url,            {"status": "in_progress"}),
+            ("patch",  url,            {"title": "Renamed"}),
+            ("post",   f"{url}move/",  {"status": "review"}),
+            ("delete", url,            None),
+        ]:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = getattr(self.api, method)(path, data, format="json")
+            self.assertLess(response.status_code, 300, response.content)
+        self.assertEqual(self.transitions(), [
+            ("", "todo"), ("todo", "in_progress"), ("in_progress", "review"), ("review", ""),
+        ])
+        # One queued rollup covers them all
+        self.assertEqual(Job.objects.filter(name="rollup_analytics", status="queued").count(), 1)
+
+    def populate(self):
+        a, b, c = (make_task(self.board, title=title) for title in "ABC")
+        StatusTransition.objects.bulk_create([
+            StatusTransition(board=self.board, task=task, from_status=old, to_status=new, created_at=when)
+            for task, old, new, when in [
+                (a, "",            "todo",        self.at(1, 9)),
+                (a, "todo",        "in_progress", self.at(1, 10)),
+                (b, "",            "todo",        self.at(1, 21)),
+                (c, "",            "todo",        self.at(0, 8)),
+                (b, "todo",        "done",        self.at(0, 9)),
+                (a, "in_progress", "done",        self.at(0, 10)),
+                (c, "todo",        "",            self.at(0, 11)),
+            ]
+        ])
+
+    def test_rollup(self):
+        self.populate()
+        self.assertEqual(analytics.rollup(batch_size=2), 7)
+        self.assertEqual(analytics.rollup(batch_size=2), 0)
+
+        stats = {
+            (row.day, row.status): (row.net, row.entered, row.cycle_time_seconds / 3600, row.cycle_time_count)
+            for row in BoardDailyStats.objects.filter(board=self.board)
+        }
+        yesterday = self.today - timedelta(days=1)
+        self.assertEqual(stats, {
+            (yesterday,  "todo"):        (1, 2, 0, 0),
+            (yesterday,  "in_progress"): (1, 1, 0, 0),
+            (self.today, "todo"):        (-1, 1, 0, 0),
+            (self.today, "in_progress"): (-1, 0, 0, 0),
+            # A: 24 h since it entered in_progress, B: 12 h since its creation
+            (self.today, "done"):        (2, 2, 36, 2),
+        })
+
+    def test_endpoint(self):
+        self.populate()
+        analytics.rollup()
+        url = f"/api/boards/{self.board.pk}/analytics/"
+
+        response = self.bob_api.get(url, {"days": 2})
+        self.assertEqual(response.status_code, 200)
+        yesterday, today = response.json()["days"]
+        self.assertEqual(
+            (yesterday["tasks"], yesterday["finished"], yesterday["cycle_time_hours"]),
+            ({"todo": 1, "in_progress": 1, "review": 0, "done": 0}, 0, None),
+        )
+        self.assertEqual(
+            (today["date"], today["tasks"], today["finished"], today["cycle_time_hours"]),
+            (self.today.isoformat(), {"todo": 0, "in_progress": 0, "review": 0, "done": 2}, 2, 18.0),
+        )
+        # The days before the range still count towards the totals
+        self.assertEqual(self.api.get(url, {"days": 1}).json()["days"], [today])
+        self.assertEqual(len(self.api.get(url).json()["days"]), 30)
+
+        self.assertEqual(self.api.get(url, {"days": "week"}).status_code, 400)
+        self.assertEqual(self.client_for(make_user("carol")).get(url).status_code, 403)
+
+
+# ==========================
+# Board deletion
+# ==========================
+
+class BoardDeletionTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.board = make_board(self.alice, self.alice, self.bob)
+        self.tasks = [make_task(self.board, title=f"T{i}") for i in range(5)]
+        Comment.objects.bulk_create([
+            Comment(task=task, author=self.bob, content=f"C{i}") for task in self.tasks for i in range(2)
+        ])
+        self.other = make_task(make_board(self.bob, self.alice), title="Other")
+
+    def delete(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.api.delete(f"/api/boards/{self.board.pk}/")
+        self.assertEqual(response.status_code, 204, response.content)
+        return BoardDeletion.objects.get(board_id=self.board.pk)
+
+    def test_deleted_board_is_hidden_at_once(self):
+        self.assertEqual(self.bob_api.delete(f"/api/boards/{self.board.pk}/").status_code, 403)
+        self.delete()
+        self.assertNotIn(self.board.pk, [b["id"] for b in self.api.get("/api/boards/").json()])
+        self.assertEqual(self.api.get(f"/api/boards/{self.board.pk}/").status_code, 404)
+        self.assertEqual([t["id"] for t in self.api.get("/api/tasks/").json()], [self.other.pk])
+        # Nothing purged yet
+        self.assertEqual(Task.all_objects.filter(board=self.board).count(), 5)
+
+    def test_purge_in_batches(self):
+        deletion = self.delete()
+        progress = []
+        while not deletion_module.purge_batch(deletion, batch_size=3):
+            deletion.refresh_from_db()
+            progress.append((deletion.deleted_comments, deletion.deleted_tasks, deletion.deleted_members))
+        # 10 comments, 5 tasks and 2 members, at most 3 rows per batch
+        self.assertEqual(progress, [(3, 0, 0), (6, 0, 0), (9, 0, 0), (10, 0, 0), (10, 3, 0), (10, 5, 0), (10, 5, 2)])
+        self.assertFalse(Board.all_objects.filter(pk=self.board.pk).exists())
+        self.assertFalse(Comment.objects.filter(task__board_id=self.board.pk).exists())
+        self.assertTrue(Task.objects.filter(pk=self.other.pk).exists())
+
+    def test_purge_command(self):
+        self.delete()
+        out = StringIO()
+        call_command("purge_deleted_boards", "--batch-size", "2", stdout=out)
+        self.assertIn(f"Purged board {self.board.pk}", out.getvalue())
+        self.assertFalse(Task.all_objects.filter(board_id=self.board.pk).exists())
+        self.assertFalse(deletion_module.pending_deletions().exists())
+
+    def test_worker_purges_and_progress_endpoint(self):
+        self.delete()
+        url = f"/api/boards/{self.board.pk}/deletion/"
+        self.assertEqual(self.api.get(url).json()["status"], "pending")
+        self.assertEqual(self.bob_api.get(url).status_code, 404)
+
+        self.assertEqual(jobs.run_pending("worker"), 1)
+        response = self.api.get(url)
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(
+            (body["status"], body["deleted_tasks"], body["deleted_comments"], body["deleted_members"]),
+            ("done", 5, 10, 2),
+        )
+        self.assertIsNotNone(body["finished_at"])
+
+
+# ==========================
+# Background jobs
+# ==========================
+
+_flaky_calls = []
+
+
+@jobs.job("test_flaky")
+def _flaky(fail=True):
+    _flaky_calls.append(fail)
+    if fail:
+        raise RuntimeError("flaky")
+
+
+@override_settings(JOB_RETRY_BACKOFF=10, JOB_RETRY_BACKOFF_MAX=3600, JOB_LOCK_TIMEOUT=600)
+class JobQueueTests(TestCase):
+    databases = set(settings.SHARDS)
+
+    def setUp(self):
+        _flaky_calls.clear()
+
+    def test_claims_are_exclusive(self):
+        for _ in range(3):
+            jobs.enqueue("test_flaky", {"fail": False})
+        first  = jobs.claim("worker-a", limit=2)
+        second = jobs.claim("worker-b", limit=2)
+        self.assertEqual((len(first), len(second)), (2, 1))
+        self.assertFalse({job.pk for job in first} & {job.pk for job in second})
+        self.assertEqual(jobs.claim("worker-c", limit=2), [])
+        self.assertEqual(
+            sorted(Job.objects.values_list("locked_by", flat=True)), ["worker-a", "worker-a", "worker-b"],
+        )
+
+    def test_retry_with_backoff_then_failed(self):
+        queued = jobs.enqueue("test_flaky", max_attempts=2)
+        before = timezone.now()
+        with self.assertLogs("kanban_app.jobs", "ERROR"):
+            self.assertEqual(jobs.run_pending("worker"), 1)
+        job = Job.objects.get(pk=queued.pk)
+        self.assertEqual((job.status, job.attempts, job.locked_by), ("queued", 1, ""))
+        self.assertIn("RuntimeError: flaky", job.last_error)
+        self.assertGreaterEqual(job.run_at, before + timedelta(seconds=10))
+        # Not due before the backoff has passed
+        self.assertEqual(jobs.run_pending("worker"), 0)
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs("kanban_app.jobs", "ERROR"):
+            self.assertEqual(jobs.run_pending("worker"), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("failed", 2))
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(len(_flaky_calls), 2)
+        self.assertEqual(jobs.run_pending("worker"), 0)
+
+    def test_backoff_doubles_up_to_the_cap(self):
+        with override_settings(JOB_RETRY_BACKOFF_MAX=30):
+            self.assertEqual([jobs._backoff(n) for n in (1, 2, 3, 4)], [10, 20, 30, 30])
+
+    def test_stale_claim_is_taken_over(self):
+        queued = jobs.enqueue("test_flaky", {"fail": False})
+        [slow] = jobs.claim("worker-a")
+        Job.objects.filter(pk=queued.pk).update(locked_at=timezone.now() - timedelta(seconds=601))
+        [fresh] = jobs.claim("worker-b")
+
+        # The worker that lost the job records nothing
+        with self.assertLogs("kanban_app.jobs", "WARNING"):
+            self.assertFalse(jobs.run(slow))
+        job = Job.objects.get(pk=queued.pk)
+        self.assertEqual((job.status, job.attempts, job.locked_by), ("running", 0, "worker-b"))
+
+        self.assertTrue(jobs.run(fresh))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("done", 1))
+        self.assertEqual(len(_flaky_calls), 1)
+
+    def test_lost_claim_does_not_record_the_outcome(self):
+        queued = jobs.enqueue("test_flaky", {"fail": False})
+        [slow] = jobs.claim("worker-a")
+
+        def taken_over(**payload):
+            # Another worker re-claims the job while this one still runs it
+            Job.objects.filter(pk=queued.pk).update(locked_by="worker-b", locked_at=timezone.now())
+
+        with mock.patch.dict(jobs._handlers, {"test_flaky": taken_over}), \
+                self.assertLogs("kanban_app.jobs", "WARNING"):
+            self.assertFalse(jobs.run(slow))
+        job = Job.objects.get(pk=queued.pk)
+        self.assertEqual((job.status, job.locked_by, job.attempts), ("running", "worker-b", 1))
+        self.assertIsNone(job.finished_at)
+
+
+# ==========================
+# Periodic jobs
+# ==========================
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, PERIODIC_JOBS={"archive_done_tasks": 3600})
+class PeriodicJobTests(TestCase):
+    databases = set(settings.SHARDS)
+
+    def test_enqueued_once_per_interval(self):
+        now = timezone.now()
+        self.assertEqual(jobs.enqueue_periodic(now), ["archive_done_tasks"])
+        self.assertEqual(jobs.enqueue_periodic(now), [])
+
+        Job.objects.update(status="done")
+        self.assertEqual(jobs.enqueue_periodic(now + timedelta(minutes=30)), [])
+        self.assertEqual(jobs.enqueue_periodic(now + timedelta(hours=2)), ["archive_done_tasks"])
+
+    @override_settings(TASK_ARCHIVE_AFTER_DAYS=90)
+    def test_worker_archives_done_tasks(self):
+        alice = make_user("alice")
+        task  = make_task(make_board(alice, alice), status="done")
+        Task.objects.filter(pk=task.pk).update(completed_at=timezone.now() - timedelta(days=91))
+
+        self.assertEqual(jobs.enqueue_periodic(), ["archive_done_tasks"])
+        self.assertEqual(jobs.run_pending("worker"), 1)
+        self.assertIsNotNone(Task.all_objects.get(pk=task.pk).archived_at)
+
+
+# ==========================
+# Coalesced board reads
+# ==========================
+
+@override_settings(SINGLEFLIGHT_SHARED=True, SINGLEFLIGHT_SHARED_TTL=60)
+class BoardReadKeyTests(APITestCase):
+    """
+    Shared results live on for the TTL, so the keys must change with every
+    write that changes the payload.
+    """
+    def setUp(self):
+        super().setUp()
+        self.board = make_board(self.alice, self.alice, self.bob)
+
+    def tasks_in_list(self):
+        board = self.api.get("/api/boards/").json()[0]
+        return board["ticket_count"]
+
+    def titles_in_detail(self):
+        return [task["title"] for task in self.api.get(f"/api/boards/{self.board.pk}/").json()["tasks"]]
+
+    def test_task_writes_change_the_keys(self):
+        self.assertEqual((self.tasks_in_list(), self.titles_in_detail()), (0, []))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.bob_api.post("/api/tasks/", {"board": self.board.pk, "title": "New"}, format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual((self.tasks_in_list(), self.titles_in_detail()), (1, ["New"]))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bob_api.patch(f"/api/tasks/{response.json()['id']}/", {"title": "Renamed"}, format="json")
+        self.assertEqual(self.titles_in_detail(), ["Renamed"])
+
+    def test_comments_change_the_detail_key(self):
+        task = make_task(self.board)
+        self.api.get(f"/api/boards/{self.board.pk}/")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bob_api.post(f"/api/tasks/{task.pk}/comments/", {"content": "Hi"}, format="json")
+        detail = self.api.get(f"/api/boards/{self.board.pk}/").json()
+        self.assertEqual(detail["tasks"][0]["comments_count"], 1)
+
+    def test_comment_writes_do_not_look_up_the_board(self):
+        task = make_task(self.board)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.bob_api.post(f"/api/tasks/{task.pk}/comments/", {"content": "Hi"}, format="json")
+            Comment.objects.create(task=task, author=self.bob, content="Again")
+        self.assertEqual(response.status_code, 201, response.content)
+        # Only the view's own lookup of the task (with shards, and the
+        # lookup of its board that routes the request)
+        task_reads = [q["sql"] for q in queries if q["sql"].startswith('SELECT "kanban_app_task"')]
+        self.assertEqual(len(task_reads), 2 if sharding.enabled() else 1, task_reads)
+
+
+# ==========================
+# Throttling
+# ==========================
+
+@override_settings(ENDPOINT_THROTTLE_RATES={"task-list-create": "3/min"})
+class ThrottleTests(APITestCase):
+    def test_headers_report_the_budget(self):
+        response = self.api.get("/api/tasks/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-RateLimit-Limit"], "3")
+        self.assertEqual(response["X-RateLimit-Remaining"], "2")
+        self.assertGreaterEqual(int(response["X-RateLimit-Reset"]), 1)
+
+    def test_dry_bucket_answers_429(self):
+        for _ in range(3):
+            self.assertEqual(self.api.get("/api/tasks/").status_code, 200)
+        response = self.api.get("/api/tasks/")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["X-RateLimit-Remaining"], "0")
+        # 1 of 3 tokens per minute: back after about 20 seconds
+        self.assertIn(int(response["Retry-After"]), range(19, 22))
+        # Other users and other endpoints have their own budgets
+        self.assertEqual(self.bob_api.get("/api/tasks/").status_code, 200)
+        self.assertEqual(self.api.get("/api/boards/").status_code, 200)
+
+    def test_bypass_users_are_not_throttled(self):
+        with override_settings(THROTTLE_BYPASS_USERS=["alice@example.com"]):
+            for _ in range(5):
+                response = self.api.get("/api/tasks/")
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn("X-RateLimit-Limit", response)
+
+
+# ==========================
+# Sharding
+# ==========================
+
+@unittest.skipUnless(sharding.enabled(), "needs DB_SHARDS, e.g. DB_SHARDS=shard1,shard2")
+@override_settings(
+    PASSWORD_HASHERS=FAST_HASHERS, SHARD_FANOUT_WORKERS=0,
+    SHARD_MOVE_DRAIN_SECONDS=0, SHARD_DIRECTORY_TTL=0,
+)
+class ShardingTests(TransactionTestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        cache.clear()
+        sharding._boards.clear()
+        sharding._task_boards.clear()
+        for alias in settings.SHARDS[1:]:
+            sharding.prepare_shard(alias)
+        # One owner per shard; everyone is a member of every board
+        self.users = [make_user(f"user{i}") for i in range(len(settings.SHARDS))]
+        self.apis  = [self.client_for(user) for user in self.users]
+        self.boards = {
+            sharding.placement(user.pk): self.add_board(user, api) for user, api in zip(self.users, self.apis)
+        }
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Token " + Token.objects.create(user=user).key)
+        return client
+
+    def add_board(self, owner, api):
+        response = api.post("/api/boards/", {"title": owner.fullname}, format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+        board_id = response.json()["id"]
+        Board.objects.using(sharding.locate(board_id)).get(pk=board_id).members.add(*self.users)
+        return board_id
+
+    def add_task(self, board_id, title="Task"):
+        response = self.apis[0].post(
+            "/api/tasks/", {"board": board_id, "title": title, "assignee_id": self.users[0].pk}, format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()["id"]
+
+    def test_boards_and_tasks_stay_on_their_shard(self):
+        self.assertEqual(set(self.boards), set(settings.SHARDS))
+        for alias, board_id in self.boards.items():
+            self.assertEqual(BoardShard.objects.get(board_id=board_id).shard, alias)
+            self.assertEqual(sharding.home_shard(board_id), alias)
+            task_id = self.add_task(board_id)
+            self.assertEqual(sharding.home_shard(task_id), alias)
+            self.assertTrue(Task.objects.using(alias).filter(pk=task_id).exists())
+            response = self.apis[1].post(f"/api/tasks/{task_id}/comments/", {"content": "Hi"}, format="json")
+            self.assertEqual(response.status_code, 201, response.content)
+            self.assertEqual(sharding.home_shard(response.json()["id"]), alias)
+
+    def test_lists_fan_out_to_every_shard(self):
+        task_ids = [self.add_task(board_id) for board_id in self.boards.values()]
+        api = self.apis[0]
+        self.assertEqual(sorted(b["id"] for b in api.get("/api/boards/").json()), sorted(self.boards.values()))
+        self.assertEqual([t["id"] for t in api.get("/api/tasks/assigned-to-me/").json()], sorted(task_ids))
+        self.assertEqual(api.get("/api/summary/").json()["board_count"], len(settings.SHARDS))
+
+    def test_moved_board_is_served_from_its_new_shard(self):
+        source, target = settings.SHARDS[-1], settings.SHARDS[0]
+        board_id = self.boards[source]
+        task_id  = self.add_task(board_id)
+        self.apis[1].post(f"/api/tasks/{task_id}/comments/", {"content": "Hi"}, format="json")
+
+        copied = sharding.move_board(board_id, target)
+        self.assertEqual((copied["task"], copied["comment"]), (1, 1))
+        self.assertEqual(copied["board_members"], len(self.users))
+        self.assertFalse(Board.all_objects.using(source).filter(pk=board_id).exists())
+        self.assertEqual(sharding.locate(board_id), target)
+
+        response = self.apis[2].get(f"/api/boards/{board_id}/")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual([t["id"] for t in response.json()["tasks"]], [task_id])
+        response = self.apis[2].patch(f"/api/tasks/{task_id}/", {"title": "Moved"}, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+
+    def test_ids_after_a_move_stay_in_the_shards_range(self):
+        # Rows moved down from the last shard have the largest ids on the
+        # target; new rows there must still be numbered in its own range
+        source, target = settings.SHARDS[-1], settings.SHARDS[0]
+        moved_task = self.add_task(self.boards[source])
+        sharding.move_board(self.boards[source], target)
+
+        on_target = [self.add_task(self.boards[source]), self.add_task(self.boards[target])]
+        owner     = next(i for i, user in enumerate(self.users) if sharding.placement(user.pk) == source)
+        on_source = self.add_task(self.add_board(self.users[owner], self.apis[owner]))
+        self.assertEqual([sharding.home_shard(pk) for pk in on_target], [target, target])
+        self.assertEqual(sharding.home_shard(on_source), source)
+        self.assertEqual(len({moved_task, on_source, *on_target}), 4)
+
+        comment = self.apis[0].post(f"/api/tasks/{on_target[0]}/comments/", {"content": "Hi"}, format="json")
+        self.assertEqual(sharding.home_shard(comment.json()["id"]), target)
+
+        # ... so the board can move back without its ids clashing
+        sharding.move_board(self.boards[source], source)
+        self.assertEqual(Task.all_objects.using(source).filter(board_id=self.boards[source]).count(), 2)
+
+    def test_move_waits_for_writes_in_progress(self):
+        source, target = settings.SHARDS[-1], settings.SHARDS[0]
+        board_id = self.boards[source]
+        writing, written = threading.Event(), threading.Event()
+
+        def write():
+            # A request that looked the board up before the move started
+            with sharding.writes(), sharding.pinned(sharding.locate(board_id, write=True)):
+                writing.set()
+                time.sleep(0.3)
+                make_task(Board.objects.get(pk=board_id), title="In flight")
+            written.set()
+
+        with ThreadPoolExecutor(1) as pool:
+            pool.submit(write)
+            writing.wait()
+            with override_settings(SHARD_MOVE_DRAIN_SECONDS=5):
+                copied = sharding.move_board(board_id, target)
+            self.assertTrue(written.is_set())
+        self.assertEqual(copied["task"], 1)
+        self.assertEqual(Task.objects.using(target).get(board_id=board_id).title, "In flight")
+        self.assertEqual(BoardShard.objects.get(board_id=board_id).writers, 0)
+
+    def test_move_gives_up_on_writes_that_do_not_finish(self):
+        board_id = self.boards[settings.SHARDS[-1]]
+        with sharding.writes():
+            sharding.locate(board_id, write=True)
+            with self.assertRaisesRegex(RuntimeError, "1 write"):
+                sharding.move_board(board_id, settings.SHARDS[0])
+        entry = BoardShard.objects.get(board_id=board_id)
+        self.assertEqual((entry.shard, entry.moving, entry.writers), (settings.SHARDS[-1], False, 0))
+
+    def test_writes_are_refused_while_moving(self):
+        board_id = self.boards[settings.SHARDS[-1]]
+        BoardShard.objects.filter(board_id=board_id).update(moving=True)
+        response = self.apis[0].patch(f"/api/boards/{board_id}/", {"title": "New"}, format="json")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(BoardShard.objects.get(board_id=board_id).writers, 0)
+        self.assertEqual(self.apis[0].get(f"/api/boards/{board_id}/").status_code, 200)
+        # Writes to ids of no board leave no entry behind
+        self.assertEqual(self.apis[0].post("/api/tasks/", {"board": 999, "title": "X"}, format="json").status_code, 400)
+        self.assertFalse(BoardShard.objects.filter(board_id=999).exists())